@@ -1,20 +1,49 @@
 # app.py
+import time
+INICIO_PROCESSO = time.perf_counter()
+
 import os
 import sys
+import multiprocessing
 import pandas as pd
-import re
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 from tkinter import messagebox, Toplevel, Tk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from datetime import datetime
+import nota_fiscal
+import snapshot
+from core import padronizar_texto, compactar_tabelas, gravar_linha, gravar_valor
+from journal import JournalAlteracoes, CompactadorJournal, aplicar_registros
+from grade_virtual import GradeVirtual, FonteDataFrame
+from indices import IndiceChave
+from dashboard import AgregadosDashboard, PainelDashboard
+from trabalhador import TrabalhadorIO, IndicadorOcupado
+from trava import PlanilhaCompartilhada
+from instrumentacao import METRICAS, medir
 
 # ------------------- CONFIGURAÇÕES -------------------
 EXCEL_FILE = "produtos.xlsx"
 LOW_STOCK_THRESHOLD = 5
+# coluna opcional da aba Produtos com o estoque mínimo de cada produto
+COLUNA_MINIMO = "Estoque Mínimo"
+# a cada quanto a janela confere se uma gravação encontrou a planilha alterada por outro terminal
+INTERVALO_CONFLITO_MS = 1000
+
+# alterações são gravadas no journal e incorporadas ao Excel em segundo plano
+JOURNAL = JournalAlteracoes()
+
+# leituras e gravações do Excel com a trava (outros terminais podem usar o mesmo arquivo)
+PLANILHA = PlanilhaCompartilhada(EXCEL_FILE)
+
+# índice da coluna chave (primeira coluna) de cada aba: 'produtos', 'vendas', 'vendedores'
+INDICES = {}
+
+# séries do dashboard, atualizadas a cada alteração em Produtos/Vendas
+AGREGADOS = AgregadosDashboard("Código do Produto", "Nome do Produto", "Quantidade",
+                               "Nome do Produto", "Qnt. Vendida", col_minimo=COLUNA_MINIMO)
+
+# thread de E/S (leitura do Excel, gravação final, PDFs); criada junto com a janela
+IO = None
 
 # ------------------- FUNÇÕES DE ARQUIVO -------------------
 def criar_arquivo_modelo_if_missing():
@@ -44,55 +73,50 @@ def criar_arquivo_modelo_if_missing():
         df_vendas.to_excel(writer, sheet_name="Vendas", index=False)
         df_vendedores.to_excel(writer, sheet_name="Vendedores", index=False)
 
-def carregar_planilhas():
-    try:
-        df_produtos = pd.read_excel(EXCEL_FILE, sheet_name="Produtos")
-        df_vendas = pd.read_excel(EXCEL_FILE, sheet_name="Vendas")
-        df_vendedores = pd.read_excel(EXCEL_FILE, sheet_name="Vendedores")
-        df_produtos.columns = df_produtos.columns.astype(str)
-        df_vendas.columns = df_vendas.columns.astype(str)
-        df_vendedores.columns = df_vendedores.columns.astype(str)
-        return df_produtos, df_vendas, df_vendedores
-    except Exception as e:
-        messagebox.showerror("Erro", f"Não foi possível abrir o Excel:\n{e}")
-        return None, None, None
+def carregar_planilhas(colunas=None):
+    # roda na thread de E/S; quem chama mostra o erro
+    # colunas: {"Produtos": [...], ...} para ler só parte das colunas de uma aba
+    # as abas vêm do snapshot binário enquanto o xlsx não mudar (snapshot.py)
+    abas = snapshot.ler_abas(EXCEL_FILE, ["Produtos", "Vendas", "Vendedores"], colunas)
+    faltando = [aba for aba in ("Produtos", "Vendas", "Vendedores") if aba not in abas]
+    if faltando:
+        raise ValueError(f"Aba(s) ausente(s) na planilha: {', '.join(faltando)}")
+    df_produtos, df_vendas, df_vendedores = abas["Produtos"], abas["Vendas"], abas["Vendedores"]
+    df_produtos.columns = df_produtos.columns.astype(str)
+    df_vendas.columns = df_vendas.columns.astype(str)
+    df_vendedores.columns = df_vendedores.columns.astype(str)
+    return df_produtos, df_vendas, df_vendedores
+
+@medir("gravar_planilhas", linhas=lambda r, *dfs: sum(len(df) for df in dfs), detalhe=lambda *dfs: EXCEL_FILE)
+def gravar_planilhas(df_produtos, df_vendas, df_vendedores):
+    with pd.ExcelWriter(EXCEL_FILE, engine="openpyxl") as writer:
+        df_produtos.to_excel(writer, sheet_name="Produtos", index=False)
+        df_vendas.to_excel(writer, sheet_name="Vendas", index=False)
+        df_vendedores.to_excel(writer, sheet_name="Vendedores", index=False)
+    snapshot.atualizar(EXCEL_FILE, {"Produtos": df_produtos, "Vendas": df_vendas, "Vendedores": df_vendedores})
 
-def salvar_planilhas(df_produtos, df_vendas, df_vendedores):
-    try:
-        with pd.ExcelWriter(EXCEL_FILE, engine="openpyxl") as writer:
-            df_produtos.to_excel(writer, sheet_name="Produtos", index=False)
-            df_vendas.to_excel(writer, sheet_name="Vendas", index=False)
-            df_vendedores.to_excel(writer, sheet_name="Vendedores", index=False)
-    except Exception as e:
-        messagebox.showerror("Erro ao salvar", str(e))
+# ------------------- INDICADOR DE OCUPADO -------------------
+def criar_indicador_ocupado(root):
+    # barra de status empacotada antes do notebook para não ser espremida por ele
+    barra = ttkb.Frame(root)
+    barra.pack(side="bottom", fill="x")
+    return IndicadorOcupado(barra)
 
 # ------------------- FUNÇÃO DE REFRESH -------------------
-def atualizar_tree_com_estoque(tree, df, coluna_quantidade="Quantidade"):
-    tree.delete(*tree.get_children())
-    for _, row in df.iterrows():
-        tag = ""
-        if coluna_quantidade in df.columns:
-            qtd = int(row[coluna_quantidade])
-            tag = "baixo" if qtd < LOW_STOCK_THRESHOLD else ""
-        tree.insert("", "end", values=list(row), tags=(tag,))
+def criar_grade_com_estoque(tree, scroll, df, coluna_quantidade="Quantidade"):
+    # Só as linhas visíveis vão para a Treeview; a tag de estoque baixo
+    # é calculada apenas para elas (mínimo da coluna COLUNA_MINIMO, se houver)
+    tag = None
+    if coluna_quantidade in df.columns:
+        idx_qtd = list(df.columns).index(coluna_quantidade)
+        idx_min = list(df.columns).index(COLUNA_MINIMO) if COLUNA_MINIMO in df.columns else None
+        def tag(valores):
+            minimo = valores[idx_min] if idx_min is not None else None
+            if minimo is None or pd.isna(minimo):
+                minimo = LOW_STOCK_THRESHOLD
+            return "baixo" if int(valores[idx_qtd]) < int(minimo) else ""
     tree.tag_configure("baixo", background="#ffcccc")
-
-# ------------------- PADRONIZAÇÃO DE DADOS -------------------
-def padronizar_texto(col, valor):
-    if valor is None:
-        return ""
-    val = str(valor).strip()
-    if col in ["ID do Vendedor", "Código do Produto", "Código de Venda"]:
-        val = val.upper()
-    if col == "Telefone":
-        nums = re.sub(r"\D", "", val)[:11]
-        if len(nums) == 11:
-            val = f"({nums[:2]}) {nums[2:7]}-{nums[7:]}"
-        elif len(nums) == 10:
-            val = f"({nums[:2]}) {nums[2:6]}-{nums[6:]}"
-        else:
-            val = nums
-    return val
+    return GradeVirtual(tree, scroll, FonteDataFrame(df), tag_linha=tag)
 
 # ------------------- TELA DE LOGIN -------------------
 def tela_login(root):
@@ -124,60 +148,17 @@ def tela_login(root):
 
     ttkb.Button(login_win, text="Entrar", bootstyle=SUCCESS, command=tentar_login).pack(pady=20)
     login_win.bind("<Return>", lambda e: tentar_login())
+    login_win.after_idle(lambda: METRICAS.registrar_desde("tempo_ate_login", INICIO_PROCESSO))
     root.wait_window(login_win)
     return resultado["ok"]
 
-# ------------------- DASHBOARD -------------------
-def criar_dashboard(frame_dash, df_produtos, df_vendas):
-    for widget in frame_dash.winfo_children():
-        widget.destroy()
-
-    fig, ax = plt.subplots(1, 2, figsize=(10, 4))
-
-    # Estoque Atual
-    if "Quantidade" in df_produtos.columns:
-        cores = ['#f44336' if q < LOW_STOCK_THRESHOLD else '#2196F3' for q in df_produtos["Quantidade"]]
-        ax[0].bar(df_produtos["Nome do Produto"], df_produtos["Quantidade"], color=cores)
-        ax[0].set_title("Estoque Atual")
-        ax[0].set_ylabel("Quantidade")
-        ax[0].tick_params(axis='x', rotation=45)
-    else:
-        ax[0].text(0.5, 0.5, "Sem informações de estoque", ha="center", va="center")
-
-    # Vendas Totais
-    if not df_vendas.empty and "Qnt. Vendida" in df_vendas.columns:
-        vendas_prod = df_vendas.groupby("Nome do Produto")["Qnt. Vendida"].sum()
-        ax[1].bar(vendas_prod.index, vendas_prod.values, color="#4CAF50")
-        ax[1].set_title("Vendas Totais")
-        ax[1].set_ylabel("Quantidade")
-        ax[1].tick_params(axis='x', rotation=45)
-    else:
-        ax[1].text(0.5, 0.5, "Sem vendas registradas", ha="center", va="center", fontsize=12)
-        ax[1].set_xticks([])
-        ax[1].set_yticks([])
-
-    plt.tight_layout()
-    canvas = FigureCanvasTkAgg(fig, master=frame_dash)
-    canvas.draw()
-    canvas.get_tk_widget().pack(expand=True, fill="both")
-
 # ------------------- FUNÇÃO DE PDF DA NOTA FISCAL -------------------
 def gerar_pdf_nota_fiscal(nf_dados):
-    try:
-        nome_pdf = f"NotaFiscal_{nf_dados.get('Código do Produto','')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        c = canvas.Canvas(nome_pdf, pagesize=A4)
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, 800, f"NOTA FISCAL - Nº {nf_dados.get('Número NF','0001')}")
-
-        c.setFont("Helvetica", 10)
-        y = 770
-        for k,v in nf_dados.items():
-            c.drawString(50, y, f"{k}: {v}")
-            y -= 15
-        c.save()
-        messagebox.showinfo("PDF gerado", f"Arquivo gerado com sucesso: {nome_pdf}")
-    except Exception as e:
-        messagebox.showerror("Erro PDF", str(e))
+    # o PDF é desenhado na thread de E/S; a mensagem aparece quando terminar
+    nome_pdf = f"NotaFiscal_{nf_dados.get('Código do Produto','')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+    IO.executar(nota_fiscal.gerar_pdf, nf_dados, nome_pdf,
+                ao_concluir=lambda nome: messagebox.showinfo("PDF gerado", f"Arquivo gerado com sucesso: {nome}"),
+                ao_falhar=lambda e: messagebox.showerror("Erro PDF", str(e)))
 
 # ------------------- FUNÇÃO PARA CRIAR ABAS COM POP-UP EDITAR -------------------
 def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=None, atualizar_dash=None):
@@ -194,30 +175,31 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
         tree.heading(c, text=c)
         tree.column(c, anchor="center", width=140)
 
-    scroll = ttkb.Scrollbar(left, command=tree.yview)
-    tree.configure(yscrollcommand=scroll.set)
+    scroll = ttkb.Scrollbar(left)
     scroll.pack(side="left", fill="y")
+    grade = criar_grade_com_estoque(tree, scroll, df)
+
+    indice = INDICES[tipo]
 
+    @medir("atualizar_tree", detalhe=lambda: tipo)
     def atualizar_popular_tree():
-        atualizar_tree_com_estoque(tree, df)
+        grade.recarregar()
 
     # ----------- FUNÇÕES ADICIONAR / EDITAR / EXCLUIR -----------
     def preencher_por_chave(entries_local):
         try:
             if "ID do Vendedor" in entries_local:
                 vid = padronizar_texto("ID do Vendedor", entries_local["ID do Vendedor"].get())
-                idxs = df_vendedores.index[df_vendedores["ID do Vendedor"].astype(str)==vid].tolist()
-                if idxs:
-                    idx = idxs[0]
+                idx = INDICES["vendedores"].rotulo(vid)
+                if idx is not None:
                     for col in ["Nome","Telefone","Email"]:
                         if col in entries_local:
                             entries_local[col].delete(0, 'end')
                             entries_local[col].insert(0, str(df_vendedores.at[idx,col]))
             if "Código do Produto" in entries_local:
                 pid = padronizar_texto("Código do Produto", entries_local["Código do Produto"].get())
-                idxs = df_produtos.index[df_produtos["Código do Produto"].astype(str)==pid].tolist()
-                if idxs:
-                    idx = idxs[0]
+                idx = INDICES["produtos"].rotulo(pid)
+                if idx is not None:
                     for col in ["Nome do Produto","Categoria","Valor de Compra","Valor de Venda","Valor de Mercado"]:
                         if col in entries_local:
                             entries_local[col].delete(0, 'end')
@@ -272,19 +254,20 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
                 novo = {}
                 for col in cols:
                     val = padronizar_texto(col, entries_local[col].get())
-                    if col in ["ID do Vendedor","Código do Produto","Código de Venda"]:
-                        if (df[col].astype(str) == val).any():
-                            messagebox.showerror("Erro", f"{col} já existe!")
-                            return
+                    # só a chave da própria aba é única (em Vendas o produto se repete)
+                    if col == cols[0] and val in indice:
+                        messagebox.showerror("Erro", f"{col} já existe!")
+                        return
                     if col in ["Quantidade","Qnt. Vendida"]:
                         val = int(val) if val != "" else 0
                     elif col in ["Valor de Compra","Valor de Venda","Valor de Mercado"]:
                         val = float(val) if val != "" else 0.0
                     novo[col] = val
-                df.loc[len(df)] = [novo[col] for col in cols]
-                salvar_planilhas(df_produtos if df_produtos is not None else df,
-                                df_vendas if df_vendas is not None else df,
-                                df_vendedores if df_vendedores is not None else df)
+                with JOURNAL.lock:
+                    gravar_linha(df, len(df), [novo[col] for col in cols])
+                    indice.adicionar(novo[cols[0]], len(df) - 1)
+                    AGREGADOS.aplicar(tipo, None, novo)
+                    JOURNAL.registrar(tipo, "inserir", novo[cols[0]], novo)
                 atualizar_popular_tree()
                 messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} adicionado(a).")
                 popup.destroy()
@@ -301,7 +284,7 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
         if not sel:
             messagebox.showwarning(tipo.capitalize(), f"Selecione um(a) {tipo[:-1]} para editar.")
             return
-        idx = tree.index(sel[0])
+        idx = grade.posicao_do_item(sel[0])
         popup = Toplevel(frame)
         popup.title(f"Editar {tipo[:-1].capitalize()}")
         popup.geometry("500x500")
@@ -345,20 +328,25 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
 
         def salvar_edicao():
             try:
+                chave_original = str(df.at[idx, cols[0]])
+                antigo = df.loc[idx].to_dict()
+                alterado = {}
                 for col in cols:
                     val = padronizar_texto(col, entries_local[col].get())
                     if col in ["Quantidade","Qnt. Vendida"]:
                         val = int(val)
                     elif col in ["Valor de Compra","Valor de Venda","Valor de Mercado"]:
                         val = float(val)
-                    if col in ["ID do Vendedor","Código do Produto","Código de Venda"]:
-                        if (df[col].astype(str) == val).any() and str(df.at[idx,col]) != val:
-                            messagebox.showerror("Erro", f"{col} já existe!")
-                            return
-                    df.at[idx,col] = val
-                salvar_planilhas(df_produtos if df_produtos is not None else df,
-                                df_vendas if df_vendas is not None else df,
-                                df_vendedores if df_vendedores is not None else df)
+                    if col == cols[0] and str(val) != chave_original and val in indice:
+                        messagebox.showerror("Erro", f"{col} já existe!")
+                        return
+                    alterado[col] = val
+                with JOURNAL.lock:
+                    for col, val in alterado.items():
+                        gravar_valor(df, idx, col, val)
+                    indice.renomear(chave_original, alterado[cols[0]], idx)
+                    AGREGADOS.aplicar(tipo, antigo, df.loc[idx].to_dict())
+                    JOURNAL.registrar(tipo, "atualizar", chave_original, alterado)
                 atualizar_popular_tree()
                 messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} atualizado(a).")
                 popup.destroy()
@@ -374,12 +362,14 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
         if not sel:
             messagebox.showwarning(tipo.capitalize(), f"Selecione um(a) {tipo[:-1]} para excluir.")
             return
-        idx = tree.index(sel[0])
-        df.drop(df.index[idx], inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        salvar_planilhas(df_produtos if df_produtos is not None else df,
-                        df_vendas if df_vendas is not None else df,
-                        df_vendedores if df_vendedores is not None else df)
+        idx = grade.posicao_do_item(sel[0])
+        with JOURNAL.lock:
+            chave = df.at[df.index[idx], cols[0]]
+            AGREGADOS.aplicar(tipo, df.loc[df.index[idx]].to_dict(), None)
+            df.drop(df.index[idx], inplace=True)
+            df.reset_index(drop=True, inplace=True)
+            indice.invalidar()  # rótulos deslocados pelo reset_index
+            JOURNAL.registrar(tipo, "excluir", chave)
         atualizar_popular_tree()
 
     ttkb.Button(right, text="➕ Adicionar", bootstyle=SUCCESS, command=adicionar).grid(row=0, column=0, columnspan=2, sticky="ew", padx=8, pady=(8,3))
@@ -391,13 +381,13 @@ def criar_aba(frame, df, tipo, df_produtos=None, df_vendas=None, df_vendedores=N
 
 # ------------------- JANELA PRINCIPAL -------------------
 def abrir_janela_principal(root, df_produtos, df_vendas, df_vendedores):
-    root.deiconify()
-    root.title("ERP Moderno")
-    root.geometry("1300x750")
-
     notebook = ttkb.Notebook(root, bootstyle="info")
     notebook.pack(expand=True, fill="both")
 
+    for tipo, df in (("produtos", df_produtos), ("vendas", df_vendas), ("vendedores", df_vendedores)):
+        INDICES[tipo] = IndiceChave(df)
+    AGREGADOS.carregar(df_produtos, df_vendas)
+
     # Aba Produtos
     frame_prod = ttkb.Frame(notebook)
     tree_prod = criar_aba(frame_prod, df_produtos, "produtos", df_produtos, df_vendas, df_vendedores)
@@ -417,19 +407,123 @@ def abrir_janela_principal(root, df_produtos, df_vendas, df_vendedores):
     frame_dash = ttkb.Frame(notebook)
     notebook.add(frame_dash, text="Dashboard")
 
+    painel = {}
+
+    @medir("criar_dashboard")
+    def mostrar_dash():
+        # a figura é criada uma vez e só é redesenhada se os agregados mudaram
+        if "dash" not in painel:
+            painel["dash"] = PainelDashboard(frame_dash, LOW_STOCK_THRESHOLD)
+        painel["dash"].atualizar(AGREGADOS)
+
     def carregar_dash(event=None):
         if notebook.index("current") == 3:
-            criar_dashboard(frame_dash, df_produtos, df_vendas)
+            mostrar_dash()
     notebook.bind("<<NotebookTabChanged>>", carregar_dash)
+    return notebook
 
 # ------------------- FLUXO PRINCIPAL -------------------
 if __name__=="__main__":
+    # no executável (PyInstaller) os processos de trabalho (planilha, notas em lote) partem daqui
+    multiprocessing.freeze_support()
     criar_arquivo_modelo_if_missing()
-    df_produtos, df_vendas, df_vendedores = carregar_planilhas()
-    if df_produtos is None:
-        sys.exit(1)
     root = ttkb.Window(themename="darkly")
     root.withdraw()
+    IO = TrabalhadorIO(root, ao_ocupado=criar_indicador_ocupado(root))
+    estado = {"logado": False, "tabelas": None, "compactador": None, "erro": None,
+              "janela": None, "conflito": False}
+
+    def ler_com_journal():
+        df_produtos, df_vendas, df_vendedores = PLANILHA.ler(carregar_planilhas)
+        tabelas = {"produtos": df_produtos, "vendas": df_vendas, "vendedores": df_vendedores}
+        # workbook atrasado em relação ao journal (ex.: app fechado sem compactar)
+        JOURNAL.aplicar(tabelas)
+        return tabelas
+
+    def ler_tabelas():
+        # thread de E/S: lê o Excel enquanto a tela de login está aberta
+        return compactar_tabelas(ler_com_journal())
+
+    def gravar_tabelas(t):
+        # se outro terminal gravou, parte do disco + as alterações deste (journal)
+        gravadas = PLANILHA.gravar(t, lambda t: gravar_planilhas(t["produtos"], t["vendas"], t["vendedores"]),
+                                   recarregar=ler_com_journal)
+        if gravadas is not t:
+            # thread do compactador: a janela é recarregada por verificar_conflito
+            estado["conflito"] = True
+
+    def mostrar_tabelas():
+        t = estado["tabelas"]
+        estado["janela"] = abrir_janela_principal(root, t["produtos"], t["vendas"], t["vendedores"])
+
+    def ler_para_recarga():
+        # thread de E/S; seq de antes da leitura: o que for registrado depois é reaplicado na interface
+        with JOURNAL.lock:
+            seq = JOURNAL.seq
+        return ler_tabelas(), seq
+
+    def recarregar_janela(resultado):
+        tabelas, seq = resultado
+        with JOURNAL.lock:
+            aplicar_registros(tabelas, [r for r in JOURNAL.pendentes() if r["seq"] > seq])
+            estado["tabelas"] = tabelas
+            PLANILHA.desatualizada = False
+        estado["janela"].destroy()
+        mostrar_tabelas()
+        messagebox.showinfo("Planilha atualizada", "Outro terminal gravou a planilha: as abas foram "
+                            "recarregadas com as alterações dele e as deste terminal.")
+
+    def verificar_conflito():
+        if estado["conflito"] and estado["janela"] is not None:
+            estado["conflito"] = False
+            IO.executar(ler_para_recarga, ao_concluir=recarregar_janela,
+                        ao_falhar=lambda e: messagebox.showerror("Erro", f"Não foi possível recarregar o Excel:\n{e}"))
+        root.after(INTERVALO_CONFLITO_MS, verificar_conflito)
+
+    def ao_carregar(tabelas):
+        estado["tabelas"] = tabelas
+        compactador = CompactadorJournal(JOURNAL, lambda: estado["tabelas"], gravar_tabelas)
+        compactador.iniciar()
+        estado["compactador"] = compactador
+        if estado["logado"]:
+            mostrar_tabelas()
+
+    def falha_ao_carregar(e):
+        estado["erro"] = e
+        messagebox.showerror("Erro", f"Não foi possível abrir o Excel:\n{e}")
+        IO.encerrar()
+        root.destroy()
+
+    def ao_fechar():
+        # a gravação final roda na thread de E/S; a janela continua respondendo
+        def fechar(_=None):
+            IO.encerrar()
+            root.destroy()
+        def falhou(e):
+            messagebox.showerror("Erro ao salvar", str(e))
+            fechar()
+        if estado["compactador"] is None:
+            fechar()
+        else:
+            root.protocol("WM_DELETE_WINDOW", lambda: None)
+            IO.executar(estado["compactador"].parar, compactar=True, ao_concluir=fechar, ao_falhar=falhou)
+
+    IO.executar(ler_tabelas, ao_concluir=ao_carregar, ao_falhar=falha_ao_carregar)
+    METRICAS.iniciar_dump()
     if tela_login(root):
-        abrir_janela_principal(root, df_produtos, df_vendas, df_vendedores)
-        root.mainloop()
\ No newline at end of file
+        estado["logado"] = True
+        root.deiconify()
+        root.title("ERP Moderno")
+        root.geometry("1300x750")
+        if estado["tabelas"] is not None:
+            mostrar_tabelas()
+        root.protocol("WM_DELETE_WINDOW", ao_fechar)
+        verificar_conflito()
+        root.mainloop()
+    elif estado["erro"] is None:
+        IO.encerrar()
+        if estado["compactador"] is not None:
+            estado["compactador"].parar(compactar=True)
+    METRICAS.parar_dump()
+    if estado["erro"] is not None:
+        sys.exit(1)
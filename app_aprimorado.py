@@ -1,169 +1,165 @@
-import os
-import sys
+import time
+INICIO_PROCESSO = time.perf_counter()
+
 import sqlite3
-import pandas as pd
-import re
+import multiprocessing
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
-from tkinter import messagebox, Toplevel, Tk, simpledialog
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from tkinter import messagebox, Toplevel, Tk, simpledialog, filedialog
 from datetime import datetime
+import nota_fiscal
+import importacao
+from grade_virtual import GradeVirtual, FonteSQLite, FonteBusca
+from indices import IndiceChave
+from dashboard import AgregadosDashboard, PainelDashboard
+from backup import ServicoBackup
+from trabalhador import TrabalhadorIO, IndicadorOcupado
+from instrumentacao import METRICAS, medir
+from config import BACKUP_INTERVALO, DB_NAME, METRICAS_ARQUIVO
+from core import (DatabaseManager, ConflitoVersao, ErroVenda, ErroValidacao, EstoqueInsuficiente, COLUNAS_BUSCA,
+                  FILTRO_ESTOQUE_BAIXO, consulta_busca, consultar_resumo, contar_estoque_baixo,
+                  alertas_estoque, ultimo_alerta, compactar_tabelas, CacheTabela,
+                  padronizar_texto, validar_dados)
 
 # ------------------- CONFIGURAÇÕES GLOBAIS -------------------
-DB_NAME = "erp_database.db"
 LOW_STOCK_THRESHOLD = 5
 THEME = "darkly"
-
-# ------------------- CLASSE DE BANCO DE DADOS (SQLite) -------------------
-
-class DatabaseManager:
-    def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self._setup_db()
-
-    def _setup_db(self):
-        # Produtos
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Produtos (
-                codigo_produto TEXT PRIMARY KEY,
-                nome_produto TEXT NOT NULL,
-                categoria TEXT,
-                quantidade INTEGER DEFAULT 0,
-                volume TEXT,
-                valor_compra REAL DEFAULT 0.0,
-                valor_venda REAL DEFAULT 0.0,
-                valor_mercado REAL DEFAULT 0.0
-            )
-        """)
-        # Vendedores
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Vendedores (
-                id_vendedor TEXT PRIMARY KEY,
-                nome TEXT NOT NULL,
-                telefone TEXT,
-                email TEXT
-            )
-        """)
-        # Vendas (Adicionado TIMESTAMP para auditoria)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Vendas (
-                codigo_venda TEXT PRIMARY KEY,
-                codigo_produto TEXT,
-                nome_produto TEXT,
-                id_vendedor TEXT,
-                qnt_vendida INTEGER DEFAULT 1,
-                data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        self.conn.commit()
-        self._ensure_initial_data()
-
-    def _ensure_initial_data(self):
-        # Inserir dados de exemplo se as tabelas estiverem vazias
-        if self.cursor.execute("SELECT COUNT(*) FROM Produtos").fetchone()[0] == 0:
-            produtos = [
-                ("001", "Vanish 1L", "Limpeza", 10, "1L", 10.0, 20.0, 35.0),
-                ("002", "Água Sanitária 1L", "Limpeza", 20, "1L", 1.5, 3.0, 4.0),
-            ]
-            self.cursor.executemany("INSERT INTO Produtos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", produtos)
-        
-        if self.cursor.execute("SELECT COUNT(*) FROM Vendedores").fetchone()[0] == 0:
-            vendedores = [("V001", "Fulano", "", "")]
-            self.cursor.executemany("INSERT INTO Vendedores VALUES (?, ?, ?, ?)", vendedores)
-            
-        self.conn.commit()
-
-    def fetch_data(self, table_name, columns=None):
-        cols_str = "*"
-        if columns:
-            cols_str = ", ".join(columns)
-        query = f"SELECT {cols_str} FROM {table_name}"
-        df = pd.read_sql_query(query, self.conn)
-        # Padronizar nomes de colunas para a interface (opcional, mas bom para consistência)
-        # O nome do DB 'codigo_produto' se torna 'Codigo Produto' (sem acento no "o")
-        df.columns = [c.replace('_', ' ').title() if c != 'codigo_produto' else 'Codigo Produto' for c in df.columns]
-        return df
-
-    def execute_query(self, query, params=()):
-        try:
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError as e:
-            if "UNIQUE constraint failed" in str(e):
-                messagebox.showerror("Erro de Integridade", "Chave Duplicada. Este Código/ID já existe.")
-            else:
-                messagebox.showerror("Erro no BD", f"Erro de banco de dados: {e}")
-            return False
-        except Exception as e:
-            messagebox.showerror("Erro no BD", f"Erro inesperado no banco de dados: {e}")
-            return False
-
-    def close(self):
-        self.conn.close()
-
-# ------------------- FUNÇÕES DE UTILIDADE -------------------
-
-def padronizar_texto(col, valor):
-    if valor is None: return ""
-    val = str(valor).strip()
+TIPOS = ["produtos", "vendas", "vendedores"]
+# espera após a última tecla antes de consultar o índice de busca
+ATRASO_BUSCA_MS = 250
+# meses exibidos no gráfico de tendência do Dashboard
+MESES_TENDENCIA = 12
+# atualização do painel de desempenho (F12, só com a instrumentação ligada)
+INTERVALO_PAINEL_MS = 2000
+COLUNAS_DESEMPENHO = ["contagem", "linhas", "total_s", "p50_ms", "p95_ms", "max_ms"]
+# controle de concorrência entre terminais: não aparece na grade nem nos pop-ups
+COLUNA_VERSAO = "Versao"
+
+def gerar_pdf_nota_fiscal(nf_dados, io):
+    # O PDF é desenhado na thread de E/S; a mensagem aparece quando terminar
     # Mudança: 'Codigo Produto' sem acento
-    if col in ["Codigo Produto", "Id Vendedor", "Codigo Venda"]:
-        return val.upper()
-    if col == "Telefone":
-        nums = re.sub(r"\D", "", val)[:11]
-        if len(nums) == 11:
-            return f"({nums[:2]}) {nums[2:7]}-{nums[7:]}"
-        elif len(nums) == 10:
-            return f"({nums[:2]}) {nums[2:6]}-{nums[6:]}"
-        else:
-            return nums
-    return val
-
-def gerar_pdf_nota_fiscal(nf_dados):
-    # Lógica de PDF simplificada (igual à original)
-    try:
-        # Mudança: 'Codigo Produto' sem acento
-        nome_pdf = f"NotaFiscal_{nf_dados.get('Codigo Produto','')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        c = canvas.Canvas(nome_pdf, pagesize=A4)
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, 800, f"NOTA FISCAL - Nº {nf_dados.get('Número Nf','0001')}")
-
-        c.setFont("Helvetica", 10)
-        y = 770
-        for k,v in nf_dados.items():
-            c.drawString(50, y, f"{k}: {v}")
-            y -= 15
-        c.save()
-        messagebox.showinfo("PDF gerado", f"Arquivo gerado com sucesso: {nome_pdf}")
-    except Exception as e:
-        messagebox.showerror("Erro PDF", str(e))
+    nome_pdf = f"NotaFiscal_{nf_dados.get('Codigo Produto','')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+    io.executar(nota_fiscal.gerar_pdf, nf_dados, nome_pdf,
+                ao_concluir=lambda nome: messagebox.showinfo("PDF gerado", f"Arquivo gerado com sucesso: {nome}"),
+                ao_falhar=lambda e: messagebox.showerror("Erro PDF", str(e)))
 
 # ------------------- CLASSE PRINCIPAL DA APLICAÇÃO -------------------
 
 class App:
     def __init__(self, master):
         self.master = master
-        self.db = DatabaseManager(DB_NAME)
         self.master.title("ERP Moderno - Powered by SQLite")
         self.master.geometry("1300x750")
         self.master.withdraw() # Esconde a janela principal até o login
+        self._criar_barra_status()
+
+        # Todo acesso ao BD passa pela thread de E/S, dona da conexão;
+        # a interface só recebe os resultados (callbacks via after())
+        self.io = TrabalhadorIO(self.master, ao_ocupado=self.indicador_ocupado)
+        self.db = None
+        # As grades leem páginas por uma conexão própria, na thread do Tk: é a
+        # única leitura do BD fora da thread de E/S. A rolagem precisa da
+        # página na hora, e numa fila atrás de gravações (ex.: uma importação)
+        # a grade ficaria em branco; cada página é uma busca de poucas dezenas
+        # de linhas pelo índice da chave, e com WAL a leitura não espera a
+        # escrita. A contagem (total) só roda ao trocar a fonte ou recarregar.
+        self.conn_leitura = None
+
+        self.dfs = {}
+        self.colunas_db = {}
+        self.indices = {}
+        # Séries do dashboard, mantidas a cada venda/alteração
+        self.agregados = AgregadosDashboard("Codigo Produto", "Nome Produto", "Quantidade",
+                                            "Nome Produto", "Qnt Vendida", col_minimo="Estoque Minimo")
+        self.painel_dash = None
+
+        self.trees = {}
+        self.grades = {}
+        self._buscas_agendadas = {}  # tipo -> id do after da busca pendente
+        self._textos_busca = {}  # tipo -> StringVar da caixa de busca
+        self._so_estoque_baixo = None  # BooleanVar da aba Produtos
+        self._ultimo_alerta = 0  # id do último alerta de estoque já exibido (lido e gravado na thread de E/S)
+        self._logado = False
+        self._encerrado = False
+
+        # Snapshots do BD em segundo plano (ignorados se nada mudou)
+        self.backup = ServicoBackup()
 
-        # Carrega os dados iniciais do BD para DataFrames temporários
-        self.dfs = {
-            "produtos": self.db.fetch_data("Produtos"),
-            "vendas": self.db.fetch_data("Vendas"),
-            "vendedores": self.db.fetch_data("Vendedores"),
-        }
+        # O BD é aberto e lido enquanto a tela de login está aberta
+        self.io.executar(self._abrir_banco, ao_concluir=self._ao_carregar_tabelas,
+                         ao_falhar=self._falha_ao_abrir_banco)
 
         if self._tela_login():
+            self._logado = True
             self._criar_janela_principal()
+            self._agendar_backup()
+            self.master.protocol("WM_DELETE_WINDOW", self._fechar)
+            if METRICAS.ativa:
+                self.master.bind("<F12>", lambda e: self._abrir_painel_desempenho())
+                METRICAS.iniciar_dump()
         else:
-            self.master.destroy()
+            self._fechar()
+
+    # ------------------- THREAD DE E/S -------------------
+
+    def _abrir_banco(self):
+        # Roda na thread de E/S: a conexão do DatabaseManager fica presa a ela
+        self.db = DatabaseManager(DB_NAME)
+        self.db.ao_erro = lambda titulo, msg: self.io.na_interface(messagebox.showerror, titulo, msg)
+        # As alterações no BD chegam linha a linha; só o que mudou é atualizado
+        self.db.observar(lambda *args: self.io.na_interface(self._ao_alterar_registro, *args))
+        # Caches com tipos compactos (category/int32); a memória vai para a instrumentação
+        dfs = compactar_tabelas({tipo: self.db.fetch_data(tipo.capitalize()) for tipo in TIPOS})
+        colunas = {tipo: self.db.colunas(tipo.capitalize()) for tipo in TIPOS}
+        # Alertas anteriores à abertura não são exibidos de novo
+        self._ultimo_alerta = ultimo_alerta(self.db.conn)
+        return dfs, colunas
+
+    def _ao_carregar_tabelas(self, resultado):
+        dfs, self.colunas_db = resultado
+        # Inclusões e exclusões por linha em tempo constante (CacheTabela)
+        self.dfs = {tipo: CacheTabela(df) for tipo, df in dfs.items()}
+        # Índices hash da chave (primeira coluna) de cada cache
+        self.indices = {tipo: IndiceChave(cache) for tipo, cache in self.dfs.items()}
+        self.agregados.carregar(self.dfs["produtos"].df, self.dfs["vendas"].df)
+        self.conn_leitura = sqlite3.connect(DB_NAME)
+        if self._logado:
+            self._criar_abas()
+
+    def _falha_ao_abrir_banco(self, erro):
+        messagebox.showerror("Erro no BD", f"Não foi possível abrir o banco de dados:\n{erro}")
+        self._fechar()
+
+    def _fechar_banco(self):
+        if self.db is not None:
+            self.db.close()
+
+    def _fechar(self):
+        if self._encerrado:
+            return
+        self._encerrado = True
+        self.master.withdraw()
+        # Espera as gravações já agendadas antes de fechar o BD
+        self.io.executar(self._fechar_banco)
+        self.io.encerrar()
+        # um snapshot do SQLite em andamento termina (a thread é daemon)
+        self.backup.encerrar()
+        METRICAS.parar_dump()
+        if self.conn_leitura is not None:
+            self.conn_leitura.close()
+        self.master.destroy()
+
+    def _criar_barra_status(self):
+        # Empacotada antes do notebook para não ser espremida por ele
+        barra = ttkb.Frame(self.master)
+        barra.pack(side="bottom", fill="x")
+        self.indicador_ocupado = IndicadorOcupado(barra)
+        # Contagem de estoque baixo (clique: filtra a aba Produtos) e último alerta
+        self.lbl_estoque_baixo = ttkb.Label(barra, text="", bootstyle=DANGER, cursor="hand2")
+        self.lbl_estoque_baixo.pack(side="left", padx=8, pady=2)
+        self.lbl_estoque_baixo.bind("<Button-1>", lambda e: self._mostrar_estoque_baixo())
+        self.lbl_alerta = ttkb.Label(barra, text="", bootstyle=WARNING)
+        self.lbl_alerta.pack(side="left", padx=8)
 
     def _tela_login(self):
         login_win = Toplevel(self.master)
@@ -195,6 +191,7 @@ class App:
 
         ttkb.Button(login_win, text="Entrar", bootstyle=SUCCESS, command=tentar_login).pack(pady=20)
         login_win.bind("<Return>", lambda e: tentar_login())
+        login_win.after_idle(lambda: METRICAS.registrar_desde("tempo_ate_login", INICIO_PROCESSO))
         self.master.wait_window(login_win)
         return resultado["ok"]
 
@@ -202,31 +199,19 @@ class App:
         self.master.deiconify()
         self.notebook = ttkb.Notebook(self.master, bootstyle="info")
         self.notebook.pack(expand=True, fill="both")
-        
-        # Cria as abas e armazena as Treeviews para futuras atualizações
-        self.trees = {}
-        
-        # Aba Produtos
-        frame_prod = ttkb.Frame(self.notebook)
-        self.trees["produtos"] = self._criar_aba(frame_prod, "Produtos")
-        self.notebook.add(frame_prod, text="Produtos")
-        self.trees["produtos"] = self._criar_aba(frame_prod, "Produtos")
-        # CHAME A ATUALIZAÇÃO DEPOIS DA ATRIBUIÇÃO
-        self._atualizar_tree("produtos") 
-
-        # Aba Vendas
-        frame_vend = ttkb.Frame(self.notebook)
-        self.trees["vendas"] = self._criar_aba(frame_vend, "Vendas")
-        self.notebook.add(frame_vend, text="Vendas")
-        # CHAME A ATUALIZAÇÃO DEPOIS DA ATRIBUIÇÃO
-        self._atualizar_tree("vendas") 
-
-        # Aba Vendedores
-        frame_vdr = ttkb.Frame(self.notebook)
-        self.trees["vendedores"] = self._criar_aba(frame_vdr, "Vendedores")
-        self.notebook.add(frame_vdr, text="Vendedores")
-        # CHAME A ATUALIZAÇÃO DEPOIS DA ATRIBUIÇÃO
-        self._atualizar_tree("vendedores") 
+        # As abas dependem das tabelas; se a carga ainda não terminou,
+        # são criadas quando ela chegar (_ao_carregar_tabelas)
+        if self.conn_leitura is not None:
+            self._criar_abas()
+
+    def _criar_abas(self):
+        # As Treeviews (e suas grades virtuais) ficam em self.trees / self.grades
+        for tipo in TIPOS:
+            frame = ttkb.Frame(self.notebook)
+            self.trees[tipo] = self._criar_aba(frame, tipo.capitalize())
+            self.notebook.add(frame, text=tipo.capitalize())
+            self.grades[tipo].recarregar()
+        self._atualizar_estoque_baixo()
 
         # Aba Dashboard
         self.frame_dash = ttkb.Frame(self.notebook)
@@ -235,71 +220,90 @@ class App:
         # Atualiza o Dashboard apenas ao selecionar a aba
         self.notebook.bind("<<NotebookTabChanged>>", self._carregar_dash_se_necessario)
         
+    def _agendar_backup(self):
+        self.backup.agendar_sqlite(DB_NAME)
+        self.master.after(BACKUP_INTERVALO * 1000, self._agendar_backup)
+
     def _carregar_dash_se_necessario(self, event=None):
         if self.notebook.index("current") == 3:
             self._criar_dashboard()
 
+    @medir("criar_dashboard")
     def _criar_dashboard(self):
-        for widget in self.frame_dash.winfo_children():
-            widget.destroy()
+        # Uma única Figure/canvas; só redesenha quando os agregados mudaram
+        if self.painel_dash is None:
+            self.painel_dash = PainelDashboard(self.frame_dash, LOW_STOCK_THRESHOLD, tendencia=True)
+        # Tendência: uma linha por mês do resumo, sem agregar a tabela de vendas
+        hoje = datetime.now()
+        mes = hoje.year * 12 + hoje.month - 1 - (MESES_TENDENCIA - 1)  # meses desde o ano 0
+        desde = f"{mes // 12:04d}-{mes % 12 + 1:02d}-01"
+        self.io.executar(consultar_resumo, self.db.conn, "mes", "total", inicio=desde,
+                         ao_concluir=lambda tendencia: self.painel_dash.atualizar(self.agregados, tendencia))
 
-        df_produtos = self.dfs["produtos"]
-        df_vendas = self.dfs["vendas"]
-        
-        fig, ax = plt.subplots(1, 2, figsize=(10, 4))
-        
-        # Estoque Atual
-        if "Quantidade" in df_produtos.columns and not df_produtos.empty:
-            # Mudança: 'Codigo Produto' sem acento
-            cores = ['#f44336' if q < LOW_STOCK_THRESHOLD else '#2196F3' 
-                     for q in df_produtos["Quantidade"].fillna(0)]
-            ax[0].bar(df_produtos["Nome Produto"], df_produtos["Quantidade"], color=cores)
-            ax[0].set_title("Estoque Atual")
-            ax[0].set_ylabel("Quantidade")
-            ax[0].tick_params(axis='x', rotation=45)
-        else:
-            ax[0].text(0.5, 0.5, "Sem informações de estoque", ha="center", va="center")
-
-        # Vendas Totais
-        if not df_vendas.empty and "Qnt Vendida" in df_vendas.columns:
-            # Usar 'Nome Produto' da venda para agrupar
-            vendas_prod = df_vendas.groupby("Nome Produto")["Qnt Vendida"].sum()
-            ax[1].bar(vendas_prod.index, vendas_prod.values, color="#4CAF50")
-            ax[1].set_title("Vendas Totais")
-            ax[1].set_ylabel("Quantidade")
-            ax[1].tick_params(axis='x', rotation=45)
+    def _atualizar_tree(self, tipo):
+        # Recarrega o DataFrame do DB (cache usado no preenchimento e validação)
+        self.io.executar(self.db.fetch_data, tipo.capitalize(), compactar=True,
+                         ao_concluir=lambda df: self._aplicar_tabela(tipo, df))
+
+    @medir("atualizar_tree", linhas=lambda r, self, tipo, df: len(df), detalhe=lambda self, tipo, df: tipo)
+    def _aplicar_tabela(self, tipo, df):
+        self.dfs[tipo] = CacheTabela(df)
+        self.indices[tipo].reconstruir(self.dfs[tipo])
+        if tipo in ("produtos", "vendas"):
+            self.agregados.carregar(self.dfs["produtos"].df, self.dfs["vendas"].df)
+
+        # A Treeview só materializa a janela visível, lida do BD em páginas
+        self.grades[tipo].recarregar()
+
+    def _ao_alterar_registro(self, tabela, operacao, chave, linha):
+        # Aplica no cache e na grade apenas a linha alterada (tempo constante)
+        tipo = tabela.lower()
+        cache = self.dfs[tipo]
+        indice = self.indices[tipo]
+        rotulo = indice.rotulo(chave)
+        if linha is None and operacao != "excluir":
+            # a linha não existe mais no BD: sai do cache se estiver nele
+            if rotulo is None:
+                return
+            operacao = "excluir"
+        antigo = cache.loc[rotulo].to_dict() if rotulo is not None else None
+        novo = dict(zip(cache.columns, linha)) if linha is not None else None
+        self.agregados.aplicar(tipo, antigo, novo)
+        if operacao == "excluir":
+            if rotulo is not None:
+                cache.excluir(rotulo)
+                indice.remover(chave)
+        elif rotulo is not None:
+            cache.gravar(rotulo, list(linha))
+            indice.renomear(chave, linha[0], rotulo)
         else:
-            ax[1].text(0.5, 0.5, "Sem vendas registradas", ha="center", va="center", fontsize=12)
-            ax[1].set_xticks([]); ax[1].set_yticks([])
+            rotulo = cache.incluir(list(linha))
+            indice.adicionar(linha[0], rotulo)
 
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_dash)
-        canvas.draw()
-        canvas.get_tk_widget().pack(expand=True, fill="both")
+        grade = self.grades.get(tipo)
+        if grade is None:
+            return
+        if tipo == "produtos":
+            self._atualizar_estoque_baixo()
+        if isinstance(grade.fonte, FonteBusca) or grade.fonte.filtro:
+            grade.recarregar()  # a linha pode ter entrado ou saído do resultado
+        elif operacao == "atualizar" and str(linha[0]) == str(chave):
+            grade.atualizar_item(str(chave), linha)
+        elif operacao == "atualizar":
+            grade.recarregar_janela()  # chave primária alterada: muda a posição na ordem
+        else:
+            grade.alterar_total(1 if operacao == "inserir" else -1)
+
+    def _tag_estoque(self, colunas_db):
+        # Tag de estoque baixo calculada apenas para as linhas exibidas
+        idx_qtd = colunas_db.index("quantidade")
+        idx_min = colunas_db.index("estoque_minimo")
+        def tag(valores):
+            qtd = valores[idx_qtd] or 0
+            minimo = valores[idx_min]
+            return "baixo" if int(qtd) < (LOW_STOCK_THRESHOLD if minimo is None else int(minimo)) else ""
+        return tag
 
-    def _atualizar_tree(self, tipo):
-        # Recarrega o DataFrame do DB e atualiza a Treeview
-        table_name = tipo.capitalize()
-        # Se self.dfs[tipo] já foi carregado, apenas atualiza.
-        # Se for a primeira vez (na inicialização), ele já foi carregado em __init__.
-        self.dfs[tipo] = self.db.fetch_data(table_name)
-        df = self.dfs[tipo]
-        
-        # O KeyError foi corrigido porque esta função só é chamada agora após a atribuição em self.trees
-        tree = self.trees[tipo] 
-        
-        tree.delete(*tree.get_children())
-        col_qtd = "Quantidade" if tipo == "produtos" else "Qnt Vendida"
-        
-        for _, row in df.iterrows():
-            tag = ""
-            if tipo == "produtos":
-                qtd = int(row.get(col_qtd, 0))
-                tag = "baixo" if qtd < LOW_STOCK_THRESHOLD else ""
-            tree.insert("", "end", values=list(row), tags=(tag,))
-        
-        tree.tag_configure("baixo", background="#ffcccc")
-        
     def _criar_aba(self, frame, tipo):
         tipo_lower = tipo.lower()
         df = self.dfs[tipo_lower]
@@ -309,15 +313,36 @@ class App:
         right = ttkb.Frame(frame, width=360); right.pack(side="right", fill="y", padx=(3,6), pady=6)
         right.pack_propagate(False)
 
-        tree = ttkb.Treeview(left, columns=cols, show="headings")
+        # Busca: filtra a grade pelo índice FTS5 (prefixo, sem acentos)
+        barra_busca = ttkb.Frame(left); barra_busca.pack(side="top", fill="x", pady=(0,6))
+        ttkb.Label(barra_busca, text="🔍").pack(side="left", padx=(0,4))
+        busca_var = ttkb.StringVar()
+        ttkb.Entry(barra_busca, textvariable=busca_var).pack(side="left", expand=True, fill="x")
+        busca_var.trace_add("write", lambda *a: self._agendar_busca(tipo_lower, busca_var.get()))
+        self._textos_busca[tipo_lower] = busca_var
+        if tipo_lower == "produtos":
+            self._so_estoque_baixo = ttkb.BooleanVar(value=False)
+            ttkb.Checkbutton(barra_busca, text="Só estoque baixo", variable=self._so_estoque_baixo,
+                             bootstyle="danger-round-toggle",
+                             command=lambda: self._buscar("produtos", busca_var.get())).pack(side="right", padx=(6,0))
+        ttkb.Label(barra_busca, text=" / ".join(COLUNAS_BUSCA[tipo]), bootstyle=SECONDARY).pack(
+            side="left", padx=(6,0))
+
+        tree = ttkb.Treeview(left, columns=cols, show="headings",
+                             displaycolumns=[c for c in cols if c != COLUNA_VERSAO])
         tree.pack(side="left", expand=True, fill="both")
         for c in cols:
             tree.heading(c, text=c)
             tree.column(c, anchor="center", width=140)
 
-        scroll = ttkb.Scrollbar(left, command=tree.yview)
-        tree.configure(yscrollcommand=scroll.set)
+        scroll = ttkb.Scrollbar(left)
         scroll.pack(side="left", fill="y")
+
+        colunas_db = self.colunas_db[tipo_lower]
+        fonte = FonteSQLite(self.conn_leitura, tipo, colunas_db[0], colunas_db)
+        tag = self._tag_estoque(colunas_db) if tipo_lower == "produtos" else None
+        tree.tag_configure("baixo", background="#ffcccc")
+        self.grades[tipo_lower] = GradeVirtual(tree, scroll, fonte, tag_linha=tag)
         
         # Botões
         ttkb.Button(right, text=f"➕ Adicionar {tipo[:-1]}", bootstyle=SUCCESS, 
@@ -329,10 +354,88 @@ class App:
         ttkb.Button(right, text=f"🗑 Excluir {tipo[:-1]}", bootstyle=DANGER, 
                     command=lambda: self._excluir_registro(tipo_lower, tree)).grid(
                         row=2, column=0, columnspan=2, sticky="ew", padx=8, pady=3)
+        if tipo_lower == "vendas":
+            ttkb.Button(right, text="📥 Importar Vendas", bootstyle=INFO,
+                        command=self._importar_vendas).grid(
+                            row=3, column=0, columnspan=2, sticky="ew", padx=8, pady=3)
         
         # A LINHA self._atualizar_tree(tipo_lower) FOI REMOVIDA DAQUI
         return tree
 
+    def _agendar_busca(self, tipo, texto):
+        # Debounce: só consulta quando o usuário para de digitar
+        pendente = self._buscas_agendadas.pop(tipo, None)
+        if pendente is not None:
+            self.master.after_cancel(pendente)
+        self._buscas_agendadas[tipo] = self.master.after(ATRASO_BUSCA_MS, self._buscar, tipo, texto)
+
+    def _buscar(self, tipo, texto):
+        self._buscas_agendadas.pop(tipo, None)
+        tabela = tipo.capitalize()
+        colunas_db = self.colunas_db[tipo]
+        consulta = consulta_busca(texto)
+        # Estoque baixo: lido pelo índice parcial, sem varrer o catálogo
+        filtro = FILTRO_ESTOQUE_BAIXO if tipo == "produtos" and self._so_estoque_baixo.get() else None
+        if consulta is None:
+            fonte = FonteSQLite(self.conn_leitura, tabela, colunas_db[0], colunas_db, filtro)
+        else:
+            fonte = FonteBusca(self.conn_leitura, tabela, colunas_db[0], colunas_db, consulta, filtro)
+        self.grades[tipo].trocar_fonte(fonte)
+
+    def _atualizar_estoque_baixo(self):
+        self.io.executar(self._ler_estoque_baixo, ao_concluir=self._mostrar_contagem_estoque_baixo)
+
+    def _ler_estoque_baixo(self):
+        # Thread de E/S: contagem pelo índice parcial e alertas gravados pelo
+        # gatilho quando uma baixa cruzou o mínimo (o cursor avança aqui, na ordem das tarefas)
+        novos = alertas_estoque(self.db.conn, self._ultimo_alerta)
+        if novos:
+            self._ultimo_alerta = novos[-1][0]
+        return contar_estoque_baixo(self.db.conn), novos
+
+    def _mostrar_contagem_estoque_baixo(self, resultado):
+        n, novos = resultado
+        self.lbl_estoque_baixo.configure(text=f"⚠ Estoque baixo: {n}" if n else "")
+        if novos:
+            _, codigo, nome, qtd, minimo, _ = novos[-1]
+            extra = f" (+{len(novos) - 1})" if len(novos) > 1 else ""
+            self.lbl_alerta.configure(text=f"{nome or codigo} abaixo do mínimo: {qtd}/{minimo}{extra}")
+            self.master.bell()
+
+    def _mostrar_estoque_baixo(self):
+        if self._so_estoque_baixo is None:
+            return
+        self.notebook.select(TIPOS.index("produtos"))
+        self._so_estoque_baixo.set(True)
+        self._buscar("produtos", self._textos_busca["produtos"].get())
+
+    def _abrir_painel_desempenho(self):
+        # Resumo da instrumentação, relido enquanto a janela estiver aberta
+        painel = Toplevel(self.master)
+        painel.title("Desempenho")
+        painel.geometry("760x360")
+        tree = ttkb.Treeview(painel, columns=["operacao"] + COLUNAS_DESEMPENHO, show="headings")
+        tree.heading("operacao", text="operação")
+        tree.column("operacao", width=180)
+        for c in COLUNAS_DESEMPENHO:
+            tree.heading(c, text=c)
+            tree.column(c, anchor="e", width=90)
+        tree.pack(expand=True, fill="both", padx=8, pady=8)
+
+        def salvar_json():
+            METRICAS.gravar_json()
+            messagebox.showinfo("Desempenho", f"Métricas gravadas em {METRICAS_ARQUIVO}", parent=painel)
+        ttkb.Button(painel, text="Salvar JSON", bootstyle=INFO, command=salvar_json).pack(pady=(0,8))
+
+        def atualizar():
+            if not painel.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for nome, m in METRICAS.resumo().items():
+                tree.insert("", "end", values=[nome] + [m[c] for c in COLUNAS_DESEMPENHO])
+            painel.after(INTERVALO_PAINEL_MS, atualizar)
+        atualizar()
+
     # ------------------- LÓGICA CRUD -------------------
     
     def _abrir_popup_adicionar(self, tipo, cols):
@@ -360,11 +463,16 @@ class App:
         # Mantém a lógica de conversão para o nome da coluna no DB (snake_case)
         pk_col_name = cols[0].replace(' ', '_').lower() # ex: 'Codigo Produto' -> 'codigo_produto'
         
-        popup = Toplevel(self.master); popup.title(f"Editar {tipo[:-1].capitalize()}"); popup.geometry("500x500"); popup.grab_set()
-        
-        # Busca o registro original
+        # Busca o registro original (na thread de E/S) e só então abre o pop-up
         query = f"SELECT * FROM {tipo.capitalize()} WHERE {pk_col_name} = ?"
-        original_record = self.db.cursor.execute(query, (pk_value,)).fetchone()
+        self.io.executar(lambda: self.db.cursor.execute(query, (pk_value,)).fetchone(),
+                         ao_concluir=lambda original_record: self._popup_editar(
+                             tipo, cols, pk_col_name, pk_value, original_record))
+
+    def _popup_editar(self, tipo, cols, pk_col_name, pk_value, original_record):
+        popup = Toplevel(self.master); popup.title(f"Editar {tipo[:-1].capitalize()}"); popup.geometry("500x500"); popup.grab_set()
+        # Versão da linha lida: a gravação só acontece se ninguém a alterou depois
+        versao = original_record[cols.index(COLUNA_VERSAO)] if COLUNA_VERSAO in cols else None
         
         entries_local = self._criar_campos_popup(popup, cols, tipo, original_record)
         
@@ -374,7 +482,8 @@ class App:
                             row=len(cols)+1, column=0, columnspan=2, sticky="ew", padx=8, pady=8)
         
         ttkb.Button(popup, text="Salvar Edição", bootstyle=SUCCESS, 
-                    command=lambda: self._salvar_edicao(tipo, cols, entries_local, popup, pk_col_name, pk_value)).grid(
+                    command=lambda: self._salvar_edicao(tipo, cols, entries_local, popup, pk_col_name, pk_value,
+                                                        versao)).grid(
                         row=len(cols)+(2 if tipo=="produtos" else 1), column=0, columnspan=2, sticky="ew", padx=8, pady=8)
 
     def _criar_campos_popup(self, popup, cols, tipo, record_data=None):
@@ -382,6 +491,7 @@ class App:
         for i, col in enumerate(cols):
             # Ignora a coluna de Data da Venda na edição/adição
             if col == "Data Venda" and tipo == "vendas": continue 
+            if col == COLUNA_VERSAO: continue
                 
             ttkb.Label(popup, text=col + ":").grid(row=i, column=0, sticky="w", padx=8, pady=6)
             ent = ttkb.Entry(popup)
@@ -407,9 +517,8 @@ class App:
             if "Id Vendedor" in entries_local:
                 vid = padronizar_texto("Id Vendedor", entries_local["Id Vendedor"].get())
                 df_vdr = self.dfs["vendedores"]
-                registro = df_vdr[df_vdr["Id Vendedor"] == vid]
-                if not registro.empty:
-                    idx = registro.index[0]
+                idx = self.indices["vendedores"].rotulo(vid)
+                if idx is not None:
                     for col in ["Nome","Telefone","Email"]:
                         if col in entries_local:
                             entries_local[col].delete(0, 'end')
@@ -419,9 +528,8 @@ class App:
             if "Codigo Produto" in entries_local:
                 pid = padronizar_texto("Codigo Produto", entries_local["Codigo Produto"].get())
                 df_prod = self.dfs["produtos"]
-                registro = df_prod[df_prod["Codigo Produto"] == pid]
-                if not registro.empty:
-                    idx = registro.index[0]
+                idx = self.indices["produtos"].rotulo(pid)
+                if idx is not None:
                     for col in ["Nome Produto","Categoria","Valor Compra","Valor Venda","Valor Mercado"]:
                         if col in entries_local:
                             entries_local[col].delete(0, 'end')
@@ -444,61 +552,32 @@ class App:
             nf_dados = {k:v.get() for k,v in entries_nf.items()}
             # Mudança: 'Codigo Produto' sem acento
             nf_dados["Codigo Produto"] = entries_local.get("Codigo Produto").get() if entries_local.get("Codigo Produto") else "N/A"
-            gerar_pdf_nota_fiscal(nf_dados)
+            gerar_pdf_nota_fiscal(nf_dados, self.io)
             nf_popup.destroy()
             
         ttkb.Button(nf_popup, text="Gerar PDF", bootstyle=SUCCESS, command=salvar_nf_pdf).grid(
             row=len(campos_nf)+1, column=0, columnspan=2, sticky="ew", padx=8, pady=8)
 
-    def _validar_dados(self, tipo, data):
-        # Validação básica
-        required_fields = {
-            # Mudança: 'Codigo Produto' sem acento
-            "produtos": ["Codigo Produto", "Nome Produto"],
-            "vendas": ["Codigo Venda", "Codigo Produto", "Nome Produto"],
-            "vendedores": ["Id Vendedor", "Nome"]
-        }
-        
-        for field in required_fields.get(tipo, []):
-            if not data.get(field) or str(data.get(field)).strip() == "":
-                messagebox.showerror("Erro de Validação", f"O campo '{field}' é obrigatório.")
-                return False
-        
-        # Validação de tipos
-        numeric_fields = ["Quantidade", "Qnt Vendida"]
-        float_fields = ["Valor Compra", "Valor Venda", "Valor Mercado"]
-        
-        for k, v in data.items():
-            try:
-                if k in numeric_fields:
-                    data[k] = int(v)
-                elif k in float_fields:
-                    # Permite "," ou "." como separador decimal
-                    v_clean = str(v).replace(',', '.')
-                    data[k] = float(v_clean)
-            except ValueError:
-                messagebox.showerror("Erro de Validação", f"O campo '{k}' deve ser um número válido.")
-                return False
-
-        # Validação de Estoque (apenas para Vendas)
-        if tipo == "vendas" and data.get("Qnt Vendida", 0) <= 0:
-             messagebox.showerror("Erro de Venda", "A quantidade vendida deve ser positiva.")
-             return False
-        if tipo == "vendas":
-            # Mudança: 'Codigo Produto' sem acento
-            pid = data.get("Codigo Produto")
-            qnt_venda = data.get("Qnt Vendida", 0)
-            df_prod = self.dfs["produtos"]
-            registro = df_prod[df_prod["Codigo Produto"] == pid]
-            if registro.empty:
-                 messagebox.showerror("Erro de Venda", "Codigo do Produto não encontrado.")
-                 return False
-            
-            estoque_atual = registro["Quantidade"].iloc[0]
-            if qnt_venda > estoque_atual:
-                messagebox.showwarning("Estoque Insuficiente", f"Estoque disponível: {estoque_atual}. Venda não registrada.")
-                return False
+    def _produto_atual(self, codigo):
+        # Thread de E/S. Estoque lido do BD, não do cache: outro terminal pode ter vendido ou reposto
+        linha = self.db.conn.execute(
+            "SELECT quantidade FROM Produtos WHERE codigo_produto = ?", (codigo,)).fetchone()
+        return None if linha is None else {"Quantidade": linha[0] or 0}
+
+    def _mostrar_erro_validacao(self, e):
+        if e.aviso:
+            messagebox.showwarning(e.titulo, e.mensagem)
+        else:
+            messagebox.showerror(e.titulo, e.mensagem)
 
+    def _validar_dados(self, tipo, data):
+        # Regras no core; aqui só a apresentação do erro. O estoque das
+        # vendas é conferido depois, no BD, pela thread de E/S
+        try:
+            validar_dados(tipo, data)
+        except ErroValidacao as e:
+            self._mostrar_erro_validacao(e)
+            return False
         return True
 
     def _salvar_registro(self, tipo, entries_local, popup):
@@ -511,28 +590,37 @@ class App:
         if not self._validar_dados(tipo, new_data):
             return
 
-        # 3. Prepara a Query (conversão para snake_case do DB)
-        cols_db = [c.replace(' ', '_').lower() for c in new_data.keys()]
-        values = [new_data[c] for c in entries_local.keys()]
-        
-        table_name = tipo.capitalize()
-        placeholders = ', '.join(['?'] * len(cols_db))
-        cols_str = ', '.join(cols_db)
+        # 3. Conversão para snake_case do DB
+        dados_db = {c.replace(' ', '_').lower(): v for c, v in new_data.items()}
         
-        query = f"INSERT INTO {table_name} ({cols_str}) VALUES ({placeholders})"
-        
-        # 4. Executa e Atualiza o Estoque (Se for venda)
-        if self.db.execute_query(query, values):
+        # 4. Executa e Atualiza o Estoque (Se for venda) na thread de E/S; as
+        # grades são atualizadas pelas notificações do DatabaseManager
+        def gravar():
             if tipo == "vendas":
-                # Atualiza o estoque do produto vendido
-                # Mudança: 'Codigo Produto' sem acento
-                self._atualizar_estoque(new_data.get("Codigo Produto"), -new_data.get("Qnt Vendida"))
-            
-            messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} adicionado(a).")
-            self._atualizar_tree(tipo)
-            popup.destroy()
+                # Venda e baixa de estoque numa única transação (o estoque é conferido no BD)
+                self.db.finalizar_venda([dados_db])
+                return True
+            return self.db.inserir(tipo.capitalize(), dados_db)
+
+        def concluido(ok):
+            if ok:
+                messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} adicionado(a).")
+                popup.destroy()
+
+        def falhou(erro):
+            if isinstance(erro, EstoqueInsuficiente):
+                # o cache mostrava o estoque de antes da venda de outro terminal
+                self.io.executar(self.db.recarregar, "Produtos", erro.codigo_produto)
+            if isinstance(erro, ErroVenda):
+                messagebox.showwarning("Erro de Venda", str(erro))
+            elif isinstance(erro, sqlite3.IntegrityError):
+                messagebox.showerror("Erro de Integridade", "Chave Duplicada. Este Código/ID já existe.")
+            else:
+                messagebox.showerror("Erro no BD", str(erro))
+
+        self.io.executar(gravar, ao_concluir=concluido, ao_falhar=falhou)
 
-    def _salvar_edicao(self, tipo, cols, entries_local, popup, pk_col_name, pk_value):
+    def _salvar_edicao(self, tipo, cols, entries_local, popup, pk_col_name, pk_value, versao=None):
         # 1. Coleta e Padroniza os dados
         updated_data = {}
         for col, ent in entries_local.items():
@@ -542,26 +630,37 @@ class App:
         if not self._validar_dados(tipo, updated_data):
             return
         
-        # 3. Prepara a Query (conversão para snake_case do DB)
-        set_clauses = []
-        values = []
-        for col, val in updated_data.items():
-            col_db = col.replace(' ', '_').lower()
-            set_clauses.append(f"{col_db} = ?")
-            values.append(val)
-            
-        query = f"UPDATE {tipo.capitalize()} SET {', '.join(set_clauses)} WHERE {pk_col_name} = ?"
-        values.append(pk_value)
-        
-        # 4. Executa e Atualiza o Estoque (Se for produto ou venda)
-        if tipo == "produtos":
-            # Assume que a 'Quantidade' é o único campo que afeta o estoque diretamente.
-            self._atualizar_tree(tipo) # Apenas para forçar o recarregamento dos dados no DF de cache
-            
-        if self.db.execute_query(query, values):
-            messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} atualizado(a).")
-            self._atualizar_tree(tipo)
+        # 3. Conversão para snake_case do DB
+        dados_db = {c.replace(' ', '_').lower(): v for c, v in updated_data.items()}
+        
+        # 4. Executa (estoque conferido no BD, na thread de E/S); a grade e o
+        # cache recebem só a linha alterada
+        def atualizar():
+            validar_dados(tipo, dict(updated_data), self._produto_atual)
+            return self.db.atualizar(tipo.capitalize(), pk_value, dados_db, versao=versao)
+
+        def concluido(ok):
+            if ok:
+                messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} atualizado(a).")
+                popup.destroy()
+
+        def falhou(erro):
+            if isinstance(erro, ErroValidacao):
+                self._mostrar_erro_validacao(erro)
+                return
+            if not isinstance(erro, ConflitoVersao):
+                messagebox.showerror("Erro no BD", str(erro))
+                return
+            # Outro terminal gravou antes: o pop-up é reaberto com os valores atuais
             popup.destroy()
+            if erro.linha is None:
+                messagebox.showwarning("Conflito de Edição", str(erro))
+                return
+            messagebox.showwarning("Conflito de Edição",
+                                   f"{erro}\nOs valores atuais foram carregados; revise e salve de novo.")
+            self._popup_editar(tipo, cols, pk_col_name, pk_value, erro.linha)
+
+        self.io.executar(atualizar, ao_concluir=concluido, ao_falhar=falhou)
 
     def _excluir_registro(self, tipo, tree):
         sel = tree.selection()
@@ -574,29 +673,57 @@ class App:
         table_name = tipo.capitalize()
         
         if messagebox.askyesno("Confirmar Exclusão", f"Tem certeza que deseja excluir o registro com {pk_col_name.upper()} = {pk_value}?"):
-            query = f"DELETE FROM {table_name} WHERE {pk_col_name} = ?"
-            
-            # Se for venda, reverte o estoque antes de excluir o registro
-            if tipo == "vendas":
-                # Mudança: 'Codigo Produto' sem acento
-                qnt_vendida = self.dfs["vendas"][self.dfs["vendas"][self.dfs["vendas"].columns[0]] == pk_value]["Qnt Vendida"].iloc[0]
-                cod_produto = self.dfs["vendas"][self.dfs["vendas"][self.dfs["vendas"].columns[0]] == pk_value]["Codigo Produto"].iloc[0]
-                self._atualizar_estoque(cod_produto, qnt_vendida) # Reverte o estoque
-                
-            if self.db.execute_query(query, (pk_value,)):
-                messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} excluído(a).")
-                self._atualizar_tree(tipo)
+            def excluir():
+                with self.db.transacao() as tx:
+                    # Se for venda, reverte o estoque antes de excluir o registro
+                    # (a venda é lida do BD: o cache pode não ter as de outro terminal)
+                    venda = self.db.cursor.execute(
+                        "SELECT codigo_produto, qnt_vendida FROM Vendas WHERE codigo_venda = ?",
+                        (pk_value,)).fetchone() if tipo == "vendas" else None
+                    if venda is not None:
+                        cod_produto, qnt_vendida = venda
+                        self._atualizar_estoque(cod_produto, int(qnt_vendida)) # Reverte o estoque
+                    self.db.excluir(table_name, pk_value)
+                return tx.ok
+
+            def concluido(ok):
+                if ok:
+                    messagebox.showinfo(tipo.capitalize(), f"{tipo[:-1].capitalize()} excluído(a).")
+
+            self.io.executar(excluir, ao_concluir=concluido)
+
+    def _importar_vendas(self):
+        caminho = filedialog.askopenfilename(
+            title="Importar Vendas",
+            filetypes=[("Planilhas e CSV", "*.csv *.xlsx"), ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+
+        def concluido(resumo):
+            # a importação não notifica linha a linha: recarrega as duas tabelas
+            self._atualizar_tree("vendas")
+            self._atualizar_tree("produtos")
+            mensagem = f"{resumo['importadas']} de {resumo['total']} vendas importadas."
+            if resumo["rejeitadas"]:
+                mensagem += f"\n{resumo['rejeitadas']} rejeitadas (motivos em {resumo['arquivo_erros']})."
+                messagebox.showwarning("Importar Vendas", mensagem)
+            else:
+                messagebox.showinfo("Importar Vendas", mensagem)
+
+        self.io.executar(importacao.importar_vendas, self.db, caminho, ao_concluir=concluido,
+                         ao_falhar=lambda e: messagebox.showerror("Erro na importação", str(e)))
 
     def _atualizar_estoque(self, codigo_produto, delta_quantidade):
         # NOTA: Esta função não faz validação, assume que a validação de venda já ocorreu.
-        query = "UPDATE Produtos SET quantidade = quantidade + ? WHERE codigo_produto = ?"
-        # O delta é negativo para vendas (-qnt_vendida) e positivo para entradas
-        self.db.execute_query(query, (delta_quantidade, codigo_produto))
-        # Recarrega o DataFrame de produtos para manter o cache atualizado
-        self._atualizar_tree("produtos") 
+        # O delta é negativo para vendas (-qnt_vendida) e positivo para entradas.
+        # Chamada na thread de E/S; o cache e a grade de produtos são
+        # atualizados pela notificação da linha.
+        self.db.ajustar_estoque(codigo_produto, delta_quantidade)
 
 # ------------------- FLUXO PRINCIPAL -------------------
 if __name__=="__main__":
+    # no executável (PyInstaller) os processos de trabalho (planilha, notas em lote) partem daqui
+    multiprocessing.freeze_support()
     root = ttkb.Window(themename=THEME)
     app = App(root)
     root.mainloop()
\ No newline at end of file
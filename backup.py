@@ -0,0 +1,282 @@
+# backup.py
+"""
+Serviço de backup em segundo plano.
+
+- Planilha: cada aba é gravada (jsonl.gz) com o hash do conteúdo como nome,
+  então abas que não mudaram não ocupam espaço de novo. Se o arquivo inteiro
+  não mudou desde o último backup, nada é gravado.
+- Banco SQLite: snapshot pela API de backup do sqlite3, descartado se for
+  idêntico ao anterior.
+
+Cada backup gera um manifesto backups/backup_<data>.json. A retenção
+(config.BACKUP_RETENCAO) apaga manifestos antigos e os dados que nenhum
+manifesto restante referencia. Dados, manifesto e retenção são gravados com
+a trava backups/dados.lock (trava.py): com vários terminais na mesma pasta,
+a retenção de um não apaga os dados que outro acabou de gravar e que o
+manifesto dele ainda vai referenciar.
+"""
+import io
+import os
+import json
+import gzip
+import time
+import uuid
+import queue
+import hashlib
+import sqlite3
+import zipfile
+import threading
+from concurrent.futures import Future
+from datetime import datetime, date, time as hora, timedelta
+from openpyxl import Workbook, load_workbook
+from config import BACKUP_DIR, BACKUP_RETENCAO
+from instrumentacao import medir
+from trava import TravaArquivo
+
+FORMATO_DATA = "%Y%m%d_%H%M%S_%f"
+# planilha lida no meio de uma gravação (zip incompleto): novas tentativas
+TENTATIVAS_LEITURA = 3
+ESPERA_TENTATIVA = 0.5
+
+
+# tipos de célula que o JSON não tem: vão como {"$tipo": ..., "valor": ...}
+# e voltam ao tipo original em restaurar_excel (datetime antes de date, que é a base)
+_TIPOS_CELULA = (("datetime", datetime), ("date", date), ("time", hora), ("timedelta", timedelta))
+
+
+def _codificar_celula(valor):
+    for nome, tipo in _TIPOS_CELULA:
+        if isinstance(valor, tipo):
+            return {"$tipo": nome, "valor": valor.total_seconds() if nome == "timedelta" else valor.isoformat()}
+    return str(valor)
+
+
+def _decodificar_celula(obj):
+    tipo = obj.get("$tipo")
+    if tipo == "timedelta":
+        return timedelta(seconds=obj["valor"])
+    if tipo in ("datetime", "date", "time"):
+        return dict(_TIPOS_CELULA)[tipo].fromisoformat(obj["valor"])
+    return obj
+
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class ServicoBackup:
+    def __init__(self, pasta=BACKUP_DIR, retencao=BACKUP_RETENCAO):
+        self.pasta = pasta
+        self.pasta_dados = os.path.join(pasta, "dados")
+        self.retencao = retencao
+        self._trava = TravaArquivo(self.pasta_dados)
+        self._fila = queue.Queue()
+        self._thread = None
+        self._ultimo_hash = {}
+
+    # ---------- API (pode ser chamada da thread da interface) ----------
+    def agendar_excel(self, caminho):
+        """Agenda o backup da planilha. Retorna um Future com o manifesto (ou None se nada mudou)."""
+        return self._agendar(self._backup_excel, caminho)
+
+    def agendar_sqlite(self, db_path):
+        """Agenda o snapshot do banco. Retorna um Future com o manifesto (ou None se nada mudou)."""
+        return self._agendar(self._backup_sqlite, db_path)
+
+    def encerrar(self, esperar=True):
+        if self._thread is not None:
+            self._fila.put(None)
+            if esperar:
+                self._thread.join()
+            self._thread = None
+
+    def _agendar(self, funcao, *args):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="backup", daemon=True)
+            self._thread.start()
+        futuro = Future()
+        self._fila.put((funcao, args, futuro))
+        return futuro
+
+    def _loop(self):
+        while True:
+            item = self._fila.get()
+            if item is None:
+                break
+            funcao, args, futuro = item
+            try:
+                futuro.set_result(funcao(*args))
+            except Exception as e:
+                # não interrompe a execução se backup falhar
+                print("Erro no backup:", e)
+                futuro.set_exception(e)
+
+    # ---------- Planilha ----------
+    @medir("backup_excel", detalhe=lambda self, caminho: caminho)
+    def _backup_excel(self, caminho):
+        if not os.path.exists(caminho):
+            return None
+        # o arquivo é lido uma vez: o hash e as abas saem da mesma cópia,
+        # mesmo que uma gravação nova o substitua no meio do backup
+        for tentativa in range(TENTATIVAS_LEITURA):
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+            try:
+                wb = load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+                break
+            except zipfile.BadZipFile:
+                if tentativa == TENTATIVAS_LEITURA - 1:
+                    raise
+                time.sleep(ESPERA_TENTATIVA)
+        digest = hashlib.sha256(conteudo).hexdigest()
+        if digest == self._hash_anterior("excel"):
+            wb.close()
+            return None
+        os.makedirs(self.pasta_dados, exist_ok=True)
+        abas = {}
+        try:
+            with self._trava:
+                for nome in wb.sheetnames:
+                    abas[nome] = self._gravar_aba(wb[nome])
+                return self._salvar_manifesto({"tipo": "excel", "origem": caminho, "hash": digest, "abas": abas})
+        finally:
+            wb.close()
+
+    def _gravar_aba(self, ws):
+        h = hashlib.sha256()
+        tmp = os.path.join(self.pasta_dados, f"tmp_{uuid.uuid4().hex}")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for row in ws.iter_rows(values_only=True):
+                linha = json.dumps(row, ensure_ascii=False, default=_codificar_celula)
+                h.update(linha.encode("utf-8"))
+                f.write(linha + "\n")
+        nome = f"{h.hexdigest()}.jsonl.gz"
+        destino = os.path.join(self.pasta_dados, nome)
+        if os.path.exists(destino):
+            os.remove(tmp)  # aba igual a um backup anterior
+        else:
+            os.replace(tmp, destino)
+        return nome
+
+    # ---------- SQLite ----------
+    @medir("backup_sqlite", detalhe=lambda self, db_path: db_path)
+    def _backup_sqlite(self, db_path):
+        if not os.path.exists(db_path):
+            return None
+        os.makedirs(self.pasta_dados, exist_ok=True)
+        tmp = os.path.join(self.pasta_dados, f"tmp_{uuid.uuid4().hex}.db")
+        origem = sqlite3.connect(db_path)
+        destino = sqlite3.connect(tmp)
+        try:
+            origem.backup(destino)
+        finally:
+            destino.close()
+            origem.close()
+        digest = hash_arquivo(tmp)
+        if digest == self._hash_anterior("sqlite"):
+            os.remove(tmp)
+            return None
+        nome = f"{digest}.db"
+        with self._trava:
+            if os.path.exists(os.path.join(self.pasta_dados, nome)):
+                os.remove(tmp)
+            else:
+                os.replace(tmp, os.path.join(self.pasta_dados, nome))
+            return self._salvar_manifesto({"tipo": "sqlite", "origem": db_path, "hash": digest, "arquivo": nome})
+
+    # ---------- Manifestos e retenção ----------
+    def _manifestos(self, tipo=None):
+        """Lista (data, caminho, manifesto), do mais recente para o mais antigo."""
+        if not os.path.isdir(self.pasta):
+            return []
+        itens = []
+        for nome in os.listdir(self.pasta):
+            if not (nome.startswith("backup_") and nome.endswith(".json")):
+                continue
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                data = datetime.strptime(nome[len("backup_"):-len(".json")], FORMATO_DATA)
+                with open(caminho, encoding="utf-8") as f:
+                    manifesto = json.load(f)
+            except (ValueError, OSError):
+                continue
+            if tipo is None or manifesto.get("tipo") == tipo:
+                itens.append((data, caminho, manifesto))
+        itens.sort(key=lambda item: item[0], reverse=True)
+        return itens
+
+    def _hash_anterior(self, tipo):
+        if tipo not in self._ultimo_hash:
+            manifestos = self._manifestos(tipo)
+            self._ultimo_hash[tipo] = manifestos[0][2].get("hash") if manifestos else None
+        return self._ultimo_hash[tipo]
+
+    def _salvar_manifesto(self, manifesto):
+        agora = datetime.now()
+        manifesto["data"] = agora.isoformat(timespec="seconds")
+        caminho = os.path.join(self.pasta, f"backup_{agora.strftime(FORMATO_DATA)}.json")
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        self._ultimo_hash[manifesto["tipo"]] = manifesto["hash"]
+        self.aplicar_retencao()
+        return caminho
+
+    def aplicar_retencao(self):
+        """Mantém o backup mais recente de cada hora/dia/semana, conforme self.retencao."""
+        if not os.path.isdir(self.pasta):
+            return
+        os.makedirs(self.pasta_dados, exist_ok=True)
+        with self._trava:
+            self._aplicar_retencao()
+
+    def _aplicar_retencao(self):
+        faixas = {
+            "horario": lambda d: d.strftime("%Y%m%d%H"),
+            "diario": lambda d: d.strftime("%Y%m%d"),
+            "semanal": lambda d: "%d-%02d" % d.isocalendar()[:2],
+        }
+        referenciados = set()
+        for tipo in ("excel", "sqlite"):
+            manifestos = self._manifestos(tipo)
+            manter = {m[1] for m in manifestos[:1]}
+            for faixa, limite in self.retencao.items():
+                chave = faixas[faixa]
+                vistos = []
+                for data, caminho, _ in manifestos:
+                    k = chave(data)
+                    if k in vistos:
+                        continue
+                    if len(vistos) >= limite:
+                        break
+                    vistos.append(k)
+                    manter.add(caminho)
+            for data, caminho, manifesto in manifestos:
+                if caminho not in manter:
+                    os.remove(caminho)
+                    continue
+                referenciados.update(manifesto.get("abas", {}).values())
+                if manifesto.get("arquivo"):
+                    referenciados.add(manifesto["arquivo"])
+
+        if os.path.isdir(self.pasta_dados):
+            for nome in os.listdir(self.pasta_dados):
+                if nome not in referenciados and not nome.startswith("tmp_"):
+                    os.remove(os.path.join(self.pasta_dados, nome))
+
+
+def restaurar_excel(manifesto_path, destino):
+    """Reconstrói a planilha de um manifesto de backup, com as células nos tipos originais."""
+    with open(manifesto_path, encoding="utf-8") as f:
+        manifesto = json.load(f)
+    pasta_dados = os.path.join(os.path.dirname(manifesto_path), "dados")
+    wb = Workbook(write_only=True)
+    for aba, nome in manifesto["abas"].items():
+        ws = wb.create_sheet(aba)
+        with gzip.open(os.path.join(pasta_dados, nome), "rt", encoding="utf-8") as f:
+            for linha in f:
+                ws.append(json.loads(linha, object_hook=_decodificar_celula))
+    wb.save(destino)
@@ -0,0 +1,405 @@
+# benchmarks/bench_erp.py
+"""
+Benchmark dos dois backends (planilha e SQLite) com dados sintéticos.
+
+Gera um catálogo, vendedores e um histórico de vendas na escala pedida,
+grava produtos.xlsx e erp_database.db numa pasta de trabalho e mede os
+pontos de entrada reais: carregar_tabelas/carregar_planilhas (com e sem
+o snapshot das abas), salvar_tabelas, DatabaseManager.fetch_data, a
+leitura de páginas da grade (e a Treeview, se houver display), os
+agregados do dashboard, o registro de vendas e a geração de PDFs. O
+resultado vai para um JSON; com --comparar, os tempos são conferidos
+contra um JSON anterior e o código de saída é 1 se algo ficou mais lento
+que a tolerância.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_erp --escala 100k [--saida bench_100k.json]
+    python -m benchmarks.bench_erp --produtos 5000 --vendas 200000 --backend sqlite
+    python -m benchmarks.bench_erp --escala 100k --comparar bench_100k_v1.json
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+import app
+import database
+import nota_fiscal
+import snapshot
+from config import EXCEL_FILE, DB_NAME, LOGIN_SHEET
+from core import DatabaseManager, compactar_tabelas, memoria_tabelas
+from dashboard import AgregadosDashboard
+from grade_virtual import GradeVirtual, FonteSQLite, FonteDataFrame
+from journal import JournalAlteracoes
+
+ESCALAS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+LINHAS_PAGINA = 80
+VENDAS_REGISTRADAS = 200
+NOTAS = 200
+TOLERANCIA = 0.20
+
+NOMES = ["Água Sanitária", "Sabão em Pó", "Café", "Açúcar", "Feijão", "Arroz", "Óleo", "Detergente"]
+CATEGORIAS = ["Limpeza", "Mercearia", "Bebidas", "Higiene"]
+
+# colunas do banco -> cabeçalhos da planilha (como o app.py cria o modelo)
+CABECALHOS = {
+    "Produtos": {
+        "codigo_produto": "Código do Produto", "nome_produto": "Nome do Produto",
+        "categoria": "Categoria", "quantidade": "Quantidade", "volume": "Volume",
+        "valor_compra": "Valor de Compra", "valor_venda": "Valor de Venda",
+        "valor_mercado": "Valor de Mercado",
+    },
+    "Vendas": {
+        "codigo_venda": "Código de Venda", "codigo_produto": "Código do Produto",
+        "nome_produto": "Nome do Produto", "id_vendedor": "ID do Vendedor",
+        "qnt_vendida": "Qnt. Vendida",
+    },
+    "Vendedores": {"id_vendedor": "ID do Vendedor", "nome": "Nome", "telefone": "Telefone", "email": "Email"},
+}
+
+
+# ------------------- DADOS SINTÉTICOS -------------------
+
+def gerar_dados(produtos, vendas, vendedores, seed=42):
+    """DataFrames com as colunas do banco: {'Produtos': df, 'Vendas': df, 'Vendedores': df}."""
+    rng = np.random.default_rng(seed)
+    cod_produtos = np.char.add("P", np.char.zfill(np.arange(produtos).astype(str), 7))
+    nomes = np.char.add(np.char.add(rng.choice(NOMES, produtos), " "), np.arange(produtos).astype(str))
+    compra = rng.uniform(1, 50, produtos).round(2)
+    df_produtos = pd.DataFrame({
+        "codigo_produto": cod_produtos,
+        "nome_produto": nomes,
+        "categoria": rng.choice(CATEGORIAS, produtos),
+        # estoque folgado: o registro de vendas não pode parar por falta de produto
+        "quantidade": rng.integers(VENDAS_REGISTRADAS, 10 * VENDAS_REGISTRADAS, produtos),
+        "volume": rng.choice(["500ml", "1L", "2L", "1kg", "5kg"], produtos),
+        "valor_compra": compra,
+        "valor_venda": (compra * 1.6).round(2),
+        "valor_mercado": (compra * 1.9).round(2),
+    })
+
+    ids_vendedores = np.char.add("V", np.char.zfill(np.arange(vendedores).astype(str), 5))
+    df_vendedores = pd.DataFrame({
+        "id_vendedor": ids_vendedores,
+        "nome": np.char.add("Vendedor ", np.arange(vendedores).astype(str)),
+        "telefone": rng.integers(10 ** 10, 10 ** 11, vendedores).astype(str),
+        "email": np.char.add(np.char.lower(ids_vendedores), "@loja.com"),
+    })
+
+    escolhidos = rng.integers(0, produtos, vendas)
+    segundos = rng.integers(0, 365 * 86400, vendas)
+    df_vendas = pd.DataFrame({
+        "codigo_venda": np.char.add("S", np.char.zfill(np.arange(vendas).astype(str), 8)),
+        "codigo_produto": cod_produtos[escolhidos],
+        "nome_produto": nomes[escolhidos],
+        "id_vendedor": rng.choice(ids_vendedores, vendas),
+        "qnt_vendida": rng.integers(1, 6, vendas),
+        "data_venda": (pd.Timestamp("2025-01-01") + pd.to_timedelta(segundos, unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    return {"Produtos": df_produtos, "Vendas": df_vendas, "Vendedores": df_vendedores}
+
+
+def gravar_planilha(dados, caminho):
+    """Workbook no formato do app.py (com a aba de login), gravado em streaming."""
+    wb = Workbook(write_only=True)
+    for aba, cabecalhos in CABECALHOS.items():
+        ws = wb.create_sheet(aba)
+        df = dados[aba][list(cabecalhos)]
+        ws.append(list(cabecalhos.values()))
+        for linha in df.itertuples(index=False, name=None):
+            ws.append([v.item() if isinstance(v, np.generic) else v for v in linha])
+    ws = wb.create_sheet(LOGIN_SHEET)
+    ws.append(["user", "pass"])
+    ws.append(["admin", "1234"])
+    wb.save(caminho)
+
+
+def gravar_banco(dados, caminho):
+    db = DatabaseManager(caminho)
+    try:
+        with db.conn:
+            for tabela, df in dados.items():
+                cols = list(df.columns)
+                db.conn.executemany(
+                    f"INSERT OR REPLACE INTO {tabela} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
+                    df.astype(object).itertuples(index=False, name=None))
+    finally:
+        db.close()
+
+
+# ------------------- MEDIÇÃO -------------------
+
+def medir(funcao, repeticoes, depois=None):
+    """Roda funcao() `repeticoes` vezes; `depois` (fora do tempo) roda após cada uma."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if depois is not None:
+            depois()
+    return {"min": min(tempos), "mediana": statistics.median(tempos), "repeticoes": repeticoes}
+
+
+def _memoria(dfs):
+    """MB das tabelas com os tipos padrão e depois de compactar_tabelas."""
+    return {"padrao": memoria_tabelas(dfs) / 2 ** 20,
+            "compacto": memoria_tabelas(compactar_tabelas(dfs)) / 2 ** 20}
+
+
+def _janela_tk():
+    """(root, tree, scroll) para medir a Treeview, ou None sem display."""
+    import tkinter
+    from tkinter import ttk
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        return None
+    root.withdraw()
+    tree = ttk.Treeview(root, show="headings", height=30)
+    scroll = ttk.Scrollbar(root)
+    return root, tree, scroll
+
+
+def medir_grade(fonte, colunas, repeticoes):
+    """
+    Leitura das páginas que a grade pede (início, meio por salto e a página
+    seguinte, por chave) e, com display, o recarregar() da GradeVirtual.
+    """
+    def paginas():
+        total = fonte.total()
+        fonte.invalidar()
+        fonte.linhas(0, LINHAS_PAGINA)
+        fonte.linhas(total // 2, LINHAS_PAGINA)
+        fonte.linhas(total // 2 + LINHAS_PAGINA, LINHAS_PAGINA)
+
+    resultados = {"paginas": medir(paginas, repeticoes)}
+    tk = _janela_tk()
+    if tk is None:
+        resultados["treeview"] = None  # sem display
+        return resultados
+    root, tree, scroll = tk
+    try:
+        tree.configure(columns=colunas)
+        grade = GradeVirtual(tree, scroll, fonte)
+        resultados["treeview"] = medir(lambda: (grade.recarregar(), root.update_idletasks()), repeticoes)
+    finally:
+        root.destroy()
+    return resultados
+
+
+def bench_planilha(dados, repeticoes, n_vendas):
+    resultados = {}
+    # frio: sem snapshot, as abas vêm do openpyxl; depois, do snapshot deixado pela leitura anterior
+    snapshot.descartar(EXCEL_FILE)
+    resultados["carregar_planilhas_frio"] = medir(app.carregar_planilhas, repeticoes,
+                                                  depois=lambda: snapshot.descartar(EXCEL_FILE))
+    app.carregar_planilhas()
+    resultados["carregar_planilhas"] = medir(app.carregar_planilhas, repeticoes)
+    resultados["carregar_tabelas"] = medir(database.carregar_tabelas, repeticoes)
+
+    tabelas = database.carregar_tabelas()
+    resultados["memoria_mb"] = _memoria(tabelas)
+    # o backup agendado pelo salvamento termina antes da próxima medição
+    resultados["salvar_tabelas"] = medir(lambda: database.salvar_tabelas(tabelas), repeticoes,
+                                         depois=lambda: database.SERVICO_BACKUP.encerrar(esperar=True))
+
+    df_produtos = tabelas["produtos"]
+    resultados["grade"] = medir_grade(FonteDataFrame(df_produtos), list(df_produtos.columns), repeticoes)
+
+    agregados = AgregadosDashboard("Código do Produto", "Nome do Produto", "Quantidade",
+                                   "Nome do Produto", "Qnt. Vendida")
+    resultados["dashboard_carregar"] = medir(lambda: agregados.carregar(tabelas["produtos"], tabelas["vendas"]),
+                                             repeticoes)
+
+    # venda no app.py: linha nova em Vendas, gravada só no journal
+    journal = JournalAlteracoes()
+    produtos = dados["Produtos"]
+    vendedor = dados["Vendedores"]["id_vendedor"].iat[0]
+    ultimo = [0]
+
+    def registrar():
+        for i in range(n_vendas):
+            j = i % len(produtos)
+            venda = {"Código de Venda": f"B{i:08d}", "Código do Produto": produtos["codigo_produto"].iat[j],
+                     "Nome do Produto": produtos["nome_produto"].iat[j], "ID do Vendedor": vendedor,
+                     "Qnt. Vendida": 1}
+            ultimo[0] = database.registrar_alteracao(journal, tabelas, "vendas", "inserir",
+                                                     venda["Código de Venda"], venda)
+
+    def desfazer():
+        # as vendas de teste saem do journal e das tabelas antes da próxima rodada
+        journal.truncar(ultimo[0])
+        tabelas.update(database.carregar_tabelas(journal))
+
+    tempo = medir(registrar, repeticoes, depois=desfazer)
+    resultados["registrar_venda"] = dict(tempo, vendas=n_vendas, por_venda=tempo["mediana"] / n_vendas)
+    return resultados
+
+
+def bench_sqlite(dados, repeticoes, n_vendas, n_notas):
+    resultados = {}
+    db = DatabaseManager(DB_NAME)
+    try:
+        for tabela in ("Produtos", "Vendas", "Vendedores"):
+            resultados[f"fetch_data_{tabela.lower()}"] = medir(lambda: db.fetch_data(tabela), repeticoes)
+
+        conn = sqlite3.connect(DB_NAME)
+        try:
+            colunas = db.colunas("Produtos")
+            resultados["grade"] = medir_grade(FonteSQLite(conn, "Produtos", colunas[0], colunas), colunas, repeticoes)
+        finally:
+            conn.close()
+
+        df_produtos, df_vendas = db.fetch_data("Produtos"), db.fetch_data("Vendas")
+        resultados["memoria_mb"] = _memoria({"produtos": df_produtos, "vendas": df_vendas,
+                                             "vendedores": db.fetch_data("Vendedores")})
+        agregados = AgregadosDashboard("Codigo Produto", "Nome Produto", "Quantidade",
+                                       "Nome Produto", "Qnt Vendida", col_minimo="Estoque Minimo")
+        resultados["dashboard_carregar"] = medir(lambda: agregados.carregar(df_produtos, df_vendas), repeticoes)
+
+        produtos = dados["Produtos"]["codigo_produto"]
+        vendedor = dados["Vendedores"]["id_vendedor"].iat[0]
+
+        def registrar():
+            # uma venda (um carrinho de um item) por transação, como no app
+            for i in range(n_vendas):
+                db.finalizar_venda([{"codigo_produto": produtos.iat[i % len(produtos)], "qnt_vendida": 1}],
+                                   id_vendedor=vendedor)
+
+        tempo = medir(registrar, repeticoes)
+        resultados["registrar_venda"] = dict(tempo, vendas=n_vendas, por_venda=tempo["mediana"] / n_vendas)
+    finally:
+        db.close()
+
+    codigos = dados["Vendas"]["codigo_venda"].iloc[:n_notas].tolist()
+    notas = nota_fiscal.carregar_vendas(DB_NAME, codigos=codigos)
+    resultados["pdf_nota"] = medir(lambda: nota_fiscal.gerar_pdf(notas[0], "nota_bench.pdf"), repeticoes)
+    tempo = medir(lambda: nota_fiscal.gerar_lote(notas, combinado="notas_bench.pdf"), repeticoes)
+    resultados["pdf_lote"] = dict(tempo, notas=len(notas))
+    return resultados
+
+
+# ------------------- RELATÓRIO -------------------
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _tempos(resultados, prefixo=""):
+    """Achata o dict de resultados em {'sqlite.grade.paginas': mediana}."""
+    tempos = {}
+    for nome, valor in resultados.items():
+        if isinstance(valor, dict) and "mediana" in valor:
+            tempos[prefixo + nome] = valor["mediana"]
+        elif isinstance(valor, dict):
+            tempos.update(_tempos(valor, f"{prefixo}{nome}."))
+    return tempos
+
+
+def comparar(atual, anterior, tolerancia=TOLERANCIA):
+    """Lista (medida, antes, agora) do que ficou mais lento que a tolerância."""
+    antes = _tempos(anterior["resultados"])
+    agora = _tempos(atual["resultados"])
+    return [(nome, antes[nome], t) for nome, t in agora.items()
+            if nome in antes and t > antes[nome] * (1 + tolerancia)]
+
+
+def imprimir(relatorio):
+    print(f"Escala: {relatorio['parametros']}")
+    for nome, t in _tempos(relatorio["resultados"]).items():
+        print(f"  {nome:<40} {t * 1000:10.1f} ms")
+    for backend, resultados in relatorio["resultados"].items():
+        if "memoria_mb" in resultados:
+            m = resultados["memoria_mb"]
+            print(f"  {backend + '.memoria':<40} {m['padrao']:8.1f} MB -> {m['compacto']:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da planilha e do SQLite com dados sintéticos.")
+    parser.add_argument("--escala", choices=ESCALAS, default="1k", help="produtos e vendas (padrão: 1k)")
+    parser.add_argument("--produtos", type=int, help="substitui a escala")
+    parser.add_argument("--vendas", type=int, help="substitui a escala")
+    parser.add_argument("--vendedores", type=int, help="padrão: 1%% dos produtos (mín. 10)")
+    parser.add_argument("--backend", choices=["planilha", "sqlite", "ambos"], default="ambos")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--vendas-registradas", type=int, default=VENDAS_REGISTRADAS)
+    parser.add_argument("--notas", type=int, default=NOTAS, help="notas do lote de PDFs")
+    parser.add_argument("--pasta", help="pasta de trabalho (padrão: temporária)")
+    parser.add_argument("--saida", default="benchmark.json")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    produtos = args.produtos or ESCALAS[args.escala]
+    vendas = args.vendas or ESCALAS[args.escala]
+    vendedores = args.vendedores or max(10, produtos // 100)
+    saida = os.path.abspath(args.saida)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    pasta = os.path.abspath(args.pasta or tempfile.mkdtemp(prefix="bench_erp_"))
+    os.makedirs(pasta, exist_ok=True)
+    # os apps usam caminhos relativos (planilha, banco, journal, backups)
+    os.chdir(pasta)
+
+    inicio = time.perf_counter()
+    dados = gerar_dados(produtos, vendas, vendedores)
+    geracao = {}
+    if args.backend in ("planilha", "ambos"):
+        t = time.perf_counter()
+        gravar_planilha(dados, EXCEL_FILE)
+        geracao["planilha"] = time.perf_counter() - t
+    if args.backend in ("sqlite", "ambos"):
+        t = time.perf_counter()
+        gravar_banco(dados, DB_NAME)
+        geracao["sqlite"] = time.perf_counter() - t
+    print(f"Dados gerados em {pasta} ({time.perf_counter() - inicio:.1f}s)")
+
+    resultados = {}
+    if args.backend in ("planilha", "ambos"):
+        resultados["planilha"] = bench_planilha(dados, args.repeticoes, args.vendas_registradas)
+    if args.backend in ("sqlite", "ambos"):
+        resultados["sqlite"] = bench_sqlite(dados, args.repeticoes, args.vendas_registradas, args.notas)
+
+    relatorio = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _commit(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {"produtos": produtos, "vendas": vendas, "vendedores": vendedores,
+                       "repeticoes": args.repeticoes, "vendas_registradas": args.vendas_registradas,
+                       "notas": args.notas},
+        "geracao_segundos": geracao,
+        "resultados": resultados,
+    }
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    imprimir(relatorio)
+    print(f"Resultados em {saida}")
+
+    if anterior is not None:
+        regressoes = comparar(relatorio, anterior, args.tolerancia)
+        for nome, antes, agora in regressoes:
+            print(f"  REGRESSÃO {nome}: {antes * 1000:.1f} ms -> {agora * 1000:.1f} ms")
+        sys.exit(1 if regressoes else 0)
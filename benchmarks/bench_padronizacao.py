@@ -0,0 +1,59 @@
+# benchmarks/bench_padronizacao.py
+"""
+Compara padronizar_texto (uma célula por vez) com padronizar_coluna (Series
+inteira) numa lista sintética de vendedores, e confere que o resultado é igual.
+As colunas são object, onde padronizar_texto roda uma vez por célula; numa
+coluna category as duas formas só passam pelas categorias distintas.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_padronizacao [--linhas 1000000]
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from core import padronizar_texto, padronizar_coluna
+
+
+def gerar_vendedores(linhas, seed=42):
+    rng = np.random.default_rng(seed)
+    ids = pd.Series(rng.integers(0, 10 ** 6, linhas)).map(lambda n: f" v{n:06d} ")
+    ddd = rng.integers(11, 99, linhas).astype(str)
+    numero = rng.integers(10 ** 7, 10 ** 9, linhas).astype(str)
+    formatos = rng.integers(0, 4, linhas)
+    telefone = np.where(formatos == 0, "(" + ddd + ") 9" + numero,
+               np.where(formatos == 1, ddd + numero,
+               np.where(formatos == 2, " +55 " + ddd + " " + numero, numero)))
+    return pd.DataFrame({
+        "Id Vendedor": ids,
+        "Nome": pd.Series(rng.choice(["Fulano", " Beltrano ", "Ciclano"], linhas)),
+        "Telefone": pd.Series(telefone, dtype=object),
+    })
+
+
+def medir(df):
+    resultado = {}
+    for col in df.columns:
+        inicio = time.perf_counter()
+        por_celula = df[col].map(lambda v: padronizar_texto(col, v))
+        t_celula = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        por_coluna = padronizar_coluna(col, df[col])
+        t_coluna = time.perf_counter() - inicio
+
+        if por_celula.tolist() != por_coluna.tolist():
+            raise AssertionError(f"Resultados diferentes na coluna {col}")
+        resultado[col] = (t_celula, t_coluna)
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de padronização por célula x por coluna.")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = gerar_vendedores(args.linhas)
+    print(f"{args.linhas:,} linhas")
+    for col, (t_celula, t_coluna) in medir(df).items():
+        print(f"  {col:<12} por célula {t_celula:6.2f}s | por coluna {t_coluna:6.2f}s | {t_celula / t_coluna:5.1f}x")
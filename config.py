@@ -1,7 +1,30 @@
 EXCEL_FILE = "produtos.xlsx"
+DB_NAME = "erp_database.db"
 BACKUP_DIR = "backups"
 LOW_STOCK_THRESHOLD = 5
 
 LOGIN_SHEET = "Login"
 DEFAULT_ADMIN_USER = "admin"
-DEFAULT_ADMIN_PASS = "1234"
\ No newline at end of file
+DEFAULT_ADMIN_PASS = "1234"
+
+# Journal de alterações (persistência incremental da planilha)
+JOURNAL_FILE = "produtos.journal"
+JOURNAL_INTERVALO_COMPACTACAO = 30  # segundos entre compactações em segundo plano
+
+# Snapshot binário das abas (pasta ao lado da planilha), refeito quando o xlsx muda
+SNAPSHOT_DIR = ".snapshots"
+
+# Planilha compartilhada entre terminais: trava <planilha>.lock (trava.py)
+TRAVA_ESPERA = 60  # segundos esperando outro terminal terminar de gravar
+TRAVA_VALIDADE = 300  # trava mais velha que isso (terminal que caiu) é descartada
+
+# Backups: quantos manter por faixa (o mais recente de cada hora/dia/semana)
+BACKUP_RETENCAO = {"horario": 24, "diario": 7, "semanal": 4}
+BACKUP_INTERVALO = 3600  # segundos entre backups automáticos do banco SQLite
+
+# Instrumentação (desligada; também liga com a variável de ambiente ERP_INSTRUMENTACAO=1)
+INSTRUMENTACAO = False
+LIMIAR_LENTO_MS = 200  # operações acima disso vão para o log de lentas
+LOG_OPERACOES_LENTAS = "operacoes_lentas.log"
+METRICAS_ARQUIVO = "metricas.json"
+METRICAS_INTERVALO = 60  # segundos entre gravações do metricas.json
@@ -0,0 +1,1163 @@
+# core.py
+"""
+Núcleo do ERP sem interface gráfica: armazenamento (SQLite), validação,
+estoque e padronização de dados. Os apps Tk ficam por cima deste módulo,
+e scripts (migração, notas em lote, importações) podem usá-lo diretamente.
+"""
+import re
+import json
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from contextlib import contextmanager
+from datetime import datetime
+from config import LOW_STOCK_THRESHOLD
+from instrumentacao import METRICAS, medir
+
+# ------------------- CLASSE DE BANCO DE DADOS (SQLite) -------------------
+
+# Ajustes de desempenho aplicados a cada conexão
+PRAGMAS = {
+    "journal_mode": "WAL",       # leitores não bloqueiam o escritor
+    "synchronous": "NORMAL",     # seguro com WAL, sem fsync a cada commit
+    "cache_size": -64000,        # ~64 MB de cache de páginas
+    "mmap_size": 268435456,      # 256 MB mapeados em memória
+    "temp_store": "MEMORY",
+    # INSERT OR REPLACE também dispara os gatilhos de exclusão (mantém a busca em dia)
+    "recursive_triggers": "ON",
+}
+
+# Busca de texto (FTS5): tabela -> colunas indexadas em <tabela>_busca
+COLUNAS_BUSCA = {
+    "Produtos": ["codigo_produto", "nome_produto", "categoria"],
+    "Vendas": ["codigo_venda", "nome_produto", "id_vendedor"],
+    "Vendedores": ["id_vendedor", "nome"],
+}
+
+def _sql_busca(tabela, colunas):
+    """
+    Índice FTS5 de conteúdo externo (o texto fica só na tabela original),
+    sem acentos e sem diferenciar maiúsculas, sincronizado por gatilhos.
+    """
+    busca = f"{tabela}_busca"
+    cols = ", ".join(colunas)
+    novos = ", ".join(f"new.{c}" for c in colunas)
+    antigos = ", ".join(f"old.{c}" for c in colunas)
+    apagar = f"INSERT INTO {busca}({busca}, rowid, {cols}) VALUES ('delete', old.rowid, {antigos});"
+    inserir = f"INSERT INTO {busca}(rowid, {cols}) VALUES (new.rowid, {novos});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {busca} USING fts5({cols}, content='{tabela}', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {busca}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS {busca}_ad AFTER DELETE ON {tabela} BEGIN {apagar} END",
+        # só as colunas indexadas: baixas de estoque não mexem no índice
+        f"CREATE TRIGGER IF NOT EXISTS {busca}_au AFTER UPDATE OF {cols} ON {tabela} BEGIN {apagar} {inserir} END",
+        f"INSERT INTO {busca}({busca}) VALUES ('rebuild')",
+    ]
+
+# Resumos de vendas por período (início do dia/semana/mês) e dimensão,
+# mantidos pelos gatilhos de Vendas. 'total' soma todas as vendas do período.
+PERIODOS_RESUMO = {
+    "dia": "date({v}.data_venda)",
+    "semana": "date({v}.data_venda, 'weekday 0', '-6 days')",  # semana começa na segunda
+    "mes": "date({v}.data_venda, 'start of month')",
+}
+DIMENSOES_RESUMO = {
+    "produto": "COALESCE({v}.codigo_produto, '')",
+    # categoria atual do produto (gatilhos de Produtos mudam o resumo junto)
+    "categoria": "COALESCE((SELECT categoria FROM Produtos WHERE codigo_produto = {v}.codigo_produto), '')",
+    "vendedor": "COALESCE({v}.id_vendedor, '')",
+    "total": "''",
+}
+
+def _chaves_resumo(v):
+    # (periodo, inicio, dimensao, chave) de uma linha de Vendas: uma por combinação
+    periodos = " UNION ALL ".join(f"SELECT '{p}' AS periodo, {e.format(v=v)} AS inicio"
+                                  for p, e in PERIODOS_RESUMO.items())
+    dimensoes = " UNION ALL ".join(f"SELECT '{d}' AS dimensao, {e.format(v=v)} AS chave"
+                                   for d, e in DIMENSOES_RESUMO.items())
+    return f"({periodos}) p, ({dimensoes}) d WHERE p.inicio IS NOT NULL"
+
+def _somar_resumo(v, sinal):
+    return (f"INSERT INTO ResumoVendas (periodo, inicio, dimensao, chave, quantidade, vendas) "
+            f"SELECT p.periodo, p.inicio, d.dimensao, d.chave, {sinal}COALESCE({v}.qnt_vendida, 0), {sinal}1 "
+            f"FROM {_chaves_resumo(v)} "
+            f"ON CONFLICT (periodo, inicio, dimensao, chave) DO UPDATE SET "
+            f"quantidade = quantidade + excluded.quantidade, vendas = vendas + excluded.vendas;")
+
+def _sql_preencher_resumo():
+    return " UNION ALL ".join(
+        f"SELECT '{p}', {ep.format(v='v')}, '{d}', {ed.format(v='v')}, SUM(COALESCE(v.qnt_vendida, 0)), COUNT(*) "
+        f"FROM Vendas v WHERE v.data_venda IS NOT NULL GROUP BY 2, 4"
+        for p, ep in PERIODOS_RESUMO.items() for d, ed in DIMENSOES_RESUMO.items())
+
+def _sql_resumo():
+    retirar = _somar_resumo("old", "-")
+    # o resumo que zerou sai da tabela
+    limpar = (f"DELETE FROM ResumoVendas WHERE vendas <= 0 AND (periodo, inicio, dimensao, chave) IN "
+              f"(SELECT p.periodo, p.inicio, d.dimensao, d.chave FROM {_chaves_resumo('old')});")
+    return [
+        """CREATE TABLE IF NOT EXISTS ResumoVendas (
+            periodo TEXT NOT NULL,
+            inicio TEXT NOT NULL,
+            dimensao TEXT NOT NULL,
+            chave TEXT NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            vendas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (periodo, dimensao, inicio, chave)
+        ) WITHOUT ROWID""",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_vendas_ai AFTER INSERT ON Vendas BEGIN {_somar_resumo('new', '')} END",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_vendas_ad AFTER DELETE ON Vendas BEGIN {retirar} {limpar} END",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_vendas_au AFTER UPDATE OF codigo_produto, id_vendedor, qnt_vendida, "
+        f"data_venda ON Vendas BEGIN {retirar} {limpar} {_somar_resumo('new', '')} END",
+        f"INSERT INTO ResumoVendas (periodo, inicio, dimensao, chave, quantidade, vendas) {_sql_preencher_resumo()}",
+    ]
+
+def _mover_categoria(codigo, de, para):
+    # passa os resumos das vendas do produto (dimensão produto) da categoria 'de' para 'para'
+    mover = ""
+    for categoria, sinal in ((de, "-"), (para, "")):
+        mover += (f"INSERT INTO ResumoVendas (periodo, inicio, dimensao, chave, quantidade, vendas) "
+                  f"SELECT periodo, inicio, 'categoria', {categoria}, {sinal}quantidade, {sinal}vendas "
+                  f"FROM ResumoVendas WHERE dimensao = 'produto' AND chave = COALESCE({codigo}, '') "
+                  f"ON CONFLICT (periodo, inicio, dimensao, chave) DO UPDATE SET "
+                  f"quantidade = quantidade + excluded.quantidade, vendas = vendas + excluded.vendas; ")
+    return mover + (f"DELETE FROM ResumoVendas WHERE dimensao = 'categoria' AND chave IN ({de}, {para}) "
+                    f"AND vendas <= 0;")
+
+def _sql_resumo_categoria():
+    """
+    O resumo por categoria usa a categoria atual do produto (a mesma que os
+    gatilhos de Vendas consultam ao retirar uma venda): quando ela muda, ou
+    o produto é excluído/recriado, as vendas dele mudam de categoria junto.
+    Produto inexistente conta na categoria ''.
+    """
+    antiga, nova, nenhuma = "COALESCE(old.categoria, '')", "COALESCE(new.categoria, '')", "''"
+    return [
+        "CREATE INDEX IF NOT EXISTS idx_resumo_chave ON ResumoVendas(dimensao, chave)",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_categoria_ai AFTER INSERT ON Produtos "
+        f"BEGIN {_mover_categoria('new.codigo_produto', nenhuma, nova)} END",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_categoria_ad AFTER DELETE ON Produtos "
+        f"BEGIN {_mover_categoria('old.codigo_produto', antiga, nenhuma)} END",
+        f"CREATE TRIGGER IF NOT EXISTS resumo_categoria_au AFTER UPDATE OF codigo_produto, categoria ON Produtos "
+        f"WHEN new.codigo_produto IS NOT old.codigo_produto OR new.categoria IS NOT old.categoria "
+        f"BEGIN {_mover_categoria('old.codigo_produto', antiga, nenhuma)} "
+        f"{_mover_categoria('new.codigo_produto', nenhuma, nova)} END",
+        # resumos já gravados com a categoria errada
+        "DELETE FROM ResumoVendas",
+        f"INSERT INTO ResumoVendas (periodo, inicio, dimensao, chave, quantidade, vendas) {_sql_preencher_resumo()}",
+    ]
+
+# Estoque baixo: mesma expressão do índice parcial, para o planejador usá-lo
+FILTRO_ESTOQUE_BAIXO = "quantidade < estoque_minimo"
+
+def _sql_estoque_baixo():
+    return [
+        f"ALTER TABLE Produtos ADD COLUMN estoque_minimo INTEGER NOT NULL DEFAULT {int(LOW_STOCK_THRESHOLD)}",
+        # só os produtos abaixo do mínimo entram no índice
+        f"CREATE INDEX IF NOT EXISTS idx_produtos_estoque_baixo ON Produtos(codigo_produto) "
+        f"WHERE {FILTRO_ESTOQUE_BAIXO}",
+        """CREATE TABLE IF NOT EXISTS AlertasEstoque (
+            id INTEGER PRIMARY KEY,
+            codigo_produto TEXT NOT NULL,
+            nome_produto TEXT,
+            quantidade INTEGER,
+            estoque_minimo INTEGER,
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        # alerta só na passagem para baixo do mínimo (não a cada venda seguinte)
+        """CREATE TRIGGER IF NOT EXISTS alerta_estoque_au AFTER UPDATE OF quantidade, estoque_minimo ON Produtos
+            WHEN new.quantidade < new.estoque_minimo AND NOT (old.quantidade < old.estoque_minimo)
+            BEGIN
+                INSERT INTO AlertasEstoque (codigo_produto, nome_produto, quantidade, estoque_minimo)
+                VALUES (new.codigo_produto, new.nome_produto, new.quantidade, new.estoque_minimo);
+            END""",
+    ]
+
+# Versão da linha de Produtos (controle otimista entre terminais): toda
+# alteração avança a versão, venha do app, da importação ou de outra
+# ferramenta; quem edita grava só se a versão ainda for a que leu
+def _sql_versao():
+    return [
+        "ALTER TABLE Produtos ADD COLUMN versao INTEGER NOT NULL DEFAULT 0",
+        # o UPDATE do gatilho muda só a versão: não dispara de novo (WHEN) nem
+        # os gatilhos de busca e de alerta (UPDATE OF outras colunas)
+        """CREATE TRIGGER IF NOT EXISTS versao_produtos_au AFTER UPDATE ON Produtos
+            WHEN new.versao = old.versao
+            BEGIN
+                UPDATE Produtos SET versao = old.versao + 1 WHERE rowid = new.rowid;
+            END""",
+    ]
+
+# Log de alterações (change data capture) de Produtos e Vendas: cada
+# inclusão, alteração e exclusão vira uma linha de Alteracoes, gravada pelo
+# gatilho na mesma transação. seq só cresce (AUTOINCREMENT não reaproveita
+# números) e, como o SQLite tem um escritor por vez, a ordem de seq é a
+# ordem de commit: quem leu até seq N nunca vê aparecer depois um N' < N.
+# dados é a linha em JSON: a nova (inserir/atualizar) ou a apagada (excluir).
+COLUNAS_ALTERACOES = {
+    "Produtos": ["codigo_produto", "nome_produto", "categoria", "quantidade", "volume", "valor_compra",
+                 "valor_venda", "valor_mercado", "estoque_minimo", "versao"],
+    "Vendas": ["codigo_venda", "codigo_produto", "nome_produto", "id_vendedor", "qnt_vendida", "data_venda"],
+}
+
+def _json_linha(tabela, prefixo=""):
+    return "json_object(" + ", ".join(f"'{c}', {prefixo}{c}" for c in COLUNAS_ALTERACOES[tabela]) + ")"
+
+def _registrar_alteracao(tabela, operacao, linha):
+    return (f"INSERT INTO Alteracoes (tabela, operacao, chave, dados) VALUES ('{tabela}', '{operacao}', "
+            f"{linha}.{COLUNAS_ALTERACOES[tabela][0]}, {_json_linha(tabela, linha + '.')});")
+
+def _sql_alteracoes():
+    comandos = [
+        """CREATE TABLE IF NOT EXISTS Alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela TEXT NOT NULL,
+            operacao TEXT NOT NULL,
+            chave TEXT,
+            dados TEXT,
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]
+    for tabela, colunas in COLUNAS_ALTERACOES.items():
+        pk = colunas[0]
+        # em Produtos, toda alteração termina no UPDATE do gatilho de versão,
+        # que já traz a linha final: registra só ele (uma linha por alteração)
+        quando = "WHEN new.versao <> old.versao" if tabela == "Produtos" else ""
+        comandos += [
+            f"CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela.lower()}_ai AFTER INSERT ON {tabela} "
+            f"BEGIN {_registrar_alteracao(tabela, 'inserir', 'new')} END",
+            f"CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela.lower()}_ad AFTER DELETE ON {tabela} "
+            f"BEGIN {_registrar_alteracao(tabela, 'excluir', 'old')} END",
+            f"CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela.lower()}_au AFTER UPDATE ON {tabela} {quando} "
+            f"BEGIN {_registrar_alteracao(tabela, 'atualizar', 'new')} END",
+            # código trocado: para quem sincroniza pela chave, a antiga deixa de existir
+            f"CREATE TRIGGER IF NOT EXISTS alteracoes_{tabela.lower()}_au_chave AFTER UPDATE OF {pk} ON {tabela} "
+            f"WHEN new.{pk} IS NOT old.{pk} BEGIN {_registrar_alteracao(tabela, 'excluir', 'old')} END",
+            # o que já existe entra como inclusão: ler desde 0 reconstrói as tabelas
+            f"INSERT INTO Alteracoes (tabela, operacao, chave, dados) "
+            f"SELECT '{tabela}', 'inserir', {pk}, {_json_linha(tabela)} FROM {tabela} ORDER BY rowid",
+        ]
+    return comandos
+
+# Migrações do esquema: a posição i leva o banco da versão i para i+1
+# (versão guardada em PRAGMA user_version). Só acrescente no fim.
+MIGRACOES = [
+    # 1: índices para as consultas de vendas, estoque e relatórios
+    [
+        "CREATE INDEX IF NOT EXISTS idx_vendas_codigo_produto ON Vendas(codigo_produto)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_id_vendedor ON Vendas(id_vendedor)",
+        "CREATE INDEX IF NOT EXISTS idx_vendas_data_venda ON Vendas(data_venda)",
+        "CREATE INDEX IF NOT EXISTS idx_produtos_quantidade ON Produtos(quantidade)",
+        "CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON Produtos(categoria)",
+    ],
+    # 2: busca de texto nas abas
+    [sql for tabela, colunas in COLUNAS_BUSCA.items() for sql in _sql_busca(tabela, colunas)],
+    # 3: resumos de vendas por dia/semana/mês
+    _sql_resumo(),
+    # 4: estoque mínimo por produto e alertas de estoque baixo
+    _sql_estoque_baixo(),
+    # 5: versão das linhas de Produtos
+    _sql_versao(),
+    # 6: log de alterações de Produtos e Vendas
+    _sql_alteracoes(),
+    # 7: resumo por categoria acompanha a categoria do produto
+    _sql_resumo_categoria(),
+]
+SCHEMA_VERSION = len(MIGRACOES)
+
+class ErroValidacao(Exception):
+    """Dado inválido num cadastro; 'titulo' é usado no aviso da interface."""
+    def __init__(self, titulo, mensagem, aviso=False):
+        super().__init__(mensagem)
+        self.titulo = titulo
+        self.mensagem = mensagem
+        self.aviso = aviso  # True: só um alerta (ex.: estoque insuficiente)
+
+class ErroVenda(Exception):
+    """Venda recusada; nada foi gravado."""
+
+class ProdutoNaoEncontrado(ErroVenda):
+    pass
+
+class EstoqueInsuficiente(ErroVenda):
+    def __init__(self, codigo_produto, disponivel, pedido):
+        super().__init__(f"Estoque insuficiente para {codigo_produto}: disponível {disponivel}, pedido {pedido}.")
+        self.codigo_produto = codigo_produto
+        self.disponivel = disponivel
+        self.pedido = pedido
+
+class ConflitoVersao(Exception):
+    """A linha foi alterada (ou excluída) por outro terminal depois de lida; nada foi gravado."""
+    def __init__(self, tabela, chave, linha):
+        situacao = "alterado(a)" if linha is not None else "excluído(a)"
+        super().__init__(f"{tabela} {chave} foi {situacao} em outro terminal.")
+        self.tabela = tabela
+        self.chave = chave
+        self.linha = linha  # tupla atual (None se excluída)
+
+def _pedidos_carrinho(itens):
+    """Quantidade pedida por produto num carrinho (confere se são positivas)."""
+    pedidos = {}
+    for item in itens:
+        qnt = int(item["qnt_vendida"])
+        if qnt <= 0:
+            raise ErroVenda("A quantidade vendida deve ser positiva.")
+        cod = str(item["codigo_produto"])
+        pedidos[cod] = pedidos.get(cod, 0) + qnt
+    return pedidos
+
+class DatabaseManager:
+    def __init__(self, db_name):
+        self.conn = sqlite3.connect(db_name)
+        self.cursor = self.conn.cursor()
+        # ao_erro(titulo, mensagem): como avisar erros de execute_query
+        # (a interface usa messagebox.showerror; sem interface, imprime)
+        self.ao_erro = None
+        self._colunas = {}
+        self._observadores = []
+        self._transacao = 0
+        self._falhou = False
+        self._notificacoes_pendentes = []
+        self._aplicar_pragmas()
+        self._setup_db()
+
+    def _aplicar_pragmas(self):
+        for nome, valor in PRAGMAS.items():
+            self.conn.execute(f"PRAGMA {nome} = {valor}")
+
+    def _setup_db(self):
+        # Produtos
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Produtos (
+                codigo_produto TEXT PRIMARY KEY,
+                nome_produto TEXT NOT NULL,
+                categoria TEXT,
+                quantidade INTEGER DEFAULT 0,
+                volume TEXT,
+                valor_compra REAL DEFAULT 0.0,
+                valor_venda REAL DEFAULT 0.0,
+                valor_mercado REAL DEFAULT 0.0
+            )
+        """)
+        # Vendedores
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Vendedores (
+                id_vendedor TEXT PRIMARY KEY,
+                nome TEXT NOT NULL,
+                telefone TEXT,
+                email TEXT
+            )
+        """)
+        # Vendas (Adicionado TIMESTAMP para auditoria)
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Vendas (
+                codigo_venda TEXT PRIMARY KEY,
+                codigo_produto TEXT,
+                nome_produto TEXT,
+                id_vendedor TEXT,
+                qnt_vendida INTEGER DEFAULT 1,
+                data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.conn.commit()
+        self._migrar()
+        self._ensure_initial_data()
+
+    def versao_schema(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrar(self):
+        # Atualiza bancos existentes no próprio arquivo, uma migração por transação
+        versao = self.versao_schema()
+        for numero in range(versao, SCHEMA_VERSION):
+            self.conn.execute("BEGIN")
+            try:
+                for comando in MIGRACOES[numero]:
+                    self.conn.execute(comando)
+                self.conn.execute(f"PRAGMA user_version = {numero + 1}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def _ensure_initial_data(self):
+        # Inserir dados de exemplo se as tabelas estiverem vazias
+        if self.cursor.execute("SELECT COUNT(*) FROM Produtos").fetchone()[0] == 0:
+            produtos = [
+                ("001", "Vanish 1L", "Limpeza", 10, "1L", 10.0, 20.0, 35.0),
+                ("002", "Água Sanitária 1L", "Limpeza", 20, "1L", 1.5, 3.0, 4.0),
+            ]
+            self.cursor.executemany(
+                "INSERT INTO Produtos (codigo_produto, nome_produto, categoria, quantidade, volume, "
+                "valor_compra, valor_venda, valor_mercado) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", produtos)
+        
+        if self.cursor.execute("SELECT COUNT(*) FROM Vendedores").fetchone()[0] == 0:
+            vendedores = [("V001", "Fulano", "", "")]
+            self.cursor.executemany(
+                "INSERT INTO Vendedores (id_vendedor, nome, telefone, email) VALUES (?, ?, ?, ?)", vendedores)
+            
+        self.conn.commit()
+
+    @medir("fetch_data", linhas=lambda df, *a, **k: len(df),
+           detalhe=lambda self, table_name, columns=None, compactar=False: f"{table_name} {columns or '*'}")
+    def fetch_data(self, table_name, columns=None, compactar=False):
+        # columns: projeção (só as colunas pedidas); compactar: tipos compactos (compactar_tabela)
+        cols_str = "*"
+        if columns:
+            cols_str = ", ".join(columns)
+        query = f"SELECT {cols_str} FROM {table_name}"
+        df = pd.read_sql_query(query, self.conn)
+        # Padronizar nomes de colunas para a interface (opcional, mas bom para consistência)
+        # O nome do DB 'codigo_produto' se torna 'Codigo Produto' (sem acento no "o")
+        df.columns = [c.replace('_', ' ').title() if c != 'codigo_produto' else 'Codigo Produto' for c in df.columns]
+        return compactar_tabela(df) if compactar else df
+
+    def colunas(self, table_name):
+        # Nomes das colunas no BD (snake_case), na ordem da tabela
+        if table_name not in self._colunas:
+            self._colunas[table_name] = [r[1] for r in self.conn.execute(f"PRAGMA table_info({table_name})")]
+        return self._colunas[table_name]
+
+    # ---------- Notificação de alterações por linha ----------
+    def observar(self, callback):
+        # callback(tabela, operacao, chave, linha) é chamado após cada alteração
+        # bem-sucedida; 'linha' é a tupla atual (None em exclusões)
+        self._observadores.append(callback)
+
+    def _notificar(self, tabela, operacao, chave, linha=None):
+        if self._transacao:
+            # só avisa depois do commit (descarta se houver rollback)
+            self._notificacoes_pendentes.append((tabela, operacao, chave, linha))
+            return
+        for callback in self._observadores:
+            callback(tabela, operacao, chave, linha)
+
+    @contextmanager
+    def transacao(self):
+        """
+        Agrupa várias chamadas (execute_query, inserir, ajustar_estoque...) num único commit.
+        Se alguma falhar, tudo é desfeito e o bloco recebe False em .ok.
+        """
+        self._transacao += 1
+        resultado = SimpleNamespace(ok=True)
+        try:
+            yield resultado
+        except Exception:
+            self._falhou = True
+            raise
+        finally:
+            self._transacao -= 1
+            if self._transacao == 0:
+                pendentes, self._notificacoes_pendentes = self._notificacoes_pendentes, []
+                if self._falhou:
+                    self.conn.rollback()
+                    resultado.ok = False
+                else:
+                    self.conn.commit()
+                    for notificacao in pendentes:
+                        self._notificar(*notificacao)
+                self._falhou = False
+
+    def _buscar_linha(self, table_name, pk_value):
+        pk_col = self.colunas(table_name)[0]
+        return self.conn.execute(f"SELECT * FROM {table_name} WHERE {pk_col} = ?", (pk_value,)).fetchone()
+
+    def inserir(self, table_name, dados):
+        cols = list(dados.keys())
+        query = f"INSERT INTO {table_name} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})"
+        if not self.execute_query(query, [dados[c] for c in cols]):
+            return False
+        chave = dados[self.colunas(table_name)[0]]
+        self._notificar(table_name, "inserir", chave, self._buscar_linha(table_name, chave))
+        return True
+
+    def atualizar(self, table_name, pk_value, dados, versao=None):
+        # versao: a da linha que foi editada (tabelas com a coluna 'versao').
+        # Se outro terminal a alterou depois, nada é gravado, os observadores
+        # recebem a linha atual e ConflitoVersao é lançada.
+        pk_col = self.colunas(table_name)[0]
+        set_clauses = ', '.join(f"{c} = ?" for c in dados.keys())
+        query = f"UPDATE {table_name} SET {set_clauses} WHERE {pk_col} = ?"
+        params = list(dados.values()) + [pk_value]
+        if versao is not None:
+            query += " AND versao = ?"
+            params.append(versao)
+        if not self.execute_query(query, params):
+            return False
+        if versao is not None and self.cursor.rowcount == 0:
+            self._falhou = bool(self._transacao)
+            raise ConflitoVersao(table_name, pk_value, self.recarregar(table_name, pk_value))
+        linha = self._buscar_linha(table_name, dados.get(pk_col, pk_value))
+        if linha is not None:  # nenhuma linha com a chave: nada mudou
+            self._notificar(table_name, "atualizar", pk_value, linha)
+        return True
+
+    def recarregar(self, table_name, pk_value):
+        """
+        Repassa aos observadores a linha como está no BD (ex.: o cache tinha
+        um estoque velho, alterado por outro terminal). Retorna a linha.
+        """
+        linha = self._buscar_linha(table_name, pk_value)
+        if linha is None:
+            self._notificar(table_name, "excluir", pk_value)
+        else:
+            self._notificar(table_name, "atualizar", pk_value, linha)
+        return linha
+
+    def excluir(self, table_name, pk_value):
+        pk_col = self.colunas(table_name)[0]
+        if not self.execute_query(f"DELETE FROM {table_name} WHERE {pk_col} = ?", (pk_value,)):
+            return False
+        self._notificar(table_name, "excluir", pk_value)
+        return True
+
+    def finalizar_venda(self, itens, id_vendedor=None):
+        """
+        Registra um carrinho inteiro numa única transação: confere o estoque,
+        insere todas as Vendas (executemany) e baixa as quantidades, cada uma
+        condicionada a ainda haver estoque (quantidade >= pedido).
+        Não usa a interface: erros viram exceções (ErroVenda, sqlite3.IntegrityError)
+        e, nesse caso, nada é gravado.
+
+        itens: lista de dicts com 'codigo_produto' e 'qnt_vendida'; opcionais
+        'codigo_venda' (gerado se ausente), 'id_vendedor' e 'nome_produto'.
+        Retorna a lista de codigo_venda gravados.
+        """
+        if self._transacao:
+            raise RuntimeError("finalizar_venda não pode ser chamada dentro de transacao()")
+        if not itens:
+            return []
+
+        pedidos = _pedidos_carrinho(itens)
+        # IMMEDIATE: reserva a escrita já na leitura do estoque
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            codigos = self._gravar_carrinho(itens, pedidos, id_vendedor, datetime.now().strftime("%Y%m%d%H%M%S%f"))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._notificar_vendas(codigos, list(pedidos))
+        return codigos
+
+    def finalizar_vendas(self, carrinhos):
+        """
+        Vários carrinhos (lista de (itens, id_vendedor)) numa única transação,
+        com um só commit. Cada carrinho fica num SAVEPOINT: um recusado
+        (ErroVenda, chave repetida, ...) não desfaz os outros.
+        Retorna, na ordem dos carrinhos, a lista de codigo_venda gravados ou
+        a exceção que recusou o carrinho.
+        """
+        if self._transacao:
+            raise RuntimeError("finalizar_vendas não pode ser chamada dentro de transacao()")
+        prefixo = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        resultados, produtos = [], set()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for n, (itens, id_vendedor) in enumerate(carrinhos):
+                self.conn.execute("SAVEPOINT carrinho")
+                try:
+                    pedidos = _pedidos_carrinho(itens)
+                    codigos = self._gravar_carrinho(itens, pedidos, id_vendedor, f"{prefixo}-{n}") if itens else []
+                except (ErroVenda, sqlite3.IntegrityError, KeyError, TypeError, ValueError) as e:
+                    self.conn.execute("ROLLBACK TO carrinho")
+                    resultados.append(e)
+                else:
+                    resultados.append(codigos)
+                    produtos.update(pedidos)
+                self.conn.execute("RELEASE carrinho")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._notificar_vendas([c for r in resultados if isinstance(r, list) for c in r], list(produtos))
+        return resultados
+
+    def _gravar_carrinho(self, itens, pedidos, id_vendedor, prefixo):
+        # corpo de finalizar_venda(s), dentro de uma transação já aberta
+        marcadores = ", ".join(["?"] * len(pedidos))
+        produtos = {
+            cod: (nome, qtd) for cod, nome, qtd in self.conn.execute(
+                f"SELECT codigo_produto, nome_produto, quantidade FROM Produtos WHERE codigo_produto IN ({marcadores})",
+                list(pedidos))
+        }
+        for cod, qnt in pedidos.items():
+            if cod not in produtos:
+                raise ProdutoNaoEncontrado(f"Codigo do Produto não encontrado: {cod}")
+            if qnt > (produtos[cod][1] or 0):
+                raise EstoqueInsuficiente(cod, produtos[cod][1], qnt)
+
+        vendas = []
+        for i, item in enumerate(itens, start=1):
+            cod = str(item["codigo_produto"])
+            vendas.append((
+                str(item.get("codigo_venda") or f"{prefixo}-{i}"),
+                cod,
+                item.get("nome_produto") or produtos[cod][0],
+                item.get("id_vendedor", id_vendedor),
+                int(item["qnt_vendida"]),
+            ))
+        self.conn.executemany(
+            "INSERT INTO Vendas (codigo_venda, codigo_produto, nome_produto, id_vendedor, qnt_vendida) "
+            "VALUES (?, ?, ?, ?, ?)", vendas)
+        # a baixa só acontece se ainda houver estoque, mesmo que ele mude depois da conferência
+        for cod, qnt in pedidos.items():
+            if self.conn.execute(
+                    "UPDATE Produtos SET quantidade = quantidade - ? WHERE codigo_produto = ? AND quantidade >= ?",
+                    (qnt, cod, qnt)).rowcount == 0:
+                raise EstoqueInsuficiente(cod, produtos[cod][1], qnt)
+        return [v[0] for v in vendas]
+
+    def _notificar_vendas(self, codigos, produtos):
+        if not self._observadores or not codigos:
+            return
+        for linha in self.conn.execute(
+                f"SELECT * FROM Vendas WHERE codigo_venda IN ({', '.join(['?'] * len(codigos))})", codigos):
+            self._notificar("Vendas", "inserir", linha[0], linha)
+        for linha in self.conn.execute(
+                f"SELECT * FROM Produtos WHERE codigo_produto IN ({', '.join(['?'] * len(produtos))})", produtos):
+            self._notificar("Produtos", "atualizar", linha[0], linha)
+
+    def ajustar_estoque(self, codigo_produto, delta_quantidade):
+        # baixas (delta negativo) só com estoque suficiente no momento da gravação
+        query = "UPDATE Produtos SET quantidade = quantidade + ? WHERE codigo_produto = ?"
+        params = (delta_quantidade, codigo_produto)
+        if delta_quantidade < 0:
+            query += " AND quantidade >= ?"
+            params += (-delta_quantidade,)
+        if not self.execute_query(query, params):
+            return False
+        if delta_quantidade < 0 and self.cursor.rowcount == 0:
+            self._falhou = bool(self._transacao)
+            self._avisar_erro("Estoque Insuficiente", f"Estoque de {codigo_produto} insuficiente para a baixa de "
+                                                      f"{-delta_quantidade}.")
+            self.recarregar("Produtos", codigo_produto)
+            return False
+        linha = self._buscar_linha("Produtos", codigo_produto)
+        if linha is not None:  # produto já excluído (ex.: estorno da venda dele): nada mudou
+            self._notificar("Produtos", "atualizar", codigo_produto, linha)
+        return True
+
+    @medir("execute_query", linhas=lambda ok, self, *a, **k: max(self.cursor.rowcount, 0),
+           detalhe=lambda self, query, params=(): f"{' '.join(query.split())} | {params!r}")
+    def execute_query(self, query, params=()):
+        try:
+            self.cursor.execute(query, params)
+            if not self._transacao:
+                self.conn.commit()
+            return True
+        except sqlite3.IntegrityError as e:
+            self._falhou = bool(self._transacao)
+            if "UNIQUE constraint failed" in str(e):
+                self._avisar_erro("Erro de Integridade", "Chave Duplicada. Este Código/ID já existe.")
+            else:
+                self._avisar_erro("Erro no BD", f"Erro de banco de dados: {e}")
+            return False
+        except Exception as e:
+            self._falhou = bool(self._transacao)
+            self._avisar_erro("Erro no BD", f"Erro inesperado no banco de dados: {e}")
+            return False
+
+    def _avisar_erro(self, titulo, mensagem):
+        if self.ao_erro is not None:
+            self.ao_erro(titulo, mensagem)
+        else:
+            print(f"{titulo}: {mensagem}")
+
+    def resumo_vendas(self, periodo="dia", dimensao="produto", inicio=None, fim=None):
+        return consultar_resumo(self.conn, periodo, dimensao, inicio, fim)
+
+    def alteracoes(self, depois_de=0, tabelas=None):
+        return alteracoes(self.conn, depois_de, tabelas)
+
+    def reconstruir_resumos(self):
+        """Recalcula ResumoVendas a partir de Vendas (ex.: depois de recategorizar produtos)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM ResumoVendas")
+            self.conn.execute("INSERT INTO ResumoVendas (periodo, inicio, dimensao, chave, quantidade, vendas) "
+                              + _sql_preencher_resumo())
+
+    def reconstruir_busca(self):
+        """
+        Refaz os índices de busca a partir das tabelas (ex.: depois de um
+        VACUUM feito por outra ferramenta, que pode renumerar os rowid).
+        """
+        with self.conn:
+            for tabela in COLUNAS_BUSCA:
+                self.conn.execute(f"INSERT INTO {tabela}_busca({tabela}_busca) VALUES ('rebuild')")
+
+    def close(self):
+        # Atualiza as estatísticas usadas pelo planejador de consultas
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+def contar_estoque_baixo(conn):
+    """Produtos abaixo do estoque mínimo (lido do índice parcial, sem varrer o catálogo)."""
+    return conn.execute(f"SELECT COUNT(*) FROM Produtos WHERE {FILTRO_ESTOQUE_BAIXO}").fetchone()[0]
+
+def alertas_estoque(conn, depois_de=0):
+    """Alertas com id > depois_de: (id, codigo_produto, nome_produto, quantidade, estoque_minimo, data)."""
+    return conn.execute(
+        "SELECT id, codigo_produto, nome_produto, quantidade, estoque_minimo, data FROM AlertasEstoque "
+        "WHERE id > ? ORDER BY id", (depois_de,)).fetchall()
+
+def ultimo_alerta(conn):
+    return conn.execute("SELECT COALESCE(MAX(id), 0) FROM AlertasEstoque").fetchone()[0]
+
+LOTE_ALTERACOES = 1000  # linhas de Alteracoes lidas por consulta
+
+def ultima_alteracao(conn):
+    """seq da alteração mais recente (0 se não houver): o cursor de quem só quer o que vier depois."""
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM Alteracoes").fetchone()[0]
+
+def alteracoes(conn, depois_de=0, tabelas=None, lote=LOTE_ALTERACOES):
+    """
+    Alterações com seq > depois_de, em ordem, até a última gravada:
+    tuplas (seq, tabela, operacao, chave, dados, data), com dados já
+    convertido para dict. Lidas em lotes pela chave (cada lote é uma busca
+    no índice, sem varrer o log), sem manter a leitura aberta entre eles.
+    Guarde o seq da última tupla processada para continuar dali.
+    tabelas: só as alterações dessas tabelas (ex.: ["Vendas"]).
+    """
+    query = "SELECT seq, tabela, operacao, chave, dados, data FROM Alteracoes WHERE seq > ?"
+    filtro = list(tabelas or [])
+    if filtro:
+        query += f" AND tabela IN ({', '.join(['?'] * len(filtro))})"
+    query += " ORDER BY seq LIMIT ?"
+    while True:
+        linhas = conn.execute(query, [depois_de, *filtro, lote]).fetchall()
+        for seq, tabela, operacao, chave, dados, data in linhas:
+            yield seq, tabela, operacao, chave, json.loads(dados) if dados else None, data
+        if len(linhas) < lote:
+            return
+        depois_de = linhas[-1][0]
+
+def acompanhar_alteracoes(conn, depois_de=0, tabelas=None, intervalo=1.0, parar=None):
+    """
+    Como alteracoes(), mas não termina no fim do log: espera `intervalo`
+    segundos e continua com as que forem gravadas depois (tail -f).
+    parar: threading.Event que encerra o iterador; sem ele, o consumidor
+    decide quando sair do laço.
+    """
+    while parar is None or not parar.is_set():
+        for alteracao in alteracoes(conn, depois_de, tabelas):
+            yield alteracao
+            depois_de = alteracao[0]
+        if parar is not None:
+            parar.wait(intervalo)
+        else:
+            time.sleep(intervalo)
+
+def consultar_resumo(conn, periodo="dia", dimensao="produto", inicio=None, fim=None):
+    """
+    Vendas resumidas por período: DataFrame com inicio (data do começo do
+    dia/semana/mês), chave, quantidade e vendas, lido de ResumoVendas.
+    inicio/fim ('AAAA-MM-DD') filtram pelo começo do período. Recebe a
+    conexão para poder ser usado também pela conexão de leitura da interface.
+    """
+    if periodo not in PERIODOS_RESUMO or dimensao not in DIMENSOES_RESUMO:
+        raise ValueError(f"Resumo inválido: {periodo}/{dimensao}")
+    query = ("SELECT inicio, chave, quantidade, vendas FROM ResumoVendas "
+             "WHERE periodo = ? AND dimensao = ?")
+    params = [periodo, dimensao]
+    if inicio:
+        query += " AND inicio >= ?"
+        params.append(inicio)
+    if fim:
+        query += " AND inicio <= ?"
+        params.append(fim)
+    return pd.read_sql_query(query + " ORDER BY inicio, chave", conn, params=params)
+
+# ------------------- FUNÇÕES DE UTILIDADE -------------------
+
+# Colunas chave nos dois formatos: SQLite ('Codigo Produto') e planilha ('Código do Produto')
+COLUNAS_CODIGO = ["Codigo Produto", "Id Vendedor", "Codigo Venda",
+                  "ID do Vendedor", "Código do Produto", "Código de Venda"]
+
+def padronizar_texto(col, valor):
+    if valor is None: return ""
+    val = str(valor).strip()
+    if col in COLUNAS_CODIGO:
+        return val.upper()
+    if col == "Telefone":
+        nums = re.sub(r"\D", "", val)[:11]
+        if len(nums) == 11:
+            return f"({nums[:2]}) {nums[2:7]}-{nums[7:]}"
+        elif len(nums) == 10:
+            return f"({nums[:2]}) {nums[2:6]}-{nums[6:]}"
+        else:
+            return nums
+    return val
+
+def _como_texto(serie):
+    # str(valor) de cada célula, como em padronizar_texto (None -> "")
+    tipo = serie.dtype
+    if (pd.api.types.is_object_dtype(tipo) or pd.api.types.is_string_dtype(tipo)
+            or pd.api.types.is_numeric_dtype(tipo) or pd.api.types.is_bool_dtype(tipo)):
+        texto = serie.astype(str)
+    else:
+        texto = serie.map(str)  # datas etc.: astype(str) formata diferente de str()
+    # astype(str) mantém os ausentes; só eles passam por Python
+    ausentes = serie.isna()
+    if ausentes.any():
+        texto[ausentes] = serie[ausentes].map(lambda v: "" if v is None else str(v))
+    return texto
+
+# tabela de str.translate que apaga tudo que não é dígito ASCII (exceto a quebra de linha)
+_APAGAR_NAO_DIGITOS = {c: None for c in range(128) if not chr(c).isdigit() and chr(c) != "\n"}
+# "(dd) ddddd-dddd" e "(dd) dddd-dddd": posição do dígito ou o caractere fixo
+_MOLDES_TELEFONE = {
+    11: ["(", 0, 1, ")", " ", 2, 3, 4, 5, 6, "-", 7, 8, 9, 10],
+    10: ["(", 0, 1, ")", " ", 2, 3, 4, 5, "-", 6, 7, 8, 9],
+}
+
+def _formatar_telefones(texto):
+    """
+    padronizar_texto("Telefone", ...) para um array de str, sem regex por célula:
+    os textos são unidos num só str, os não dígitos saem com um único
+    translate e os 11 primeiros dígitos de cada um são encaixados no molde
+    com numpy (uma matriz de code points, uma linha por telefone).
+    """
+    resultado = np.empty(len(texto), dtype=object)
+    if not len(texto):
+        return resultado
+    # \D do re também aceita dígitos não ASCII, e a quebra de linha separa
+    # os valores: essas células (raras) vão pelo caminho normal; o texto
+    # unido é conferido de uma vez e, só se falhar, célula a célula
+    unido = "\n".join(texto.tolist())
+    if unido.isascii() and unido.count("\n") == len(texto) - 1:
+        linhas = np.arange(len(texto))
+    else:
+        simples = np.fromiter((v.isascii() and "\n" not in v for v in texto), dtype=bool, count=len(texto))
+        linhas = np.flatnonzero(simples)
+        resto = np.flatnonzero(~simples)
+        resultado[resto] = [padronizar_texto("Telefone", v) for v in texto[resto]]
+        if not len(linhas):
+            return resultado
+        unido = "\n".join(texto[linhas].tolist())
+
+    digitos = unido.translate(_APAGAR_NAO_DIGITOS).split("\n")
+    # U11 corta no 11º dígito, como nums[:11]
+    cp = np.array(digitos, dtype="<U11").view(np.uint32).reshape(len(linhas), 11)
+    qtd = (cp != 0).sum(axis=1)
+    saida = np.zeros((len(linhas), 15), dtype=np.uint32)
+    saida[:, :11] = cp
+    for n, molde in _MOLDES_TELEFONE.items():
+        sel = qtd == n
+        e_digito = np.array([not isinstance(c, str) for c in molde])
+        origem = np.array([0 if isinstance(c, str) else c for c in molde])
+        fixo = np.array([ord(c) if isinstance(c, str) else 0 for c in molde], dtype=np.uint32)
+        saida[sel, :len(molde)] = np.where(e_digito, cp[sel][:, origem], fixo)
+    resultado[linhas] = saida.view("<U15").ravel().astype(object)
+    return resultado
+
+def _valores_texto(serie):
+    # array de str(valor), como em padronizar_texto; uma coluna só de str
+    # (o caso comum) sai direto, sem conversão
+    valores = serie.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(valores, skipna=False) == "string":
+        return valores
+    return _como_texto(serie).to_numpy(dtype=object)
+
+def padronizar_coluna(col, serie):
+    """
+    Versão de padronizar_texto para uma coluna inteira (Series): o resultado
+    é igual a serie.map(lambda v: padronizar_texto(col, v)), sem chamar uma
+    função Python por célula. Numa coluna category só as categorias são
+    padronizadas; nas demais, str.strip/str.upper rodam num map em C (os
+    .str do pandas, sem pyarrow, são mais lentos que isso) e o Telefone
+    passa por um translate e pelo molde em numpy.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = padronizar_coluna(col, pd.Series(serie.cat.categories, dtype=object))
+        codigos = serie.cat.codes.to_numpy()
+        if categorias.is_unique and not (codigos == -1).any():
+            # continua category: só trocam os nomes das categorias
+            return pd.Series(pd.Categorical.from_codes(codigos, categorias), index=serie.index, name=serie.name)
+        # o código -1 (ausente) pega o último item, o valor padronizado do NaN
+        valores = np.append(categorias.to_numpy(dtype=object), padronizar_texto(col, np.nan))
+        return pd.Series(valores[codigos], index=serie.index, name=serie.name, dtype=object)
+    valores = _valores_texto(serie)
+    if col == "Telefone":
+        # só os dígitos importam, então o strip não muda o resultado
+        resultado = _formatar_telefones(valores)
+    elif col in COLUNAS_CODIGO:
+        resultado = list(map(str.upper, map(str.strip, valores)))
+    else:
+        resultado = list(map(str.strip, valores))
+    return pd.Series(resultado, index=serie.index, name=serie.name, dtype=object)
+
+def padronizar_tabela(df, colunas=None):
+    """Nova cópia do DataFrame com padronizar_coluna aplicada às colunas (padrão: todas)."""
+    df = df.copy()
+    for col in (df.columns if colunas is None else colunas):
+        df[col] = padronizar_coluna(col, df[col])
+    return df
+
+def consulta_busca(texto):
+    """
+    Converte o texto digitado numa consulta FTS5: cada palavra vira um
+    prefixo ("agua sani" -> "agua"* "sani"*), todas obrigatórias.
+    Retorna None se não houver palavras.
+    """
+    palavras = [p.replace('"', '""') for p in str(texto).split()]
+    if not palavras:
+        return None
+    return " ".join(f'"{p}"*' for p in palavras)
+
+# ------------------- TABELAS COMPACTAS EM MEMÓRIA -------------------
+
+# texto com no máximo esta fração de valores distintos vira category
+LIMITE_CATEGORIA = 0.5
+_INT32 = np.iinfo(np.int32)
+
+def compactar_tabela(df, limite_categoria=LIMITE_CATEGORIA):
+    """
+    Cópia do DataFrame com tipos compactos: colunas de texto repetitivo
+    (categoria, volume, produto/vendedor das vendas) viram category e
+    inteiros que cabem em 32 bits viram int32. Decimais continuam float64
+    (valores em dinheiro). Depois disso, edite com gravar_valor/gravar_linha
+    e inclua linhas pelo CacheTabela (ou em lote, com restaurar_tipos).
+    """
+    df = df.copy()
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_integer_dtype(serie.dtype) and serie.dtype.itemsize > 4:
+            if serie.empty or (serie.min() >= _INT32.min and serie.max() <= _INT32.max):
+                df[col] = serie.astype(np.int32)
+        elif pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype):
+            if len(serie) and serie.nunique() <= limite_categoria * len(serie):
+                df[col] = serie.astype("category")
+    return df
+
+def memoria_tabelas(dfs):
+    """Bytes ocupados por um dict de DataFrames (incluindo o conteúdo dos textos)."""
+    return sum(int(df.memory_usage(deep=True).sum()) for df in dfs.values())
+
+def compactar_tabelas(dfs, limite_categoria=LIMITE_CATEGORIA):
+    """
+    Compacta um dict de DataFrames. Com a instrumentação ligada, a memória
+    antes e depois vai para METRICAS ("memoria_tabelas_mb"); desligada, não
+    é medida (memoria_tabelas percorre todos os textos).
+    """
+    compactas = {nome: compactar_tabela(df, limite_categoria) for nome, df in dfs.items()}
+    if METRICAS.ativa:
+        METRICAS.informar("memoria_tabelas_mb", {"antes": round(memoria_tabelas(dfs) / 2 ** 20, 1),
+                                                 "depois": round(memoria_tabelas(compactas) / 2 ** 20, 1)})
+    return compactas
+
+def _preparar_valor(df, col, valor):
+    # categoria nova é acrescentada antes da atribuição (senão o pandas recusa)
+    serie = df[col]
+    if (isinstance(serie.dtype, pd.CategoricalDtype) and not pd.isna(valor)
+            and valor not in serie.cat.categories):
+        df[col] = serie.cat.add_categories([valor])
+
+def restaurar_tipos(df, tipos):
+    """
+    Volta aos tipos compactos (tipos: coluna -> dtype, ex.: df.dtypes de
+    antes) as colunas alargadas por inclusões com gravar_linha. Converte a
+    coluna inteira: chame uma vez depois de um lote de inclusões, não a
+    cada linha.
+    """
+    for col, tipo in tipos.items():
+        if col not in df.columns or df[col].dtype == tipo:
+            continue
+        if isinstance(tipo, pd.CategoricalDtype):
+            # as categorias novas vêm dos valores incluídos
+            df[col] = df[col].astype("category")
+            continue
+        if (pd.api.types.is_numeric_dtype(tipo) and pd.api.types.infer_dtype(df[col], skipna=True)
+                not in ("integer", "floating", "mixed-integer-float", "empty")):
+            # texto numa coluna numérica: fica object, como em gravar_valor
+            # (o astype converteria '004' em 4)
+            continue
+        try:
+            df[col] = df[col].astype(tipo)
+        except (TypeError, ValueError):
+            # ex.: vazio numa coluna int32: fica como float (NaN) se der
+            if pd.api.types.is_integer_dtype(tipo):
+                try:
+                    df[col] = df[col].astype("float64")
+                except (TypeError, ValueError):
+                    pass
+
+def gravar_valor(df, rotulo, col, valor):
+    """df.at[rotulo, col] = valor, mantendo category/int32."""
+    _preparar_valor(df, col, valor)
+    try:
+        df.at[rotulo, col] = valor
+    except (TypeError, ValueError):
+        # valor fora do tipo compacto: decimal numa coluna de inteiros vira
+        # float64; texto numa coluna numérica, object (preserva '004')
+        if pd.api.types.is_integer_dtype(df[col].dtype) and isinstance(valor, (float, np.floating)):
+            df[col] = df[col].astype("float64")
+        else:
+            df[col] = df[col].astype(object)
+        df.at[rotulo, col] = valor
+
+def gravar_linha(df, rotulo, valores):
+    """
+    df.loc[rotulo] = valores (inclusão ou edição). A edição mantém os tipos
+    compactos. A inclusão pelo .loc pode alargar colunas (category -> texto,
+    int32 -> int64), que não são reconvertidas aqui (seria uma conversão da
+    coluna inteira por linha): depois de um lote, use restaurar_tipos; para
+    incluir linha a linha num cache compacto, use CacheTabela.
+    """
+    if rotulo in df.index:
+        for col, valor in zip(df.columns, valores):
+            gravar_valor(df, rotulo, col, valor)
+        return
+    df.loc[rotulo] = list(valores)
+
+# reserva de linhas do CacheTabela: fração do tamanho atual (mínimo RESERVA_MINIMA)
+RESERVA_LINHAS = 0.25
+RESERVA_MINIMA = 1024
+# linhas excluídas (fração das usadas, e no mínimo MINIMO_EXCLUIDAS) que disparam a compactação
+FRACAO_EXCLUIDAS = 0.25
+MINIMO_EXCLUIDAS = 1024
+
+class CacheTabela:
+    """
+    Cache de uma tabela (DataFrame compacto, índice inteiro) em que incluir,
+    editar e excluir uma linha custa tempo constante (amortizado):
+    - incluir grava numa linha reservada no fim; quando a reserva acaba,
+      mais RESERVA_LINHAS do tamanho é acrescentado de uma vez (cópias da
+      primeira linha, com os mesmos tipos: category continua category);
+    - excluir só desmarca a linha; as excluídas saem de uma vez quando
+      passam de FRACAO_EXCLUIDAS das usadas.
+    O rótulo de uma linha não muda em nenhuma delas (o IndiceChave
+    continua valendo). Expõe columns/at/loc como o DataFrame e, como ele,
+    serve de tabela para o IndiceChave; `df` monta um DataFrame só com as
+    linhas vivas (O(n): para cargas e relatórios, não a cada alteração).
+    """
+
+    def __init__(self, df):
+        self._dados = df
+        self._vivas = np.ones(len(df), dtype=bool)
+        self._usadas = len(df)  # linhas já ocupadas (vivas ou excluídas); o resto é reserva
+        self._excluidas = 0
+        self._proximo = int(df.index.max()) + 1 if len(df) else 0  # rótulo da próxima reserva
+
+    @property
+    def columns(self):
+        return self._dados.columns
+
+    @property
+    def at(self):
+        return self._dados.at
+
+    @property
+    def loc(self):
+        return self._dados.loc
+
+    @property
+    def df(self):
+        dados = self._dados.iloc[:self._usadas]
+        return dados[self._vivas[:self._usadas]] if self._excluidas else dados
+
+    @property
+    def index(self):
+        return self.df.index
+
+    def __getitem__(self, coluna):
+        return self.df[coluna]
+
+    def __len__(self):
+        return self._usadas - self._excluidas
+
+    def gravar(self, rotulo, valores):
+        """Edita a linha do rótulo (valores na ordem das colunas)."""
+        gravar_linha(self._dados, rotulo, valores)
+
+    def incluir(self, valores):
+        """Grava uma linha nova e retorna o rótulo dela."""
+        if self._usadas == len(self._dados):
+            self._reservar()
+        rotulo = self._dados.index[self._usadas]
+        gravar_linha(self._dados, rotulo, valores)  # linha já existe: só gravar_valor
+        self._vivas[self._usadas] = True
+        self._usadas += 1
+        return rotulo
+
+    def excluir(self, rotulo):
+        posicao = self._dados.index.get_loc(rotulo)
+        if not self._vivas[posicao]:
+            return
+        self._vivas[posicao] = False
+        self._excluidas += 1
+        if self._excluidas > max(MINIMO_EXCLUIDAS, FRACAO_EXCLUIDAS * self._usadas):
+            self._compactar()
+
+    def _reservar(self):
+        n = max(int(len(self._dados) * RESERVA_LINHAS), RESERVA_MINIMA)
+        if len(self._dados):
+            reserva = self._dados.iloc[np.zeros(n, dtype=np.intp)]
+        else:
+            reserva = self._dados.reindex(range(n))
+        reserva.index = pd.RangeIndex(self._proximo, self._proximo + n)
+        self._proximo += n
+        self._dados = pd.concat([self._dados, reserva])
+        self._vivas = np.concatenate([self._vivas, np.zeros(n, dtype=bool)])
+
+    def _compactar(self):
+        vivas = self._vivas[:self._usadas]
+        self._dados = pd.concat([self._dados.iloc[:self._usadas][vivas], self._dados.iloc[self._usadas:]])
+        self._usadas = int(vivas.sum())
+        self._vivas = np.arange(len(self._dados)) < self._usadas
+        self._excluidas = 0
+
+# ------------------- VALIDAÇÃO -------------------
+
+CAMPOS_OBRIGATORIOS = {
+    # Mudança: 'Codigo Produto' sem acento
+    "produtos": ["Codigo Produto", "Nome Produto"],
+    "vendas": ["Codigo Venda", "Codigo Produto", "Nome Produto"],
+    "vendedores": ["Id Vendedor", "Nome"]
+}
+CAMPOS_INTEIROS = ["Quantidade", "Qnt Vendida", "Estoque Minimo"]
+# em branco, ficam de fora do registro (o BD usa o valor padrão)
+CAMPOS_OPCIONAIS = ["Estoque Minimo"]
+CAMPOS_DECIMAIS = ["Valor Compra", "Valor Venda", "Valor Mercado"]
+
+def validar_dados(tipo, data, buscar_produto=None):
+    """
+    Valida (e converte os números de) um registro no formato da interface.
+    buscar_produto(codigo) -> registro com 'Quantidade' ou None; usado para
+    conferir o estoque das vendas. Lança ErroValidacao.
+    """
+    for field in CAMPOS_OBRIGATORIOS.get(tipo, []):
+        if not data.get(field) or str(data.get(field)).strip() == "":
+            raise ErroValidacao("Erro de Validação", f"O campo '{field}' é obrigatório.")
+
+    for k in CAMPOS_OPCIONAIS:
+        if k in data and str(data[k]).strip() == "":
+            del data[k]
+
+    for k, v in data.items():
+        try:
+            if k in CAMPOS_INTEIROS:
+                data[k] = int(v)
+            elif k in CAMPOS_DECIMAIS:
+                # Permite "," ou "." como separador decimal
+                data[k] = float(str(v).replace(',', '.'))
+        except ValueError:
+            raise ErroValidacao("Erro de Validação", f"O campo '{k}' deve ser um número válido.")
+
+    # Validação de Estoque (apenas para Vendas)
+    if tipo == "vendas":
+        qnt_venda = data.get("Qnt Vendida", 0)
+        if qnt_venda <= 0:
+            raise ErroValidacao("Erro de Venda", "A quantidade vendida deve ser positiva.")
+        if buscar_produto is not None:
+            registro = buscar_produto(data.get("Codigo Produto"))
+            if registro is None:
+                raise ErroValidacao("Erro de Venda", "Codigo do Produto não encontrado.")
+            estoque_atual = registro["Quantidade"]
+            if qnt_venda > estoque_atual:
+                raise ErroValidacao("Estoque Insuficiente",
+                                    f"Estoque disponível: {estoque_atual}. Venda não registrada.", aviso=True)
+    return data
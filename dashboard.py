@@ -0,0 +1,160 @@
+# dashboard.py
+"""
+Dashboard com agregados mantidos incrementalmente (estoque por produto e
+total vendido por produto) e uma única Figure reaproveitada entre visitas.
+O matplotlib só é importado quando o painel é aberto pela primeira vez.
+"""
+import pandas as pd
+from config import LOW_STOCK_THRESHOLD
+
+
+def _numero(valor):
+    try:
+        return 0 if pd.isna(valor) else int(valor)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _minimo(valor):
+    return None if valor is None or pd.isna(valor) else _numero(valor)
+
+
+class AgregadosDashboard:
+    """
+    Séries usadas nos gráficos, atualizadas a cada alteração em vez de
+    recalculadas com groupby. `versao` muda sempre que algo muda.
+
+    Os nomes de coluna são passados porque cada app usa os seus
+    (ex.: 'Qnt. Vendida' na planilha, 'Qnt Vendida' no SQLite).
+    col_minimo: coluna opcional com o estoque mínimo de cada produto; sem
+    ela (ou com a célula vazia) vale o limiar global do painel.
+    """
+
+    def __init__(self, col_codigo, col_nome, col_quantidade, col_nome_venda, col_qnt_vendida, col_minimo=None):
+        self.col_codigo = col_codigo
+        self.col_nome = col_nome
+        self.col_quantidade = col_quantidade
+        self.col_nome_venda = col_nome_venda
+        self.col_qnt_vendida = col_qnt_vendida
+        self.col_minimo = col_minimo
+        self.estoque = {}  # codigo -> [nome, quantidade, mínimo ou None]
+        self.vendas_por_produto = {}  # nome -> [total vendido, nº de vendas]
+        self.versao = 0
+
+    def carregar(self, df_produtos, df_vendas):
+        """Cálculo completo, feito uma vez na carga inicial."""
+        self.estoque = {}
+        if self.col_quantidade in df_produtos.columns:
+            if self.col_minimo in df_produtos.columns:
+                minimos = df_produtos[self.col_minimo]
+            else:
+                minimos = [None] * len(df_produtos)
+            for cod, nome, qtd, minimo in zip(df_produtos[self.col_codigo], df_produtos[self.col_nome],
+                                              df_produtos[self.col_quantidade], minimos):
+                self.estoque[str(cod)] = [nome, _numero(qtd), _minimo(minimo)]
+        self.vendas_por_produto = {}
+        if not df_vendas.empty and self.col_qnt_vendida in df_vendas.columns:
+            # observed: com a coluna em category, só os nomes que têm vendas
+            grupos = df_vendas.groupby(self.col_nome_venda, observed=True)[self.col_qnt_vendida].agg(["sum", "count"])
+            for nome, (total, contagem) in grupos.iterrows():
+                self.vendas_por_produto[nome] = [_numero(total), int(contagem)]
+        self.versao += 1
+
+    def _somar_venda(self, nome, qnt, contagem):
+        atual = self.vendas_por_produto.setdefault(nome, [0, 0])
+        atual[0] += qnt
+        atual[1] += contagem
+        if atual[1] <= 0:
+            del self.vendas_por_produto[nome]
+
+    def aplicar(self, tipo, antigo=None, novo=None):
+        """
+        Atualiza os agregados com uma linha alterada (dicts coluna -> valor).
+        Inserção: antigo=None; exclusão: novo=None; edição: os dois.
+        """
+        if tipo == "produtos":
+            cod_antigo = str(antigo[self.col_codigo]) if antigo is not None else None
+            cod_novo = str(novo[self.col_codigo]) if novo is not None else None
+            if cod_antigo is not None and cod_antigo != cod_novo:
+                self.estoque.pop(cod_antigo, None)
+            if cod_novo is not None:
+                self.estoque[cod_novo] = [novo[self.col_nome], _numero(novo.get(self.col_quantidade)),
+                                          _minimo(novo.get(self.col_minimo))]
+        elif tipo == "vendas":
+            if antigo is not None:
+                self._somar_venda(antigo[self.col_nome_venda], -_numero(antigo.get(self.col_qnt_vendida)), -1)
+            if novo is not None:
+                self._somar_venda(novo[self.col_nome_venda], _numero(novo.get(self.col_qnt_vendida)), 1)
+        else:
+            return
+        self.versao += 1
+
+
+class PainelDashboard:
+    """
+    Figure e canvas criados uma vez; redesenha só se os agregados mudaram.
+    Com tendencia=True há um terceiro gráfico, de vendas por período, que
+    recebe a série pronta (ex.: lida de ResumoVendas) em atualizar().
+    """
+
+    def __init__(self, frame, limiar=LOW_STOCK_THRESHOLD, tendencia=False):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.limiar = limiar
+        # Figure (e não pyplot) para não acumular figuras no gerenciador global
+        self.fig = Figure(figsize=(14 if tendencia else 10, 4))
+        self.ax = self.fig.subplots(1, 3 if tendencia else 2)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=frame)
+        self.canvas.get_tk_widget().pack(expand=True, fill="both")
+        self._versao = None
+
+    def atualizar(self, agregados, tendencia=None):
+        """tendencia: DataFrame com 'inicio' e 'quantidade', um período por linha."""
+        if agregados.versao == self._versao:
+            return False
+        self._versao = agregados.versao
+        ax_estoque, ax_vendas = self.ax[:2]
+        ax_estoque.clear()
+        ax_vendas.clear()
+
+        # Estoque Atual
+        if agregados.estoque:
+            nomes = [str(n) for n, _, _ in agregados.estoque.values()]
+            qtds = [q for _, q, _ in agregados.estoque.values()]
+            cores = ['#f44336' if q < (self.limiar if m is None else m) else '#2196F3'
+                     for _, q, m in agregados.estoque.values()]
+            ax_estoque.bar(nomes, qtds, color=cores)
+            ax_estoque.set_title("Estoque Atual")
+            ax_estoque.set_ylabel("Quantidade")
+            ax_estoque.tick_params(axis='x', rotation=45)
+        else:
+            ax_estoque.text(0.5, 0.5, "Sem informações de estoque", ha="center", va="center")
+
+        # Vendas Totais
+        if agregados.vendas_por_produto:
+            itens = sorted(agregados.vendas_por_produto.items(), key=lambda kv: str(kv[0]))
+            ax_vendas.bar([str(n) for n, _ in itens], [t for _, (t, _) in itens], color="#4CAF50")
+            ax_vendas.set_title("Vendas Totais")
+            ax_vendas.set_ylabel("Quantidade")
+            ax_vendas.tick_params(axis='x', rotation=45)
+        else:
+            ax_vendas.text(0.5, 0.5, "Sem vendas registradas", ha="center", va="center", fontsize=12)
+            ax_vendas.set_xticks([])
+            ax_vendas.set_yticks([])
+
+        if len(self.ax) > 2:
+            ax_tendencia = self.ax[2]
+            ax_tendencia.clear()
+            if tendencia is not None and not tendencia.empty:
+                ax_tendencia.plot(tendencia["inicio"], tendencia["quantidade"], marker="o", color="#FF9800")
+                ax_tendencia.set_title("Vendas por Mês")
+                ax_tendencia.set_ylabel("Quantidade")
+                ax_tendencia.tick_params(axis='x', rotation=45)
+            else:
+                ax_tendencia.text(0.5, 0.5, "Sem vendas no período", ha="center", va="center", fontsize=12)
+                ax_tendencia.set_xticks([])
+                ax_tendencia.set_yticks([])
+
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+        return True
@@ -1,76 +1,111 @@
 # database.py
-import os
-import shutil
 import pandas as pd
-from datetime import datetime
-from config import EXCEL_FILE, BACKUP_DIR, LOGIN_SHEET
+from config import EXCEL_FILE, LOGIN_SHEET
+from journal import aplicar_registro
+from backup import ServicoBackup
+from instrumentacao import medir
+from core import compactar_tabelas
+import snapshot
+from trava import PlanilhaCompartilhada
 
+SERVICO_BACKUP = ServicoBackup()
+# leituras e gravações com a trava da planilha (vários terminais)
+PLANILHA = PlanilhaCompartilhada(EXCEL_FILE)
+
+@medir("agendar_backup_excel")
 def backup_excel():
-    try:
-        os.makedirs(BACKUP_DIR, exist_ok=True)
-        dt = datetime.now().strftime("%Y%m%d_%H%M%S")
-        shutil.copy(EXCEL_FILE, os.path.join(BACKUP_DIR, f"backup_{dt}.xlsx"))
-    except Exception:
-        # não interrompe a execução se backup falhar
-        pass
+    """
+    Agenda o backup da planilha em segundo plano (não bloqueia quem chamou).
+    Retorna um Future; o backup é ignorado se o conteúdo não mudou.
+    """
+    return SERVICO_BACKUP.agendar_excel(EXCEL_FILE)
 
-def carregar_tabelas():
+def carregar_tabelas(journal=None, colunas=None, compactar=False):
     """
     Retorna um dict com dataframes: 'produtos', 'vendas', 'vendedores', 'login'.
     Se a aba 'Login' não existir, retorna um DataFrame com usuário admin padrão.
+    journal: se passado, as alterações dele ainda não gravadas no workbook são reaplicadas.
+    colunas: {"Produtos": [...], ...} lê só essas colunas da aba.
+    compactar: tipos compactos (core.compactar_tabelas; a memória vai para a instrumentação).
     """
     try:
-        df_produtos = pd.read_excel(EXCEL_FILE, sheet_name="Produtos")
+        # do snapshot binário enquanto o xlsx não mudar (snapshot.py)
+        abas = PLANILHA.ler(lambda: snapshot.ler_abas(
+            EXCEL_FILE, ["Produtos", "Vendas", "Vendedores", LOGIN_SHEET], colunas))
     except Exception:
+        abas = {}
+
+    df_produtos = abas.get("Produtos")
+    if df_produtos is None:
         df_produtos = pd.DataFrame(columns=[
             "Código do Produto", "Nome do Produto", "Categoria", "Quantidade",
             "Volume", "Valor de Compra", "Valor de Venda", "Valor de Mercado"
         ])
 
-    try:
-        df_vendas = pd.read_excel(EXCEL_FILE, sheet_name="Vendas")
-    except Exception:
+    df_vendas = abas.get("Vendas")
+    if df_vendas is None:
         df_vendas = pd.DataFrame(columns=["Código de Venda", "Código do Produto", "Nome do Produto", "ID do Vendedor", "Qnt. Vendida"])
 
-    try:
-        df_vendedores = pd.read_excel(EXCEL_FILE, sheet_name="Vendedores")
-    except Exception:
+    df_vendedores = abas.get("Vendedores")
+    if df_vendedores is None:
         df_vendedores = pd.DataFrame(columns=["ID do Vendedor", "Nome", "Telefone", "Email"])
 
     # login sheet: se não existir, cria um DF com o admin padrão (mas não salva)
-    try:
-        df_login = pd.read_excel(EXCEL_FILE, sheet_name=LOGIN_SHEET)
-    except Exception:
+    df_login = abas.get(LOGIN_SHEET)
+    if df_login is None:
         df_login = pd.DataFrame({"user": ["admin"], "pass": ["1234"]})
 
     # garantir colunas string
     for df in (df_produtos, df_vendas, df_vendedores, df_login):
         df.columns = df.columns.astype(str)
 
-    return {
+    tabelas = {
         "produtos": df_produtos,
         "vendas": df_vendas,
         "vendedores": df_vendedores,
         "login": df_login
     }
+    if journal is not None:
+        journal.aplicar(tabelas)
+    return compactar_tabelas(tabelas) if compactar else tabelas
+
+def registrar_alteracao(journal, tabelas, tabela, operacao, chave, dados=None):
+    """
+    Aplica uma alteração nos DataFrames e grava apenas o registro no journal,
+    sem reescrever o workbook (a compactação cuida disso depois).
+    """
+    registro = {"tabela": tabela, "operacao": operacao, "chave": chave, "dados": dados}
+    with journal.lock:
+        aplicar_registro(tabelas, registro)
+        return journal.registrar(tabela, operacao, chave, dados)
 
-def salvar_tabelas(tabelas):
+@medir("salvar_tabelas", linhas=lambda r, tabelas, *a, **k: sum(len(df) for df in tabelas.values()),
+       detalhe=lambda tabelas, *a, **k: EXCEL_FILE)
+def salvar_tabelas(tabelas, journal=None):
     """
     tabelas: dict com chaves 'produtos','vendas','vendedores' (padrão).
-    Faz backup antes de salvar.
+    Grava com a trava da planilha; se outro terminal gravou desde a última
+    leitura e o journal foi passado, grava o que está no disco com as
+    alterações pendentes do journal (trava.PlanilhaCompartilhada).
+    Com o journal, os registros já incorporados a `tabelas` saem dele depois
+    da gravação (senão seriam reaplicados sobre gravações mais novas).
+    Atualiza o snapshot das abas e agenda o backup (assíncrono) da versão recém-gravada.
     """
-    try:
-        backup_excel()
+    def escrever(tabelas):
+        # escrever apenas as folhas esperadas (se quiser salvar login, incluir 'login' também)
+        abas = {aba: tabelas[chave] for chave, aba in (("produtos", "Produtos"), ("vendas", "Vendas"),
+                                                         ("vendedores", "Vendedores"), ("login", LOGIN_SHEET))
+                if chave in tabelas}
         with pd.ExcelWriter(EXCEL_FILE, engine="openpyxl", mode="w") as writer:
-            # escrever apenas as folhas esperadas
-            if "produtos" in tabelas:
-                tabelas["produtos"].to_excel(writer, sheet_name="Produtos", index=False)
-            if "vendas" in tabelas:
-                tabelas["vendas"].to_excel(writer, sheet_name="Vendas", index=False)
-            if "vendedores" in tabelas:
-                tabelas["vendedores"].to_excel(writer, sheet_name="Vendedores", index=False)
-            # se quiser salvar login, incluir 'login' também
-            if "login" in tabelas:
-                tabelas["login"].to_excel(writer, sheet_name=LOGIN_SHEET, index=False)
-    except Exception as e:
-        raise
+            for aba, df in abas.items():
+                df.to_excel(writer, sheet_name=aba, index=False)
+        snapshot.atualizar(EXCEL_FILE, abas)
+
+    recarregar = (lambda: carregar_tabelas(journal)) if journal is not None else None
+    if journal is not None:
+        with journal.lock:
+            ate_seq = journal.seq
+    PLANILHA.gravar(tabelas, escrever, recarregar)
+    if journal is not None:
+        journal.truncar(ate_seq)
+    backup_excel()
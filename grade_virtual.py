@@ -0,0 +1,250 @@
+# grade_virtual.py
+"""
+Treeview "virtual": só as linhas visíveis ficam na Treeview, e só a janela
+visível mais um pequeno buffer é lido da fonte de dados. A barra de rolagem
+é controlada aqui, proporcional ao total de linhas da fonte.
+"""
+from tkinter import ttk
+
+BUFFER_LINHAS = 50
+
+
+class FonteSQLite:
+    """
+    Lê uma tabela do SQLite em páginas ordenadas pela chave primária (keyset).
+    A posição da rolagem é convertida em chave só quando não há uma chave
+    conhecida imediatamente antes (salto com a barra de rolagem).
+    filtro: condição SQL opcional (ex.: core.FILTRO_ESTOQUE_BAIXO).
+    """
+
+    def __init__(self, conn, tabela, pk, colunas, filtro=None):
+        self.conn = conn
+        self.tabela = tabela
+        self.pk = pk
+        self.colunas = colunas
+        self.filtro = filtro
+        self._chaves = {}  # posição -> chave, do último bloco lido
+
+    def invalidar(self):
+        self._chaves = {}
+
+    def _onde(self, condicao=None):
+        partes = [c for c in (condicao, self.filtro and f"({self.filtro})") if c]
+        return " WHERE " + " AND ".join(partes) if partes else ""
+
+    def total(self):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.tabela}{self._onde()}").fetchone()[0]
+
+    def linhas(self, inicio, n):
+        cols = ", ".join(self.colunas)
+        if inicio == 0:
+            rows = self.conn.execute(
+                f"SELECT {cols} FROM {self.tabela}{self._onde()} ORDER BY {self.pk} LIMIT ?", (n,)).fetchall()
+        elif inicio - 1 in self._chaves:
+            rows = self.conn.execute(
+                f"SELECT {cols} FROM {self.tabela}{self._onde(f'{self.pk} > ?')} ORDER BY {self.pk} LIMIT ?",
+                (self._chaves[inicio - 1], n)).fetchall()
+        else:
+            # o OFFSET percorre só o índice da chave primária (ou o índice parcial do filtro)
+            primeira = f"(SELECT {self.pk} FROM {self.tabela}{self._onde()} ORDER BY {self.pk} LIMIT 1 OFFSET ?)"
+            rows = self.conn.execute(
+                f"SELECT {cols} FROM {self.tabela}{self._onde(f'{self.pk} >= {primeira}')} "
+                f"ORDER BY {self.pk} LIMIT ?", (inicio, n)).fetchall()
+        idx_pk = self.colunas.index(self.pk)
+        self._chaves = {inicio + i: r[idx_pk] for i, r in enumerate(rows)}
+        return [(str(r[idx_pk]), r) for r in rows]
+
+
+class FonteBusca:
+    """
+    Resultado de uma busca no índice FTS5 <tabela>_busca, em páginas na ordem
+    do rowid (a ordem em que o índice devolve os resultados), com o mesmo
+    esquema de chaves da FonteSQLite. Nada é lido além da janela pedida.
+    """
+
+    def __init__(self, conn, tabela, pk, colunas, consulta, filtro=None):
+        self.conn = conn
+        self.tabela = tabela
+        self.pk = pk
+        self.colunas = colunas
+        self.consulta = consulta  # já no formato FTS5 (core.consulta_busca)
+        self.filtro = filtro  # condição SQL opcional sobre as colunas da tabela
+        self.indice = f"{tabela}_busca"
+        self._rowids = {}  # posição -> rowid, do último bloco lido
+
+    def invalidar(self):
+        self._rowids = {}
+
+    def _de(self):
+        condicao = f" AND ({self.filtro})" if self.filtro else ""
+        return (f"FROM {self.indice} JOIN {self.tabela} t ON t.rowid = {self.indice}.rowid "
+                f"WHERE {self.indice} MATCH ?{condicao}")
+
+    def total(self):
+        return self.conn.execute(f"SELECT COUNT(*) {self._de()}", (self.consulta,)).fetchone()[0]
+
+    def linhas(self, inicio, n):
+        cols = ", ".join(f"t.{c}" for c in self.colunas)
+        base = f"SELECT {self.indice}.rowid, {cols} {self._de()}"
+        if inicio - 1 in self._rowids:
+            rows = self.conn.execute(
+                f"{base} AND {self.indice}.rowid > ? ORDER BY {self.indice}.rowid LIMIT ?",
+                (self.consulta, self._rowids[inicio - 1], n)).fetchall()
+        else:
+            rows = self.conn.execute(
+                f"{base} ORDER BY {self.indice}.rowid LIMIT ? OFFSET ?", (self.consulta, n, inicio)).fetchall()
+        idx_pk = self.colunas.index(self.pk)
+        self._rowids = {inicio + i: r[0] for i, r in enumerate(rows)}
+        return [(str(r[1 + idx_pk]), r[1:]) for r in rows]
+
+
+class FonteDataFrame:
+    """Fonte posicional sobre um DataFrame já em memória (planilha)."""
+
+    def __init__(self, df):
+        self.df = df
+
+    def invalidar(self):
+        pass
+
+    def total(self):
+        return len(self.df)
+
+    def linhas(self, inicio, n):
+        bloco = self.df.iloc[inicio:inicio + n]
+        return [(str(inicio + i), tuple(vals)) for i, vals in enumerate(bloco.itertuples(index=False))]
+
+
+class GradeVirtual:
+    """
+    tree: ttk.Treeview já criada com as colunas
+    scrollbar: barra vertical (o comando dela é assumido por esta classe)
+    fonte: FonteSQLite / FonteBusca / FonteDataFrame
+    tag_linha: função opcional (valores) -> tag, aplicada só às linhas exibidas
+    """
+
+    def __init__(self, tree, scrollbar, fonte, tag_linha=None, buffer=BUFFER_LINHAS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fonte = fonte
+        self.tag_linha = tag_linha
+        self.buffer = buffer
+        self.inicio = 0
+        self.visiveis = int(tree.cget("height") or 10)
+        self._total = 0
+        self._bloco_inicio = 0
+        self._bloco = []
+
+        scrollbar.configure(command=self._yview)
+        tree.configure(yscrollcommand=lambda *a: None)
+        tree.bind("<Configure>", self._ao_redimensionar)
+        tree.bind("<MouseWheel>", lambda e: self.rolar(-1 if e.delta > 0 else 1, "units", 3))
+        tree.bind("<Button-4>", lambda e: self.rolar(-1, "units", 3))
+        tree.bind("<Button-5>", lambda e: self.rolar(1, "units", 3))
+        tree.bind("<Prior>", lambda e: self.rolar(-1, "pages"))
+        tree.bind("<Next>", lambda e: self.rolar(1, "pages"))
+        tree.bind("<Up>", self._seta_cima)
+        tree.bind("<Down>", self._seta_baixo)
+
+    # ---------- dados ----------
+    def recarregar(self):
+        """Relê o total e a janela atual (ex.: depois de inserir/excluir)."""
+        self._total = self.fonte.total()
+        self.recarregar_janela()
+
+    def trocar_fonte(self, fonte):
+        """Passa a exibir outra fonte (ex.: o resultado de uma busca), do início."""
+        self.fonte = fonte
+        self.inicio = 0
+        self.recarregar()
+
+    def atualizar_item(self, iid, valores):
+        """Atualiza uma linha já existente: só o item (se visível) e o buffer."""
+        for i, (chave, _) in enumerate(self._bloco):
+            if chave == iid:
+                self._bloco[i] = (iid, valores)
+                break
+        if self.tree.exists(iid):
+            tag = self.tag_linha(valores) if self.tag_linha else ""
+            self.tree.item(iid, values=list(valores), tags=(tag,))
+
+    def alterar_total(self, delta):
+        """Linha inserida (+1) ou excluída (-1): relê apenas a janela atual."""
+        self._total = max(0, self._total + delta)
+        self.recarregar_janela()
+
+    def recarregar_janela(self):
+        self.fonte.invalidar()
+        self._bloco = []
+        self._mostrar(self.inicio)
+
+    def posicao_do_item(self, iid):
+        """Posição absoluta (na fonte) de um item exibido."""
+        return self.inicio + self.tree.index(iid)
+
+    def _carregar_bloco(self, inicio):
+        ini = max(0, inicio - self.buffer)
+        self._bloco = self.fonte.linhas(ini, self.visiveis + 2 * self.buffer)
+        self._bloco_inicio = ini
+
+    def _mostrar(self, inicio):
+        inicio = max(0, min(inicio, self._total - self.visiveis))
+        self.inicio = inicio
+        fim = inicio + self.visiveis
+        bloco_fim = self._bloco_inicio + len(self._bloco)
+        if not self._bloco or inicio < self._bloco_inicio or (fim > bloco_fim and bloco_fim < self._total):
+            self._carregar_bloco(inicio)
+
+        selecionados = set(self.tree.selection())
+        self.tree.delete(*self.tree.get_children())
+        desloc = inicio - self._bloco_inicio
+        for iid, valores in self._bloco[desloc:desloc + self.visiveis]:
+            tag = self.tag_linha(valores) if self.tag_linha else ""
+            self.tree.insert("", "end", iid=iid, values=list(valores), tags=(tag,))
+        manter = [i for i in selecionados if self.tree.exists(i)]
+        if manter:
+            self.tree.selection_set(manter)
+
+        if self._total:
+            self.scrollbar.set(inicio / self._total, min(1.0, fim / self._total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ---------- rolagem ----------
+    def rolar(self, n, unidade="units", passo=1):
+        if unidade == "pages":
+            self._mostrar(self.inicio + n * self.visiveis)
+        else:
+            self._mostrar(self.inicio + n * passo)
+        return "break"
+
+    def _yview(self, acao, *args):
+        if acao == "moveto":
+            self._mostrar(int(float(args[0]) * self._total))
+        elif acao == "scroll":
+            self.rolar(int(args[0]), args[1])
+
+    def _seta_cima(self, event):
+        itens = self.tree.get_children()
+        if itens and self.tree.focus() == itens[0] and self.inicio > 0:
+            self.rolar(-1)
+            primeiro = self.tree.get_children()[0]
+            self.tree.selection_set(primeiro)
+            self.tree.focus(primeiro)
+            return "break"
+
+    def _seta_baixo(self, event):
+        itens = self.tree.get_children()
+        if itens and self.tree.focus() == itens[-1] and self.inicio + self.visiveis < self._total:
+            self.rolar(1)
+            ultimo = self.tree.get_children()[-1]
+            self.tree.selection_set(ultimo)
+            self.tree.focus(ultimo)
+            return "break"
+
+    def _ao_redimensionar(self, event):
+        altura_linha = ttk.Style().lookup("Treeview", "rowheight") or 20
+        visiveis = max(1, (event.height - int(altura_linha)) // int(altura_linha))
+        if visiveis != self.visiveis:
+            self.visiveis = visiveis
+            self._mostrar(self.inicio)
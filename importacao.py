@@ -0,0 +1,255 @@
+# importacao.py
+"""
+Importação em lote de Vendas (fechamento de caixa de outros terminais).
+
+O arquivo (CSV ou XLSX) é lido em blocos e cada bloco é validado de uma vez,
+com operações vetorizadas do pandas: campos obrigatórios, quantidade inteira
+positiva, código de venda repetido, produto existente (join com Produtos) e
+estoque suficiente, acumulado por produto na ordem do arquivo. As linhas
+válidas são gravadas numa única transação, com a baixa de estoque no fim; as
+rejeitadas vão para um CSV de erros com o número da linha e o motivo.
+
+As alterações não são notificadas linha a linha: depois da importação, quem
+chamou deve recarregar Vendas e Produtos.
+
+Uso:
+    python importacao.py vendas_caixa2.csv [--db erp_database.db] [--erros erros.csv] [--bloco 5000]
+"""
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+from openpyxl import load_workbook
+from config import DB_NAME
+from core import DatabaseManager
+from migracao import coluna_db
+
+TAMANHO_BLOCO = 5000
+# parâmetros por consulta IN (...), abaixo do limite de versões antigas do SQLite
+LOTE_CONSULTA = 500
+
+COLUNAS_OBRIGATORIAS = ["codigo_venda", "codigo_produto", "qnt_vendida"]
+COLUNAS_CODIGO = ["codigo_venda", "codigo_produto", "id_vendedor"]
+COLUNAS_VENDA = ["codigo_venda", "codigo_produto", "nome_produto", "id_vendedor", "qnt_vendida", "data_venda"]
+
+
+# ------------------- LEITURA EM BLOCOS -------------------
+
+def _texto(valor):
+    # células do Excel no mesmo formato do CSV lido como texto
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def _blocos_xlsx(caminho, tamanho):
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        ws = wb["Vendas"] if "Vendas" in wb.sheetnames else wb.worksheets[0]
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = [str(c) for c in next(linhas, ())]
+        inicio, buffer = 0, []
+        for linha in linhas:
+            buffer.append([_texto(v) for v in linha[:len(cabecalho)]])
+            if len(buffer) >= tamanho:
+                yield pd.DataFrame(buffer, columns=cabecalho, index=range(inicio, inicio + len(buffer)))
+                inicio += len(buffer)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=cabecalho, index=range(inicio, inicio + len(buffer)))
+    finally:
+        wb.close()
+
+
+def ler_blocos(caminho, tamanho=TAMANHO_BLOCO):
+    """DataFrames de até `tamanho` linhas, tudo como texto; o index é a posição no arquivo."""
+    if caminho.lower().endswith((".xlsx", ".xlsm")):
+        return _blocos_xlsx(caminho, tamanho)
+    return pd.read_csv(caminho, dtype=str, chunksize=tamanho, sep=None, engine="python")
+
+
+# ------------------- VALIDAÇÃO -------------------
+
+def _normalizar(bloco):
+    bloco = bloco.rename(columns=coluna_db)
+    faltando = [c for c in COLUNAS_OBRIGATORIAS if c not in bloco.columns]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no arquivo: {', '.join(faltando)}")
+    bloco = bloco[[c for c in COLUNAS_VENDA if c in bloco.columns]].copy()
+    for col in bloco.columns:
+        valores = bloco[col].astype("string").str.strip()
+        if col in COLUNAS_CODIGO:
+            valores = valores.str.upper()
+        bloco[col] = valores.replace("", pd.NA)
+    return bloco
+
+
+def _codigos_existentes(conn, codigos):
+    existentes = set()
+    for i in range(0, len(codigos), LOTE_CONSULTA):
+        parte = codigos[i:i + LOTE_CONSULTA]
+        existentes.update(r[0] for r in conn.execute(
+            f"SELECT codigo_venda FROM Vendas WHERE codigo_venda IN ({', '.join(['?'] * len(parte))})", parte))
+    return existentes
+
+
+def validar_bloco(conn, bloco, produtos, consumo, vistos):
+    """
+    Valida um bloco normalizado. Retorna (validas, motivos): as linhas aceitas
+    (com nome do produto e quantidade preenchidos) e uma Series com o motivo
+    de cada linha rejeitada.
+
+    produtos: DataFrame indexado por codigo_produto com 'estoque' e 'nome_cadastro'.
+    consumo: dict codigo_produto -> quantidade aceita nos blocos anteriores
+    (atualizado aqui), para o estoque ser conferido no acumulado do arquivo.
+    vistos: set de codigo_venda dos blocos anteriores (atualizado aqui).
+    """
+    motivo = pd.Series(pd.NA, index=bloco.index, dtype="string")
+
+    def rejeitar(mascara, texto):
+        # vale o primeiro motivo encontrado para a linha
+        motivo[mascara & motivo.isna()] = texto
+
+    for col in COLUNAS_OBRIGATORIAS:
+        rejeitar(bloco[col].isna(), f"campo '{col}' é obrigatório")
+
+    qnt = pd.to_numeric(bloco["qnt_vendida"], errors="coerce")
+    rejeitar(qnt.isna() | (qnt % 1 != 0), "quantidade vendida deve ser um número inteiro")
+    rejeitar(qnt <= 0, "quantidade vendida deve ser positiva")
+
+    codigos = bloco["codigo_venda"]
+    rejeitar(codigos.duplicated() | codigos.isin(vistos), "código de venda repetido no arquivo")
+    candidatos = codigos[motivo.isna()].dropna().tolist()
+    rejeitar(codigos.isin(_codigos_existentes(conn, candidatos)), "código de venda já cadastrado")
+    vistos.update(codigos.dropna())
+
+    bloco = bloco.join(produtos, on="codigo_produto")
+    rejeitar(bloco["estoque"].isna(), "produto não cadastrado")
+
+    # estoque: soma acumulada por produto na ordem do arquivo, a partir do
+    # que os blocos anteriores já aceitaram. Só as linhas aceitas contam: uma
+    # quantidade absurda rejeitada não derruba as seguintes que cabem
+    aptas = motivo.isna()
+    pedidas = qnt[aptas].astype("int64")
+    por_produto = bloco.loc[aptas, "codigo_produto"]
+    acumulado = pedidas.groupby(por_produto).cumsum() + por_produto.map(consumo).fillna(0).astype("int64")
+    disponivel = bloco.loc[aptas, "estoque"]
+    sem_estoque = acumulado > disponivel
+    # onde a soma estoura, a conferência é linha a linha (a rejeitada não consome)
+    estouraram = por_produto[por_produto.isin(por_produto[sem_estoque])]
+    for cod, linhas in estouraram.groupby(estouraram).groups.items():
+        usado, limite = consumo.get(cod, 0), disponivel[linhas[0]]
+        for i in linhas:
+            acumulado[i] = usado + pedidas[i]
+            sem_estoque[i] = acumulado[i] > limite
+            if not sem_estoque[i]:
+                usado = acumulado[i]
+    motivo[sem_estoque[sem_estoque].index] = (
+        "estoque insuficiente (disponível " + disponivel[sem_estoque].astype("int64").astype(str)
+        + ", acumulado " + acumulado[sem_estoque].astype("int64").astype(str) + ")")
+    for cod, total in pedidas[~sem_estoque].groupby(por_produto[~sem_estoque]).sum().items():
+        consumo[cod] = consumo.get(cod, 0) + int(total)
+
+    validas = bloco[motivo.isna()].copy()
+    validas["qnt_vendida"] = qnt[motivo.isna()].astype("int64")
+    if "nome_produto" in validas.columns:
+        validas["nome_produto"] = validas["nome_produto"].fillna(validas["nome_cadastro"])
+    else:
+        validas["nome_produto"] = validas["nome_cadastro"]
+    return validas, motivo.dropna()
+
+
+# ------------------- IMPORTAÇÃO -------------------
+
+def _gravar_erros(arquivo, bruto, motivos, cabecalho):
+    rejeitadas = bruto.loc[motivos.index].copy()
+    rejeitadas.insert(0, "linha", motivos.index + 2)  # +1 do cabeçalho, +1 por contar de 1
+    rejeitadas["motivo"] = motivos
+    rejeitadas.to_csv(arquivo, index=False, header=cabecalho, mode="w" if cabecalho else "a",
+                      encoding="utf-8")
+
+
+def importar_vendas(db, caminho, arquivo_erros=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Importa as vendas do arquivo numa única transação (nada é gravado se
+    ocorrer um erro de banco). Retorna um dict de resumo: total, importadas,
+    rejeitadas, arquivo_erros (None se não houve rejeição) e segundos.
+    """
+    inicio = time.perf_counter()
+    if arquivo_erros is None:
+        arquivo_erros = os.path.splitext(caminho)[0] + "_erros.csv"
+    if os.path.exists(arquivo_erros):
+        os.remove(arquivo_erros)
+
+    conn = db.conn
+    total, importadas, rejeitadas = 0, 0, 0
+    consumo, baixas, vistos = {}, {}, set()
+    # IMMEDIATE: o estoque lido agora não muda até o commit
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        produtos = pd.read_sql_query(
+            "SELECT codigo_produto, nome_produto AS nome_cadastro, quantidade AS estoque FROM Produtos",
+            conn, index_col="codigo_produto")
+        produtos["estoque"] = produtos["estoque"].fillna(0)
+
+        for bruto in ler_blocos(caminho, tamanho_bloco):
+            total += len(bruto)
+            validas, motivos = validar_bloco(conn, _normalizar(bruto), produtos, consumo, vistos)
+            if len(motivos):
+                _gravar_erros(arquivo_erros, bruto, motivos, cabecalho=rejeitadas == 0)
+                rejeitadas += len(motivos)
+            if validas.empty:
+                continue
+            colunas = [c for c in COLUNAS_VENDA if c in validas.columns]
+            marcadores = ", ".join("COALESCE(?, CURRENT_TIMESTAMP)" if c == "data_venda" else "?" for c in colunas)
+            linhas = validas[colunas].astype(object)
+            linhas = linhas.where(linhas.notna(), None)
+            conn.executemany(f"INSERT INTO Vendas ({', '.join(colunas)}) VALUES ({marcadores})",
+                             linhas.itertuples(index=False, name=None))
+            for cod, qnt in validas.groupby("codigo_produto")["qnt_vendida"].sum().items():
+                baixas[cod] = baixas.get(cod, 0) + int(qnt)
+            importadas += len(validas)
+
+        conn.executemany("UPDATE Produtos SET quantidade = quantidade - ? WHERE codigo_produto = ?",
+                         [(qnt, cod) for cod, qnt in baixas.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "total": total,
+        "importadas": importadas,
+        "rejeitadas": rejeitadas,
+        "arquivo_erros": arquivo_erros if rejeitadas else None,
+        "segundos": segundos,
+    }
+
+
+def imprimir_resumo(resumo):
+    print(f"Vendas importadas: {resumo['importadas']}/{resumo['total']} em {resumo['segundos']:.2f}s")
+    if resumo["rejeitadas"]:
+        print(f"Rejeitadas: {resumo['rejeitadas']} (detalhes em {resumo['arquivo_erros']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa um arquivo de vendas (CSV/XLSX) em lote.")
+    parser.add_argument("arquivo")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--erros", help="CSV com as linhas rejeitadas (padrão: <arquivo>_erros.csv)")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas validadas por vez")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    try:
+        resumo = importar_vendas(db, args.arquivo, args.erros, args.bloco)
+    except (FileNotFoundError, ValueError) as e:
+        print("Erro na importação:", e)
+        sys.exit(1)
+    finally:
+        db.close()
+    imprimir_resumo(resumo)
@@ -0,0 +1,63 @@
+# indices.py
+"""
+Índices em memória (dict) das colunas chave dos DataFrames de cache:
+Código do Produto, ID do Vendedor e Código de Venda. Substituem as buscas
+`df[col].astype(str) == val`, que percorrem a coluna inteira a cada consulta.
+"""
+
+
+class IndiceChave:
+    """
+    Mapeia chave (como texto) -> rótulo da linha no DataFrame.
+    Deve ser avisado de cada alteração no DataFrame (adicionar/remover);
+    quando os rótulos mudam em massa (ex.: reset_index), use invalidar()
+    e o índice é refeito na próxima consulta.
+    """
+
+    def __init__(self, df, coluna=None):
+        self.df = df
+        self.coluna = coluna or df.columns[0]
+        self.reconstruir()
+
+    def reconstruir(self, df=None):
+        if df is not None:
+            self.df = df
+        chaves = self.df[self.coluna].astype(str)
+        # em chaves repetidas vale a primeira linha, como no filtro original
+        self._mapa = dict(zip(reversed(chaves.tolist()), reversed(self.df.index.tolist())))
+        self._sujo = False
+
+    def invalidar(self):
+        self._sujo = True
+
+    def _mapa_atual(self):
+        if self._sujo:
+            self.reconstruir()
+        return self._mapa
+
+    def __contains__(self, chave):
+        return str(chave) in self._mapa_atual()
+
+    def __len__(self):
+        return len(self._mapa_atual())
+
+    def rotulo(self, chave):
+        """Rótulo (index) da linha com a chave, ou None."""
+        return self._mapa_atual().get(str(chave))
+
+    def registro(self, chave):
+        """Linha (Series) com a chave, ou None."""
+        rotulo = self.rotulo(chave)
+        return None if rotulo is None else self.df.loc[rotulo]
+
+    def adicionar(self, chave, rotulo):
+        if not self._sujo:
+            self._mapa.setdefault(str(chave), rotulo)
+
+    def remover(self, chave):
+        if not self._sujo:
+            self._mapa.pop(str(chave), None)
+
+    def renomear(self, chave_antiga, chave_nova, rotulo):
+        self.remover(chave_antiga)
+        self.adicionar(chave_nova, rotulo)
@@ -0,0 +1,164 @@
+# instrumentacao.py
+"""
+Instrumentação opcional dos caminhos quentes (consultas, gravação da
+planilha, backups, atualização das grades e do dashboard).
+
+Desligada por padrão: liga com INSTRUMENTACAO = True no config.py ou com a
+variável de ambiente ERP_INSTRUMENTACAO=1. Desligada, cada função medida
+custa só um teste de booleano.
+
+Para cada operação guarda contagem, linhas afetadas e as últimas latências
+(p50/p95/máx.). Operações acima de LIMIAR_LENTO_MS vão para o log de
+operações lentas com o detalhe (SQL e parâmetros, tabela, ...). O resumo
+pode ser gravado em JSON periodicamente (iniciar_dump) ou exibido no
+painel de desempenho do app_aprimorado (F12).
+"""
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+from datetime import datetime
+from config import (INSTRUMENTACAO, LIMIAR_LENTO_MS, LOG_OPERACOES_LENTAS,
+                    METRICAS_ARQUIVO, METRICAS_INTERVALO)
+
+AMOSTRAS_POR_OPERACAO = 1000  # latências recentes usadas nos percentis
+TAMANHO_MAX_DETALHE = 500
+
+
+def _percentil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))]
+
+
+class Metricas:
+    def __init__(self, ativa=False, limiar_ms=LIMIAR_LENTO_MS, log_lentas=LOG_OPERACOES_LENTAS):
+        self.ativa = ativa
+        self.limiar = limiar_ms / 1000
+        self.log_lentas = log_lentas
+        self._lock = threading.Lock()
+        self._operacoes = {}  # nome -> {"contagem", "total", "linhas", "amostras"}
+        self._informacoes = {}  # nome -> último valor informado (ex.: memória das tabelas)
+        self._parar = threading.Event()
+        self._thread = None
+
+    def registrar(self, nome, segundos, linhas=None, detalhe=None):
+        with self._lock:
+            op = self._operacoes.get(nome)
+            if op is None:
+                op = self._operacoes[nome] = {"contagem": 0, "total": 0.0, "linhas": 0,
+                                              "amostras": deque(maxlen=AMOSTRAS_POR_OPERACAO)}
+            op["contagem"] += 1
+            op["total"] += segundos
+            op["linhas"] += linhas or 0
+            op["amostras"].append(segundos)
+        if segundos >= self.limiar:
+            self._registrar_lenta(nome, segundos, linhas, detalhe)
+
+    def registrar_desde(self, nome, inicio):
+        """Registra e imprime o tempo desde `inicio` (perf_counter), ex.: até a tela de login."""
+        if not self.ativa:
+            return
+        segundos = time.perf_counter() - inicio
+        self.registrar(nome, segundos)
+        print(f"{nome}: {segundos:.2f}s")
+
+    def informar(self, nome, valor):
+        """Guarda (no JSON, em "informacoes") e imprime um valor de diagnóstico, só com a instrumentação ligada."""
+        if not self.ativa:
+            return
+        with self._lock:
+            self._informacoes[nome] = valor
+        print(f"{nome}: {valor}")
+
+    def _registrar_lenta(self, nome, segundos, linhas, detalhe):
+        texto = str(detalhe or "")
+        if len(texto) > TAMANHO_MAX_DETALHE:
+            texto = texto[:TAMANHO_MAX_DETALHE] + "..."
+        linha = (f"{datetime.now().isoformat(timespec='seconds')}\t{nome}\t{segundos * 1000:.1f} ms"
+                 f"\tlinhas={linhas if linhas is not None else '-'}\t{texto}\n")
+        try:
+            with self._lock, open(self.log_lentas, "a", encoding="utf-8") as f:
+                f.write(linha)
+        except OSError as e:
+            print("Erro ao gravar o log de operações lentas:", e)
+
+    def medir(self, nome, linhas=None, detalhe=None):
+        """
+        Decorador. linhas(resultado, *args, **kwargs) -> nº de linhas afetadas;
+        detalhe(*args, **kwargs) -> texto do log de lentas (só é montado se a
+        operação passar do limiar).
+        """
+        def decorador(funcao):
+            @functools.wraps(funcao)
+            def medida(*args, **kwargs):
+                if not self.ativa:
+                    return funcao(*args, **kwargs)
+                inicio = time.perf_counter()
+                resultado = funcao(*args, **kwargs)
+                segundos = time.perf_counter() - inicio
+                n = linhas(resultado, *args, **kwargs) if linhas is not None else None
+                info = detalhe(*args, **kwargs) if detalhe is not None and segundos >= self.limiar else None
+                self.registrar(nome, segundos, n, info)
+                return resultado
+            return medida
+        return decorador
+
+    def resumo(self):
+        """{operação: contagem, linhas, total_s, p50_ms, p95_ms, max_ms}, da mais custosa à menos."""
+        with self._lock:
+            copia = {nome: (op["contagem"], op["total"], op["linhas"], sorted(op["amostras"]))
+                     for nome, op in self._operacoes.items()}
+        resultado = {}
+        for nome, (contagem, total, linhas, amostras) in sorted(copia.items(), key=lambda i: -i[1][1]):
+            resultado[nome] = {
+                "contagem": contagem,
+                "linhas": linhas,
+                "total_s": round(total, 4),
+                "p50_ms": round(_percentil(amostras, 0.50) * 1000, 2),
+                "p95_ms": round(_percentil(amostras, 0.95) * 1000, 2),
+                "max_ms": round(amostras[-1] * 1000, 2),
+            }
+        return resultado
+
+    def gravar_json(self, caminho=METRICAS_ARQUIVO):
+        with self._lock:
+            informacoes = dict(self._informacoes)
+        dados = {"data": datetime.now().isoformat(timespec="seconds"), "operacoes": self.resumo(),
+                 "informacoes": informacoes}
+        tmp = caminho + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, caminho)
+
+    # ---------- dump periódico ----------
+    def iniciar_dump(self, caminho=METRICAS_ARQUIVO, intervalo=METRICAS_INTERVALO):
+        """Grava o resumo a cada `intervalo` segundos (e ao parar). Não faz nada se desligada."""
+        if not self.ativa or self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop_dump, args=(caminho, intervalo),
+                                        name="metricas", daemon=True)
+        self._thread.start()
+
+    def _loop_dump(self, caminho, intervalo):
+        while not self._parar.wait(intervalo):
+            try:
+                self.gravar_json(caminho)
+            except OSError as e:
+                print("Erro ao gravar as métricas:", e)
+
+    def parar_dump(self, caminho=METRICAS_ARQUIVO):
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join()
+        self._thread = None
+        try:
+            self.gravar_json(caminho)
+        except OSError as e:
+            print("Erro ao gravar as métricas:", e)
+
+
+METRICAS = Metricas(ativa=INSTRUMENTACAO or os.environ.get("ERP_INSTRUMENTACAO") == "1")
+medir = METRICAS.medir
@@ -0,0 +1,206 @@
+# journal.py
+import os
+import json
+import threading
+from datetime import datetime
+from config import JOURNAL_FILE, JOURNAL_INTERVALO_COMPACTACAO
+from core import gravar_linha, gravar_valor, restaurar_tipos
+
+OPERACOES = ("inserir", "atualizar", "excluir")
+
+
+def _mapa_chaves(df, coluna):
+    # chave (como texto) -> rótulos das linhas com ela, na ordem da aba
+    mapa = {}
+    for chave, rotulo in zip(df[coluna].astype(str).tolist(), df.index.tolist()):
+        mapa.setdefault(chave, []).append(rotulo)
+    return mapa
+
+
+def aplicar_registros(tabelas, registros):
+    """
+    Aplica registros do journal, em ordem, sobre o dict de DataFrames.
+    As operações são feitas pela chave da aba (primeira coluna), então reaplicar
+    o mesmo registro não duplica linhas (inserir/atualizar funcionam como upsert).
+    As chaves de cada aba são indexadas uma vez por chamada e as linhas
+    excluídas saem todas no fim: O(linhas + registros), não o produto.
+    """
+    mapas, excluidas, proximos = {}, {}, {}
+    for registro in registros:
+        tabela = registro["tabela"]
+        df = tabelas.get(tabela)
+        if df is None:
+            continue
+        coluna = df.columns[0]
+        if tabela not in mapas:
+            mapas[tabela] = _mapa_chaves(df, coluna)
+            excluidas[tabela] = []
+            proximos[tabela] = int(df.index.max()) + 1 if len(df) else 0
+        mapa = mapas[tabela]
+        chave = str(registro["chave"])
+
+        if registro["operacao"] == "excluir":
+            excluidas[tabela].extend(mapa.pop(chave, []))
+            continue
+
+        dados = registro.get("dados") or {}
+        if chave not in mapa and coluna in dados:
+            # edição que trocou a chave e já tinha sido gravada no workbook
+            chave = str(dados[coluna])
+        rotulos = mapa.get(chave)
+        if rotulos:
+            # chave repetida: vale a primeira linha da aba (os rótulos crescem com a posição)
+            rotulo = min(rotulos)
+            for col, val in dados.items():
+                if col in df.columns:
+                    gravar_valor(df, rotulo, col, val)
+            if coluna in dados and str(dados[coluna]) != chave:
+                rotulos.remove(rotulo)
+                if not rotulos:
+                    del mapa[chave]
+                mapa.setdefault(str(dados[coluna]), []).append(rotulo)
+        else:
+            rotulo = proximos[tabela]
+            proximos[tabela] += 1
+            gravar_linha(df, rotulo, [dados.get(col) for col in df.columns])
+            mapa.setdefault(str(dados.get(coluna)), []).append(rotulo)
+
+    for tabela, rotulos in excluidas.items():
+        if rotulos:
+            df = tabelas[tabela]
+            df.drop(rotulos, inplace=True)
+            df.reset_index(drop=True, inplace=True)
+
+
+def aplicar_registro(tabelas, registro):
+    """Aplica um registro do journal (ver aplicar_registros)."""
+    aplicar_registros(tabelas, [registro])
+
+
+class JournalAlteracoes:
+    """
+    Journal append-only: cada alteração vira uma linha JSON no fim do arquivo.
+    O workbook só é reescrito na compactação (ver CompactadorJournal).
+    """
+
+    def __init__(self, caminho=JOURNAL_FILE):
+        self.caminho = caminho
+        # protege o arquivo e os DataFrames durante a cópia feita pela compactação
+        self.lock = threading.RLock()
+        self._seq = max((r["seq"] for r in self.pendentes()), default=0)
+
+    @property
+    def seq(self):
+        """
+        seq do último registro gravado (0 se nenhum). Lido com o lock, marca
+        até onde vai uma cópia das tabelas (para truncar ou reaplicar depois).
+        """
+        return self._seq
+
+    def registrar(self, tabela, operacao, chave, dados=None):
+        if operacao not in OPERACOES:
+            raise ValueError(f"Operação inválida no journal: {operacao}")
+        with self.lock:
+            self._seq += 1
+            registro = {
+                "seq": self._seq,
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "tabela": tabela,
+                "operacao": operacao,
+                "chave": str(chave),
+                "dados": dados,
+            }
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return self._seq
+
+    def pendentes(self):
+        """Registros ainda não incorporados ao workbook."""
+        if not os.path.exists(self.caminho):
+            return []
+        registros = []
+        with open(self.caminho, encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    # última linha incompleta (queda durante a escrita): ignora
+                    break
+        return registros
+
+    def aplicar(self, tabelas):
+        """Reaplica os registros pendentes nos DataFrames. Retorna quantos foram aplicados."""
+        registros = self.pendentes()
+        tipos = {nome: df.dtypes.to_dict() for nome, df in tabelas.items()}
+        aplicar_registros(tabelas, registros)
+        # colunas compactas alargadas pelas inclusões: reconvertidas uma vez só
+        for nome, df in tabelas.items():
+            restaurar_tipos(df, tipos[nome])
+        return len(registros)
+
+    def truncar(self, ate_seq):
+        """Remove do journal os registros com seq <= ate_seq (já gravados no workbook)."""
+        with self.lock:
+            restantes = [r for r in self.pendentes() if r["seq"] > ate_seq]
+            if not restantes:
+                if os.path.exists(self.caminho):
+                    os.remove(self.caminho)
+                return
+            tmp = self.caminho + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for r in restantes:
+                    f.write(json.dumps(r, ensure_ascii=False, default=str) + "\n")
+            os.replace(tmp, self.caminho)
+
+
+class CompactadorJournal:
+    """
+    Incorpora o journal ao workbook em segundo plano, a cada `intervalo`
+    segundos, e uma última vez ao parar (saída do app).
+
+    obter_tabelas: função que retorna o dict de DataFrames atual
+    gravar: função que recebe uma cópia do dict e escreve o workbook (deve lançar exceção em caso de erro)
+    """
+
+    def __init__(self, journal, obter_tabelas, gravar, intervalo=JOURNAL_INTERVALO_COMPACTACAO):
+        self.journal = journal
+        self.obter_tabelas = obter_tabelas
+        self.gravar = gravar
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, name="compactador-journal", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.compactar()
+            except Exception as e:
+                # mantém o journal; a próxima rodada tenta de novo
+                print("Erro na compactação do journal:", e)
+
+    def compactar(self):
+        with self.journal.lock:
+            ate_seq = self.journal.seq
+            if ate_seq == 0 or not os.path.exists(self.journal.caminho):
+                return False
+            copia = {nome: df.copy() for nome, df in self.obter_tabelas().items()}
+        # a escrita do xlsx (lenta) acontece fora do lock
+        self.gravar(copia)
+        self.journal.truncar(ate_seq)
+        return True
+
+    def parar(self, compactar=True):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        if compactar:
+            self.compactar()
@@ -0,0 +1,125 @@
+# migracao.py
+"""
+Migra a planilha (produtos.xlsx) para o banco SQLite usado pelo app_aprimorado.
+
+As abas são lidas linha a linha com openpyxl em modo read_only e gravadas em
+lotes com executemany, então a memória usada não depende do tamanho da planilha.
+
+Uso:
+    python migracao.py [--excel produtos.xlsx] [--db erp_database.db] [--lote 50000]
+"""
+import re
+import sys
+import time
+import argparse
+import unicodedata
+from openpyxl import load_workbook
+from config import EXCEL_FILE, DB_NAME
+from core import DatabaseManager
+
+# aba da planilha -> tabela no banco (na ordem de importação)
+ABAS_TABELAS = [
+    ("Produtos", "Produtos"),
+    ("Vendedores", "Vendedores"),
+    ("Vendas", "Vendas"),
+]
+COLUNAS_CODIGO = ["codigo_produto", "codigo_venda", "id_vendedor"]
+TAMANHO_LOTE = 50000
+
+
+def coluna_db(cabecalho):
+    """
+    Converte o cabeçalho da planilha para o nome da coluna no banco:
+    'Código do Produto' -> 'codigo_produto', 'Qnt. Vendida' -> 'qnt_vendida'.
+    """
+    texto = unicodedata.normalize("NFKD", str(cabecalho))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch)).lower()
+    palavras = [p for p in re.split(r"[^a-z0-9]+", texto) if p and p not in ("do", "da", "de")]
+    return "_".join(palavras)
+
+
+def _valor(col, val):
+    if val is None:
+        return None
+    if col in COLUNAS_CODIGO:
+        if isinstance(val, float) and val.is_integer():
+            val = int(val)
+        return str(val).strip().upper()
+    if isinstance(val, str):
+        return val.strip()
+    return val
+
+
+def migrar_aba(conn, ws, tabela, lote=TAMANHO_LOTE):
+    """Importa uma aba para a tabela. Retorna o número de linhas gravadas."""
+    linhas = ws.iter_rows(values_only=True)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return 0
+
+    colunas_tabela = {r[1] for r in conn.execute(f"PRAGMA table_info({tabela})")}
+    # posição na planilha -> coluna no banco (colunas desconhecidas são ignoradas)
+    mapa = [(i, coluna_db(c)) for i, c in enumerate(cabecalho) if c is not None]
+    mapa = [(i, c) for i, c in mapa if c in colunas_tabela]
+    if not mapa:
+        print(f"  {tabela}: nenhuma coluna reconhecida no cabeçalho {cabecalho}")
+        return 0
+
+    cols = [c for _, c in mapa]
+    query = f"INSERT OR REPLACE INTO {tabela} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})"
+
+    total = 0
+    buffer = []
+    for linha in linhas:
+        valores = tuple(_valor(c, linha[i] if i < len(linha) else None) for i, c in mapa)
+        if all(v is None for v in valores):
+            continue
+        buffer.append(valores)
+        if len(buffer) >= lote:
+            with conn:
+                conn.executemany(query, buffer)
+            total += len(buffer)
+            buffer.clear()
+    if buffer:
+        with conn:
+            conn.executemany(query, buffer)
+        total += len(buffer)
+    return total
+
+
+def migrar(excel_file=EXCEL_FILE, db_name=DB_NAME, lote=TAMANHO_LOTE):
+    """Importa Produtos, Vendedores e Vendas. Retorna {tabela: linhas}."""
+    db = DatabaseManager(db_name)
+    wb = load_workbook(excel_file, read_only=True, data_only=True)
+    resultado = {}
+    inicio_total = time.perf_counter()
+    try:
+        for aba, tabela in ABAS_TABELAS:
+            if aba not in wb.sheetnames:
+                print(f"  aba '{aba}' não encontrada, ignorada")
+                continue
+            inicio = time.perf_counter()
+            n = migrar_aba(db.conn, wb[aba], tabela, lote)
+            dt = time.perf_counter() - inicio
+            print(f"  {tabela}: {n} linhas em {dt:.2f}s ({n / dt if dt else 0:,.0f} linhas/s)")
+            resultado[tabela] = n
+    finally:
+        wb.close()
+        db.close()
+    dt = time.perf_counter() - inicio_total
+    n = sum(resultado.values())
+    print(f"Total: {n} linhas em {dt:.2f}s ({n / dt if dt else 0:,.0f} linhas/s)")
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra a planilha Excel para o banco SQLite.")
+    parser.add_argument("--excel", default=EXCEL_FILE)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação")
+    args = parser.parse_args()
+    try:
+        migrar(args.excel, args.db, args.lote)
+    except FileNotFoundError as e:
+        print("Arquivo não encontrado:", e)
+        sys.exit(1)
@@ -0,0 +1,212 @@
+# nota_fiscal.py
+"""
+Geração de PDF de nota fiscal, sem dependência da interface. O reportlab
+só é importado na primeira nota gerada.
+
+Além da nota avulsa (usada pelos pop-ups), há o modo em lote: emite as notas
+de um conjunto de Vendas (por período ou lista de códigos) em paralelo, com
+um processo por núcleo, e imprime um resumo no fim.
+
+Uso:
+    python nota_fiscal.py --inicio 2025-12-01 --fim 2025-12-31 [--saida notas]
+    python nota_fiscal.py --codigos 1000 1001 --combinado notas_dezembro.pdf
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from config import DB_NAME
+
+NOTAS_POR_TAREFA = 200
+
+
+def _novo_canvas(nome_pdf):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    return canvas.Canvas(nome_pdf, pagesize=A4)
+
+
+def _pypdf_disponivel():
+    try:
+        import pypdf  # noqa: F401
+        return True
+    except ImportError:  # opcional: sem pypdf o PDF combinado é desenhado num só processo
+        return False
+
+
+def desenhar_nota(c, nf_dados):
+    """Desenha uma nota na página atual do canvas."""
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, 800, f"NOTA FISCAL - Nº {nf_dados.get('Número NF','0001')}")
+
+    c.setFont("Helvetica", 10)
+    y = 770
+    for k, v in nf_dados.items():
+        c.drawString(50, y, f"{k}: {v}")
+        y -= 15
+
+
+def gerar_pdf(nf_dados, nome_pdf):
+    """Gera o PDF de uma nota. Lança exceção em caso de erro."""
+    c = _novo_canvas(nome_pdf)
+    desenhar_nota(c, nf_dados)
+    c.save()
+    return nome_pdf
+
+
+# ------------------- MODO EM LOTE -------------------
+
+def carregar_vendas(db_name=DB_NAME, inicio=None, fim=None, codigos=None):
+    """Lê as vendas a faturar, já com os dados do produto e do vendedor."""
+    query = """
+        SELECT v.codigo_venda, v.data_venda, v.codigo_produto, v.nome_produto,
+               v.qnt_vendida, p.valor_venda, v.id_vendedor, vd.nome
+        FROM Vendas v
+        LEFT JOIN Produtos p ON p.codigo_produto = v.codigo_produto
+        LEFT JOIN Vendedores vd ON vd.id_vendedor = v.id_vendedor
+        WHERE 1 = 1
+    """
+    params = []
+    if inicio:
+        query += " AND date(v.data_venda) >= date(?)"
+        params.append(inicio)
+    if fim:
+        query += " AND date(v.data_venda) <= date(?)"
+        params.append(fim)
+    if codigos:
+        query += f" AND v.codigo_venda IN ({', '.join(['?'] * len(codigos))})"
+        params.extend(codigos)
+    query += " ORDER BY v.codigo_venda"
+
+    conn = sqlite3.connect(db_name)
+    try:
+        linhas = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    notas = []
+    for cod, data, cod_prod, nome_prod, qnt, valor_unit, id_vdr, nome_vdr in linhas:
+        valor_unit = valor_unit or 0.0
+        notas.append({
+            "Número NF": cod,
+            "Data": data,
+            "Codigo Produto": cod_prod,
+            "Produto": nome_prod,
+            "Quantidade": qnt,
+            "Valor Unitário": f"{valor_unit:.2f}",
+            "Valor Total": f"{(qnt or 0) * valor_unit:.2f}",
+            "Vendedor": f"{id_vdr} - {nome_vdr or ''}",
+        })
+    return notas
+
+
+def _nome_arquivo(pasta, nf_dados):
+    codigo = re.sub(r"[^\w.-]", "_", str(nf_dados.get("Número NF", "")))
+    return os.path.join(pasta, f"NotaFiscal_{codigo}.pdf")
+
+
+def _gerar_individuais(notas, pasta):
+    """Tarefa de um processo: uma nota por arquivo. Retorna (ok, falhas)."""
+    ok, falhas = 0, []
+    for nf in notas:
+        try:
+            gerar_pdf(nf, _nome_arquivo(pasta, nf))
+            ok += 1
+        except Exception as e:
+            falhas.append((nf.get("Número NF"), str(e)))
+    return ok, falhas
+
+
+def _gerar_parte(notas, nome_pdf):
+    """Tarefa de um processo: várias notas, uma por página, num único arquivo."""
+    ok, falhas = 0, []
+    c = _novo_canvas(nome_pdf)
+    for nf in notas:
+        try:
+            desenhar_nota(c, nf)
+            c.showPage()
+            ok += 1
+        except Exception as e:
+            falhas.append((nf.get("Número NF"), str(e)))
+    c.save()
+    return ok, falhas
+
+
+def _juntar_pdfs(partes, destino):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for parte in partes:
+        writer.append(parte)
+    with open(destino, "wb") as f:
+        writer.write(f)
+
+
+def gerar_lote(notas, saida=".", combinado=None, processos=None, por_tarefa=NOTAS_POR_TAREFA):
+    """
+    Emite as notas em paralelo. Com `combinado`, gera um único PDF com uma
+    nota por página; senão, um PDF por nota em `saida`.
+    Retorna um dict de resumo (total, ok, falhas, segundos, notas_por_segundo).
+    """
+    inicio = time.perf_counter()
+    blocos = [notas[i:i + por_tarefa] for i in range(0, len(notas), por_tarefa)]
+    ok, falhas = 0, []
+
+    if combinado and not _pypdf_disponivel():
+        ok, falhas = _gerar_parte(notas, combinado)
+    elif combinado:
+        # cada processo desenha uma parte; as partes são juntadas na ordem
+        with tempfile.TemporaryDirectory() as tmp:
+            partes = [os.path.join(tmp, f"parte_{i:05d}.pdf") for i in range(len(blocos))]
+            with ProcessPoolExecutor(max_workers=processos) as pool:
+                for n_ok, n_falhas in pool.map(_gerar_parte, blocos, partes):
+                    ok += n_ok
+                    falhas.extend(n_falhas)
+            _juntar_pdfs(partes, combinado)
+    else:
+        os.makedirs(saida, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            for n_ok, n_falhas in pool.map(_gerar_individuais, blocos, [saida] * len(blocos)):
+                ok += n_ok
+                falhas.extend(n_falhas)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "total": len(notas),
+        "ok": ok,
+        "falhas": falhas,
+        "segundos": segundos,
+        "notas_por_segundo": ok / segundos if segundos else 0.0,
+    }
+
+
+def imprimir_resumo(resumo):
+    print(f"Notas emitidas: {resumo['ok']}/{resumo['total']} em {resumo['segundos']:.2f}s "
+          f"({resumo['notas_por_segundo']:,.0f} notas/s)")
+    if resumo["falhas"]:
+        print(f"Falhas ({len(resumo['falhas'])}):")
+        for codigo, erro in resumo["falhas"]:
+            print(f"  venda {codigo}: {erro}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emite notas fiscais em lote a partir das Vendas.")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--inicio", help="data inicial (AAAA-MM-DD)")
+    parser.add_argument("--fim", help="data final (AAAA-MM-DD)")
+    parser.add_argument("--codigos", nargs="+", help="códigos de venda")
+    parser.add_argument("--saida", default="notas", help="pasta para um PDF por nota")
+    parser.add_argument("--combinado", help="gera um único PDF com todas as notas")
+    parser.add_argument("--processos", type=int, default=None, help="padrão: nº de núcleos")
+    args = parser.parse_args()
+
+    notas = carregar_vendas(args.db, args.inicio, args.fim, args.codigos)
+    if not notas:
+        print("Nenhuma venda encontrada para os filtros informados.")
+        sys.exit(0)
+    resumo = gerar_lote(notas, args.saida, args.combinado, args.processos)
+    imprimir_resumo(resumo)
+    sys.exit(1 if resumo["falhas"] else 0)
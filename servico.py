@@ -0,0 +1,492 @@
+# servico.py
+"""
+Serviço HTTP local (só a biblioteca padrão) com o motor de estoque e vendas,
+para leitores de código de barras, outros caixas e scripts usarem o mesmo
+erp_database.db que os apps, sem passar pela interface.
+
+Leituras: as requisições são atendidas por um pool fixo de threads e cada
+uma abre a sua conexão de leitura na primeira requisição e a reaproveita
+nas seguintes (com WAL, leitura não espera escrita). Uma conexão keep-alive
+ocupa o seu atendente até fechar: parada, fecha em TEMPO_OCIOSO; e, se há
+conexões esperando um atendente, cada resposta sai com "Connection: close",
+para clientes parados não deixarem os outros na fila.
+
+Escritas: os checkouts vão para uma única thread gravadora, dona do
+DatabaseManager. Ela junta os carrinhos que chegaram enquanto o lote
+anterior era gravado (até LOTE_VENDAS) e grava todos numa transação, com
+um commit só (DatabaseManager.finalizar_vendas); um carrinho recusado não
+desfaz os outros.
+
+Rotas (respostas em JSON; erros como {"erro": ...}):
+    GET  /saude
+    GET  /produtos/<codigo>
+    GET  /produtos?busca=agua sani&limite=20     busca por código, nome e categoria
+    GET  /produtos?depois=<codigo>&limite=100    catálogo paginado pelo código
+    GET  /estoque/<codigo>                       quantidade, estoque mínimo e versão
+    GET  /estoque-baixo                          produtos abaixo do mínimo
+    GET  /alertas?depois_de=0                    alertas de estoque baixo
+    GET  /alteracoes?depois_de=0&tabela=Vendas   log de alterações (seq > depois_de), para sincronizar
+    GET  /relatorios/vendas?periodo=dia&dimensao=produto&inicio=2025-12-01&fim=2025-12-31
+    POST /vendas        {"itens": [{"codigo_produto": "001", "qnt_vendida": 2}], "id_vendedor": "V001"}
+    POST /vendas/lote   {"carrinhos": [{"itens": [...], "id_vendedor": ...}, ...]}
+
+Códigos: 400 requisição inválida, 404 rota ou produto inexistente, 409
+estoque insuficiente ou código de venda repetido, 503 venda que não
+começou a ser gravada em TEMPO_GRAVACAO (saiu da fila sem gravar nada;
+pode ser reenviada), 500 erro interno.
+
+Uso:
+    python servico.py [--db erp_database.db] [--host 127.0.0.1] [--porta 8765] [--atendentes 8]
+                      [--tempo-ocioso 5] [--lote 100]
+
+Com porta 0 o sistema escolhe uma porta livre (servidor.server_address),
+o que permite testar tudo em localhost.
+"""
+import json
+import queue
+import sqlite3
+import argparse
+import threading
+from itertools import islice
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as TempoEsgotado
+from urllib.parse import urlsplit, parse_qs, unquote
+from config import DB_NAME
+from core import (DatabaseManager, ErroVenda, ProdutoNaoEncontrado, EstoqueInsuficiente,
+                  FILTRO_ESTOQUE_BAIXO, alertas_estoque, alteracoes, consulta_busca, consultar_resumo)
+from instrumentacao import medir
+
+HOST = "127.0.0.1"
+PORTA = 8765
+ATENDENTES = 8  # threads que atendem as requisições (uma conexão de leitura cada)
+LOTE_VENDAS = 100  # carrinhos gravados por transação
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 1000
+TEMPO_OCIOSO = 5  # segundos até fechar uma conexão keep-alive parada (libera o atendente)
+TEMPO_GRAVACAO = 30  # segundos esperando a thread gravadora começar a gravar o carrinho
+TAMANHO_MAX_CORPO = 1 << 20
+
+
+class ErroRequisicao(Exception):
+    """Requisição inválida (400)."""
+
+
+# ------------------- ESCRITA -------------------
+
+class GravadorVendas:
+    """
+    Thread única de escrita. registrar() enfileira um carrinho e devolve um
+    Future com a lista de codigo_venda gravados (ou a exceção que o recusou).
+    """
+
+    def __init__(self, db_path, lote=LOTE_VENDAS):
+        self.db_path = db_path
+        self.lote = lote
+        self._fila = queue.Queue()
+        self._pronto = threading.Event()
+        self._erro = None
+        self._thread = threading.Thread(target=self._executar, name="gravador-vendas", daemon=True)
+        self._thread.start()
+        # o DatabaseManager (e as migrações) é criado na thread dele; espera
+        # para as conexões de leitura já encontrarem o schema atualizado
+        self._pronto.wait()
+        if self._erro:
+            raise self._erro
+
+    def registrar(self, itens, id_vendedor=None):
+        futuro = Future()
+        self._fila.put((itens, id_vendedor, futuro))
+        return futuro
+
+    def encerrar(self):
+        """Grava o que já estava na fila e para a thread."""
+        self._fila.put(None)
+        self._thread.join()
+
+    def _executar(self):
+        try:
+            db = DatabaseManager(self.db_path)
+        except Exception as e:
+            self._erro = e
+            self._pronto.set()
+            return
+        self._pronto.set()
+        try:
+            fim = False
+            while not fim:
+                pedido = self._fila.get()
+                if pedido is None:
+                    break
+                lote = [pedido]
+                # o que chegou enquanto o lote anterior era gravado vai junto
+                while len(lote) < self.lote:
+                    try:
+                        pedido = self._fila.get_nowait()
+                    except queue.Empty:
+                        break
+                    if pedido is None:
+                        fim = True
+                        break
+                    lote.append(pedido)
+                self._gravar(db, lote)
+        finally:
+            db.close()
+
+    @medir("gravar_lote_vendas", linhas=lambda r, self, db, lote: len(lote))
+    def _gravar(self, db, lote):
+        # carrinhos cancelados por quem esperou demais não são gravados; os
+        # demais ficam "em execução" e não podem mais ser cancelados
+        lote = [pedido for pedido in lote if pedido[2].set_running_or_notify_cancel()]
+        if not lote:
+            return
+        try:
+            resultados = db.finalizar_vendas([(itens, id_vendedor) for itens, id_vendedor, _ in lote])
+        except Exception as e:  # erro de banco: o lote inteiro foi desfeito
+            for _, _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        for (_, _, futuro), resultado in zip(lote, resultados):
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+
+# ------------------- SERVIDOR -------------------
+
+class ServidorERP(ThreadingMixIn, HTTPServer):
+    """
+    HTTPServer com um pool fixo de atendentes no lugar de uma thread nova
+    por conexão, para cada atendente reaproveitar a sua conexão de leitura.
+    """
+    daemon_threads = True
+
+    def __init__(self, endereco, db_path=DB_NAME, atendentes=ATENDENTES, lote=LOTE_VENDAS,
+                 tempo_ocioso=TEMPO_OCIOSO):
+        self.db_path = db_path
+        self.tempo_ocioso = tempo_ocioso
+        self.gravador = GravadorVendas(db_path, lote)
+        self._pool = ThreadPoolExecutor(max_workers=atendentes, thread_name_prefix="atendente")
+        self._na_fila = 0  # conexões aceitas esperando um atendente livre
+        self._lock_fila = threading.Lock()
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock_conexoes = threading.Lock()
+        try:
+            super().__init__(endereco, Atendente)
+        except Exception:
+            self._pool.shutdown()
+            self.gravador.encerrar()
+            raise
+
+    def process_request(self, request, client_address):
+        with self._lock_fila:
+            self._na_fila += 1
+        self._pool.submit(self._atender_conexao, request, client_address)
+
+    def _atender_conexao(self, request, client_address):
+        with self._lock_fila:
+            self._na_fila -= 1
+        self.process_request_thread(request, client_address)
+
+    def clientes_esperando(self):
+        """Se há conexões aceitas que ainda não ganharam um atendente."""
+        return self._na_fila > 0
+
+    def conexao(self):
+        """Conexão de leitura da thread atual (aberta na primeira requisição dela)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False só para server_close poder fechá-la
+            conn = self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            with self._lock_conexoes:
+                self._conexoes.append(conn)
+        return conn
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+        self.gravador.encerrar()
+        with self._lock_conexoes:
+            for conn in self._conexoes:
+                conn.close()
+            self._conexoes.clear()
+
+
+def criar_servidor(db_path=DB_NAME, host=HOST, porta=PORTA, atendentes=ATENDENTES, lote=LOTE_VENDAS,
+                   tempo_ocioso=TEMPO_OCIOSO):
+    """Servidor pronto para serve_forever(); chame server_close() ao terminar."""
+    return ServidorERP((host, porta), db_path, atendentes, lote, tempo_ocioso)
+
+
+# ------------------- ROTAS -------------------
+
+def _linhas(cursor):
+    colunas = [d[0] for d in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+
+def _inteiro(params, nome, padrao, minimo=0, maximo=None):
+    try:
+        valor = int(params.get(nome, padrao))
+    except ValueError:
+        raise ErroRequisicao(f"'{nome}' deve ser um número inteiro.")
+    if valor < minimo:
+        raise ErroRequisicao(f"'{nome}' deve ser pelo menos {minimo}.")
+    return min(valor, maximo) if maximo is not None else valor
+
+
+def _carrinho(corpo):
+    if not isinstance(corpo, dict) or not isinstance(corpo.get("itens"), list) or not corpo["itens"]:
+        raise ErroRequisicao("O carrinho deve ter uma lista 'itens' não vazia.")
+    for item in corpo["itens"]:
+        if not isinstance(item, dict) or "codigo_produto" not in item or "qnt_vendida" not in item:
+            raise ErroRequisicao("Cada item precisa de 'codigo_produto' e 'qnt_vendida'.")
+    return corpo["itens"], corpo.get("id_vendedor")
+
+
+def _resultado_carrinho(erro):
+    """(status, corpo) de um carrinho recusado."""
+    if isinstance(erro, EstoqueInsuficiente):
+        return HTTPStatus.CONFLICT, {"erro": str(erro), "codigo_produto": erro.codigo_produto,
+                                     "disponivel": erro.disponivel, "pedido": erro.pedido}
+    if isinstance(erro, ProdutoNaoEncontrado):
+        return HTTPStatus.NOT_FOUND, {"erro": str(erro)}
+    if isinstance(erro, sqlite3.IntegrityError):
+        return HTTPStatus.CONFLICT, {"erro": f"Código de venda já cadastrado ({erro})."}
+    if isinstance(erro, (ErroVenda, KeyError, TypeError, ValueError)):
+        return HTTPStatus.BAD_REQUEST, {"erro": str(erro)}
+    # erro de banco: o lote foi desfeito, nada deste carrinho foi gravado
+    print("Erro ao gravar vendas:", erro)
+    return HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": "Erro ao gravar a venda; nada foi registrado."}
+
+
+def _aguardar(futuro):
+    """
+    (status, corpo) do carrinho enfileirado. Se a gravação não começou em
+    TEMPO_GRAVACAO, ele é retirado da fila (503, nada gravado, o cliente pode
+    reenviar); se já começou, espera o fim, para não responder erro sobre
+    uma venda que vai ser gravada.
+    """
+    try:
+        try:
+            codigos = futuro.result(TEMPO_GRAVACAO)
+        except TempoEsgotado:
+            if futuro.cancel():
+                return HTTPStatus.SERVICE_UNAVAILABLE, {
+                    "erro": "Serviço ocupado: a venda não foi registrada e pode ser reenviada."}
+            codigos = futuro.result()
+    except Exception as e:
+        return _resultado_carrinho(e)
+    return HTTPStatus.CREATED, {"codigos_venda": codigos}
+
+
+def rota_saude(atendente, params):
+    versao = atendente.server.conexao().execute("PRAGMA user_version").fetchone()[0]
+    return HTTPStatus.OK, {"ok": True, "schema": versao}
+
+
+def rota_produto(atendente, params, codigo):
+    cursor = atendente.server.conexao().execute("SELECT * FROM Produtos WHERE codigo_produto = ?", (codigo,))
+    linhas = _linhas(cursor)
+    if not linhas:
+        raise ProdutoNaoEncontrado(f"Codigo do Produto não encontrado: {codigo}")
+    return HTTPStatus.OK, linhas[0]
+
+
+def rota_produtos(atendente, params):
+    conn = atendente.server.conexao()
+    limite = _inteiro(params, "limite", LIMITE_PADRAO, 1, LIMITE_MAXIMO)
+    if "busca" in params:
+        consulta = consulta_busca(params["busca"])
+        if consulta is None:
+            raise ErroRequisicao("'busca' sem palavras.")
+        cursor = conn.execute(
+            "SELECT p.* FROM Produtos_busca JOIN Produtos p ON p.rowid = Produtos_busca.rowid "
+            "WHERE Produtos_busca MATCH ? ORDER BY rank LIMIT ?", (consulta, limite))
+    else:
+        # paginação pela chave: ?depois=<último código da página anterior>
+        cursor = conn.execute(
+            "SELECT * FROM Produtos WHERE codigo_produto > ? ORDER BY codigo_produto LIMIT ?",
+            (params.get("depois", ""), limite))
+    return HTTPStatus.OK, _linhas(cursor)
+
+
+def rota_estoque(atendente, params, codigo):
+    cursor = atendente.server.conexao().execute(
+        "SELECT codigo_produto, quantidade, estoque_minimo, versao FROM Produtos WHERE codigo_produto = ?",
+        (codigo,))
+    linhas = _linhas(cursor)
+    if not linhas:
+        raise ProdutoNaoEncontrado(f"Codigo do Produto não encontrado: {codigo}")
+    return HTTPStatus.OK, linhas[0]
+
+
+def rota_estoque_baixo(atendente, params):
+    cursor = atendente.server.conexao().execute(
+        "SELECT codigo_produto, nome_produto, quantidade, estoque_minimo FROM Produtos "
+        f"WHERE {FILTRO_ESTOQUE_BAIXO} ORDER BY codigo_produto")
+    return HTTPStatus.OK, _linhas(cursor)
+
+
+def rota_alertas(atendente, params):
+    depois_de = _inteiro(params, "depois_de", 0)
+    colunas = ["id", "codigo_produto", "nome_produto", "quantidade", "estoque_minimo", "data"]
+    return HTTPStatus.OK, [dict(zip(colunas, a)) for a in alertas_estoque(atendente.server.conexao(), depois_de)]
+
+
+def rota_alteracoes(atendente, params):
+    depois_de = _inteiro(params, "depois_de", 0)
+    limite = _inteiro(params, "limite", LIMITE_MAXIMO, 1, LIMITE_MAXIMO)
+    tabelas = [params["tabela"]] if "tabela" in params else None
+    colunas = ["seq", "tabela", "operacao", "chave", "dados", "data"]
+    lidas = islice(alteracoes(atendente.server.conexao(), depois_de, tabelas, lote=limite), limite)
+    return HTTPStatus.OK, [dict(zip(colunas, a)) for a in lidas]
+
+
+def rota_relatorio_vendas(atendente, params):
+    try:
+        resumo = consultar_resumo(atendente.server.conexao(), params.get("periodo", "dia"),
+                                  params.get("dimensao", "produto"), params.get("inicio"), params.get("fim"))
+    except ValueError as e:
+        raise ErroRequisicao(str(e))
+    return HTTPStatus.OK, resumo.to_dict("records")
+
+
+def rota_venda(atendente, params):
+    itens, id_vendedor = _carrinho(atendente.ler_json())
+    return _aguardar(atendente.server.gravador.registrar(itens, id_vendedor))
+
+
+def rota_vendas_lote(atendente, params):
+    corpo = atendente.ler_json()
+    if not isinstance(corpo, dict) or not isinstance(corpo.get("carrinhos"), list):
+        raise ErroRequisicao("O corpo deve ter uma lista 'carrinhos'.")
+    carrinhos = [_carrinho(c) for c in corpo["carrinhos"]]
+    futuros = [atendente.server.gravador.registrar(itens, id_vendedor) for itens, id_vendedor in carrinhos]
+    resultados = []
+    for futuro in futuros:
+        status, corpo = _aguardar(futuro)
+        resultados.append({"status": status, **corpo})
+    return HTTPStatus.OK, resultados
+
+
+# (método, partes do caminho) -> rota; "*" casa com qualquer parte, que vai como argumento
+ROTAS = [
+    ("GET", ("saude",), rota_saude),
+    ("GET", ("produtos",), rota_produtos),
+    ("GET", ("produtos", "*"), rota_produto),
+    # fora de /estoque/<codigo>, para não esconder um produto de código "baixo"
+    ("GET", ("estoque-baixo",), rota_estoque_baixo),
+    ("GET", ("estoque", "*"), rota_estoque),
+    ("GET", ("alertas",), rota_alertas),
+    ("GET", ("alteracoes",), rota_alteracoes),
+    ("GET", ("relatorios", "vendas"), rota_relatorio_vendas),
+    ("POST", ("vendas",), rota_venda),
+    ("POST", ("vendas", "lote"), rota_vendas_lote),
+]
+
+
+def _casar(padrao, partes):
+    if len(padrao) != len(partes):
+        return None
+    argumentos = []
+    for esperado, parte in zip(padrao, partes):
+        if esperado == "*":
+            argumentos.append(parte)
+        elif esperado != parte:
+            return None
+    return argumentos
+
+
+class Atendente(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: o cliente reaproveita a conexão
+    server_version = "ERPServico/1.0"
+    registrar_acessos = False  # --verbose: uma linha por requisição no stderr
+
+    def setup(self):
+        # conexão keep-alive parada fecha em tempo_ocioso (libera o atendente)
+        self.timeout = self.server.tempo_ocioso
+        super().setup()
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def log_message(self, formato, *args):
+        if self.registrar_acessos:
+            super().log_message(formato, *args)
+
+    def ler_json(self):
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ErroRequisicao("Content-Length inválido.")
+        if tamanho > TAMANHO_MAX_CORPO:
+            self.close_connection = True  # o corpo não lido não pode ficar na conexão
+            raise ErroRequisicao("Corpo da requisição grande demais.")
+        try:
+            return json.loads(self.rfile.read(tamanho) or b"null")
+        except ValueError as e:
+            raise ErroRequisicao(f"JSON inválido: {e}")
+
+    def _atender(self, metodo):
+        url = urlsplit(self.path)
+        partes = [unquote(p) for p in url.path.split("/") if p]
+        params = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        try:
+            for metodo_rota, padrao, rota in ROTAS:
+                argumentos = _casar(padrao, partes) if metodo_rota == metodo else None
+                if argumentos is not None:
+                    status, corpo = rota(self, params, *argumentos)
+                    break
+            else:
+                self.close_connection = metodo == "POST" or self.close_connection
+                status, corpo = HTTPStatus.NOT_FOUND, {"erro": f"Rota não encontrada: {metodo} {url.path}"}
+        except ErroRequisicao as e:
+            status, corpo = HTTPStatus.BAD_REQUEST, {"erro": str(e)}
+        except ProdutoNaoEncontrado as e:
+            status, corpo = HTTPStatus.NOT_FOUND, {"erro": str(e)}
+        except Exception as e:
+            print(f"Erro no serviço ({metodo} {self.path}):", e)
+            status, corpo = HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": "Erro interno."}
+        self._responder(status, corpo)
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        if self.close_connection or self.server.clientes_esperando():
+            # outro cliente espera um atendente: este não fica preso no keep-alive
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(dados)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de estoque e vendas (JSON).")
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--atendentes", type=int, default=ATENDENTES, help="threads de atendimento")
+    parser.add_argument("--tempo-ocioso", type=float, default=TEMPO_OCIOSO,
+                        help="segundos até fechar uma conexão keep-alive parada")
+    parser.add_argument("--lote", type=int, default=LOTE_VENDAS, help="carrinhos por transação")
+    parser.add_argument("--verbose", action="store_true", help="registra cada requisição no stderr")
+    args = parser.parse_args()
+
+    Atendente.registrar_acessos = args.verbose
+    servidor = criar_servidor(args.db, args.host, args.porta, args.atendentes, args.lote, args.tempo_ocioso)
+    host, porta = servidor.server_address[:2]
+    print(f"Serviço em http://{host}:{porta} (banco {args.db}); Ctrl+C para parar.")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,218 @@
+# snapshot.py
+"""
+Cache binário das abas da planilha, para a abertura não passar pelo
+openpyxl quando o workbook não mudou.
+
+Cada aba é guardada num arquivo Feather (pyarrow) na pasta SNAPSHOT_DIR,
+ao lado do workbook; nada que se leia dali executa código, como um pickle
+executaria numa pasta compartilhada. Sem pyarrow, ou se uma aba não couber
+no Arrow (texto e número na mesma coluna), não há snapshot e o workbook é
+lido a cada abertura. Um manifesto JSON registra o
+mtime e o tamanho do workbook de onde o snapshot saiu e a lista de abas:
+se o xlsx mudar por fora (editado no Excel, backup restaurado), a chave
+não confere e o snapshot é refeito na leitura seguinte, numa única passada
+pelo arquivo (ler_workbook: um único ExcelFile para todas as abas, com as
+abas grandes lidas em processos à parte quando há mais de uma e mais de um
+núcleo). Quem grava o workbook chama atualizar() logo em seguida, para a
+próxima abertura já encontrar o snapshot em dia.
+
+As abas voltam com os tipos com que foram guardadas (os compactos, se o
+snapshot veio de uma gravação do app); as células vazias, gravadas pelo app
+como "" ou None, voltam como NaN, como o read_excel as leria do xlsx.
+"""
+import os
+import sys
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config import SNAPSHOT_DIR
+from instrumentacao import medir
+
+# abas com pelo menos essas células (pela dimensão gravada no xlsx) são
+# lidas em paralelo; abaixo disso, subir um processo custa mais que ler
+CELULAS_ABA_GRANDE = 200_000
+
+# leitura, reconstrução e atualização de um mesmo processo não se cruzam
+_lock = threading.Lock()
+
+
+def _feather_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:  # sem pyarrow não há snapshot: o workbook é sempre lido
+        return False
+
+
+DISPONIVEL = _feather_disponivel()
+
+
+def _pasta(arquivo):
+    return os.path.join(os.path.dirname(os.path.abspath(arquivo)), SNAPSHOT_DIR)
+
+
+def _caminho_manifesto(arquivo):
+    return os.path.join(_pasta(arquivo), os.path.basename(arquivo) + ".json")
+
+
+def chave(arquivo):
+    """[mtime em ns, tamanho] do workbook; muda a cada gravação."""
+    st = os.stat(arquivo)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _como_no_xlsx(df):
+    """Cópia do DataFrame com "" e None trocados por NaN, como voltariam do xlsx."""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            if "" in serie.cat.categories:
+                df[col] = serie.cat.remove_categories([""])
+        elif pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype):
+            vazias = serie.isna() | (serie == "")
+            if vazias.any():
+                df[col] = serie.mask(vazias, np.nan)
+    return df
+
+
+def _gravar_aba(df, destino):
+    """Grava o DataFrame em destino.feather (via arquivo temporário); retorna o nome do arquivo."""
+    _como_no_xlsx(df).to_feather(destino + ".tmp")
+    os.replace(destino + ".tmp", destino + ".feather")
+    return os.path.basename(destino) + ".feather"
+
+
+def _atualizar(arquivo, abas, chave_workbook):
+    pasta = _pasta(arquivo)
+    base = os.path.basename(arquivo)
+    os.makedirs(pasta, exist_ok=True)
+    # o manifesto antigo sai antes: se uma aba falhar, não sobra snapshot pela metade
+    if os.path.exists(_caminho_manifesto(arquivo)):
+        os.remove(_caminho_manifesto(arquivo))
+    nomes = {aba: _gravar_aba(df, os.path.join(pasta, f"{base}.{i}")) for i, (aba, df) in enumerate(abas.items())}
+    manifesto = {"chave": chave_workbook, "abas": nomes}
+    tmp = _caminho_manifesto(arquivo) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+    os.replace(tmp, _caminho_manifesto(arquivo))
+    # abas que deixaram de existir no workbook
+    for nome in os.listdir(pasta):
+        if nome.startswith(base + ".") and nome not in nomes.values() and not nome.endswith((".json", ".tmp")):
+            os.remove(os.path.join(pasta, nome))
+
+
+def atualizar(arquivo, abas, chave_workbook=None):
+    """
+    Guarda o snapshot das abas (nome -> DataFrame) que acabaram de ser
+    gravadas no workbook; devem ser todas as abas do arquivo. Um erro aqui
+    só é impresso: a próxima leitura refaz o snapshot pelo xlsx.
+    """
+    if not DISPONIVEL:
+        return
+    with _lock:
+        try:
+            _atualizar(arquivo, abas, chave_workbook or chave(arquivo))
+        except Exception as e:
+            print("Erro ao gravar o snapshot da planilha:", e)
+
+
+def descartar(arquivo):
+    """Apaga o snapshot do workbook (a próxima leitura passa pelo xlsx)."""
+    with _lock:
+        pasta = _pasta(arquivo)
+        if not os.path.isdir(pasta):
+            return
+        base = os.path.basename(arquivo)
+        for nome in os.listdir(pasta):
+            if nome.startswith(base + "."):
+                os.remove(os.path.join(pasta, nome))
+
+
+def _do_snapshot(arquivo, abas):
+    """As abas pedidas (as que existem no workbook) ou None se o snapshot não está em dia."""
+    try:
+        with open(_caminho_manifesto(arquivo), encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifesto.get("chave") != chave(arquivo):
+        return None
+    # só Feather: arquivos de outro formato (pickle de versões antigas) não são abertos
+    if not all(nome.endswith(".feather") for nome in manifesto["abas"].values()):
+        return None
+    try:
+        return {aba: pd.read_feather(os.path.join(_pasta(arquivo), manifesto["abas"][aba]))
+                for aba in abas if aba in manifesto["abas"]}
+    except Exception as e:
+        print("Snapshot da planilha ilegível, relendo o workbook:", e)
+        return None
+
+
+def _celulas(ws):
+    # dimensão declarada no xlsx, sem percorrer a aba (0 se o arquivo não a tiver)
+    return (ws.max_row or 0) * (ws.max_column or 0)
+
+
+def _ler_aba_xlsx(arquivo, aba):
+    """Tarefa de um processo: uma aba do workbook."""
+    return pd.read_excel(arquivo, sheet_name=aba, engine="openpyxl")
+
+
+@medir("ler_workbook", linhas=lambda r, *a, **k: sum(len(df) for df in r.values()),
+       detalhe=lambda arquivo, *a, **k: arquivo)
+def ler_workbook(arquivo, processos=None):
+    """
+    Todas as abas {nome: DataFrame}, como pd.read_excel(sheet_name=None),
+    com o workbook aberto uma vez só. Se houver duas ou mais abas grandes
+    (CELULAS_ABA_GRANDE) e mais de um processo disponível, as grandes, menos
+    a maior, são lidas em processos à parte enquanto este lê a maior e as
+    pequenas (no executável congelado, todas aqui, uma depois da outra).
+    processos: limite de processos (padrão: núcleos da máquina).
+    """
+    processos = processos or os.cpu_count() or 1
+    with pd.ExcelFile(arquivo, engine="openpyxl") as xls:
+        tamanhos = {aba: _celulas(xls.book[aba]) for aba in xls.sheet_names}
+        grandes = sorted((aba for aba, n in tamanhos.items() if n >= CELULAS_ABA_GRANDE),
+                         key=tamanhos.get, reverse=True)[1:processos]
+        # no executável congelado (PyInstaller) cada processo abriria outro app
+        if not grandes or getattr(sys, "frozen", False):
+            return {aba: xls.parse(aba) for aba in xls.sheet_names}
+        with ProcessPoolExecutor(max_workers=len(grandes)) as pool:
+            futuros = {aba: pool.submit(_ler_aba_xlsx, arquivo, aba) for aba in grandes}
+            locais = {aba: xls.parse(aba) for aba in xls.sheet_names if aba not in futuros}
+            return {aba: futuros[aba].result() if aba in futuros else locais[aba] for aba in xls.sheet_names}
+
+
+def _projetar(df, usecols):
+    if usecols is None:
+        return df
+    faltando = [c for c in usecols if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes na aba: {', '.join(map(str, faltando))}")
+    pedidas = set(usecols)
+    return df[[c for c in df.columns if c in pedidas]]
+
+
+def ler_abas(arquivo, abas, colunas=None):
+    """
+    {aba: DataFrame} das abas pedidas que existem no workbook (as ausentes
+    ficam de fora), como pd.read_excel as leria. Vêm do snapshot quando ele
+    está em dia; senão o workbook é lido uma vez, inteiro, e o snapshot refeito.
+    colunas: {aba: [nomes]} para ler só essas colunas (na ordem da aba).
+    Lança FileNotFoundError se o workbook não existir.
+    """
+    colunas = colunas or {}
+    with _lock:
+        tabelas = _do_snapshot(arquivo, abas) if DISPONIVEL else None
+        if tabelas is None:
+            chave_workbook = chave(arquivo)
+            tabelas = ler_workbook(arquivo)
+            if DISPONIVEL:
+                try:
+                    _atualizar(arquivo, tabelas, chave_workbook)
+                except Exception as e:
+                    print("Erro ao gravar o snapshot da planilha:", e)
+    return {aba: _projetar(tabelas[aba], colunas.get(aba)) for aba in abas if aba in tabelas}
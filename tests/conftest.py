@@ -0,0 +1,32 @@
+# tests/conftest.py
+"""
+Testes sem interface: cada teste roda numa pasta temporária própria (o
+banco, a planilha e o journal do config.py são caminhos relativos).
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def pasta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def db(pasta):
+    """Banco novo, com os dois produtos de exemplo (001: 10 un., 002: 20 un.) e o vendedor V001."""
+    db = DatabaseManager(str(pasta / "erp.db"))
+    yield db
+    db.close()
+
+
+def resumos(conn):
+    """ResumoVendas inteira, ordenada, para comparar estados."""
+    return conn.execute("SELECT periodo, inicio, dimensao, chave, quantidade, vendas FROM ResumoVendas "
+                        "ORDER BY periodo, dimensao, inicio, chave").fetchall()
@@ -0,0 +1,56 @@
+# tests/test_cache.py
+import numpy as np
+import pandas as pd
+import core
+from core import CacheTabela, compactar_tabela, padronizar_coluna, padronizar_texto
+
+
+def _produtos(n):
+    return compactar_tabela(pd.DataFrame({
+        "Codigo Produto": [f"{i:04d}" for i in range(n)],
+        "Categoria": ["Limpeza", "Casa"] * (n // 2),
+        "Quantidade": np.arange(n, dtype=np.int64),
+    }))
+
+
+def test_cache_inclui_exclui_e_compacta_sem_mudar_rotulos_nem_tipos(monkeypatch):
+    monkeypatch.setattr(core, "RESERVA_MINIMA", 4)
+    monkeypatch.setattr(core, "MINIMO_EXCLUIDAS", 2)
+    cache = CacheTabela(_produtos(4))
+    tipos = [t.name for t in cache.df.dtypes]
+
+    rotulos = [cache.incluir([f"N{i}", "Nova", i]) for i in range(6)]  # passa da primeira reserva
+    assert rotulos == list(range(4, 10))
+    assert len(cache) == 10
+    assert cache.at[7, "Codigo Produto"] == "N3"
+
+    for rotulo in (5, 5, 0, 6, 8):  # a repetida não conta; a terceira exclusão compacta
+        cache.excluir(rotulo)
+    assert len(cache) == 6
+    assert cache.df.index.tolist() == [1, 2, 3, 4, 7, 9]
+    assert cache.at[9, "Codigo Produto"] == "N5"
+
+    cache.gravar(9, ["N5", "Casa", 50])
+    assert cache.incluir(["N6", "Casa", 60]) == 10
+    df = cache.df
+    assert df["Codigo Produto"].tolist() == ["0001", "0002", "0003", "N0", "N3", "N5", "N6"]
+    assert df["Quantidade"].tolist() == [1, 2, 3, 0, 3, 50, 60]
+    assert [t.name for t in df.dtypes] == tipos
+
+
+def test_cache_de_tabela_vazia():
+    cache = CacheTabela(pd.DataFrame({"Codigo Produto": pd.Series([], dtype=object),
+                                      "Quantidade": pd.Series([], dtype=np.int32)}))
+    assert len(cache) == 0 and cache.df.empty
+    rotulo = cache.incluir(["001", 5])
+    assert cache.df.loc[rotulo].tolist() == ["001", 5]
+
+
+def test_padronizar_coluna_igual_a_padronizar_texto():
+    valores = [" v001 ", "x", None, np.nan, 12, 1.5, "é ", "a\nb ", "", "(11) 98765-4321",
+               " +55 11 3333 4444 ", "١٢٣٤٥٦٧٨٩٠١"]
+    for col in ("Id Vendedor", "Nome", "Telefone"):
+        for serie in (pd.Series(valores, dtype=object),
+                      pd.Series([v for v in valores if isinstance(v, str)], dtype="category")):
+            esperado = serie.map(lambda v: padronizar_texto(col, v)).tolist()
+            assert padronizar_coluna(col, serie).tolist() == esperado, col
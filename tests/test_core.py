@@ -0,0 +1,164 @@
+# tests/test_core.py
+import sqlite3
+import pytest
+from conftest import resumos
+from core import (DatabaseManager, EstoqueInsuficiente, ProdutoNaoEncontrado, SCHEMA_VERSION,
+                  alteracoes, ultima_alteracao)
+
+
+def _quantidade(db, codigo):
+    return db.conn.execute("SELECT quantidade FROM Produtos WHERE codigo_produto = ?", (codigo,)).fetchone()[0]
+
+
+def _total_vendas(db):
+    return db.conn.execute("SELECT COUNT(*) FROM Vendas").fetchone()[0]
+
+
+# ------------------- MIGRAÇÕES -------------------
+
+def test_banco_novo_na_versao_atual(db):
+    assert SCHEMA_VERSION == 7
+    assert db.versao_schema() == SCHEMA_VERSION
+
+
+def test_migra_banco_antigo_com_dados(pasta):
+    # banco da versão 0: só as três tabelas, já com um produto e uma venda
+    caminho = str(pasta / "antigo.db")
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE Produtos (codigo_produto TEXT PRIMARY KEY, nome_produto TEXT NOT NULL, categoria TEXT,
+            quantidade INTEGER DEFAULT 0, volume TEXT, valor_compra REAL DEFAULT 0.0,
+            valor_venda REAL DEFAULT 0.0, valor_mercado REAL DEFAULT 0.0);
+        CREATE TABLE Vendedores (id_vendedor TEXT PRIMARY KEY, nome TEXT NOT NULL, telefone TEXT, email TEXT);
+        CREATE TABLE Vendas (codigo_venda TEXT PRIMARY KEY, codigo_produto TEXT, nome_produto TEXT,
+            id_vendedor TEXT, qnt_vendida INTEGER DEFAULT 1, data_venda TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO Produtos VALUES ('P1', 'Sabão', 'Limpeza', 3, '1kg', 1, 2, 3);
+        INSERT INTO Vendas VALUES ('V1', 'P1', 'Sabão', NULL, 2, '2025-12-01 10:00:00');
+    """)
+    conn.close()
+
+    db = DatabaseManager(caminho)
+    try:
+        assert db.versao_schema() == SCHEMA_VERSION
+        colunas = db.colunas("Produtos")
+        assert {"estoque_minimo", "versao"} <= set(colunas)
+        # os dados existentes entram nos resumos, na busca e no log de alterações
+        total = db.resumo_vendas("dia", "total")
+        assert total[["inicio", "quantidade", "vendas"]].values.tolist() == [["2025-12-01", 2, 1]]
+        assert db.resumo_vendas("dia", "categoria")["chave"].tolist() == ["Limpeza"]
+        assert db.conn.execute("SELECT COUNT(*) FROM Produtos_busca WHERE Produtos_busca MATCH 'sabao'").fetchone()[0] == 1
+        chaves = {(tabela, chave) for _, tabela, operacao, chave, _, _ in alteracoes(db.conn) if operacao == "inserir"}
+        assert {("Produtos", "P1"), ("Vendas", "V1")} <= chaves
+    finally:
+        db.close()
+
+    # reabrir não aplica nada de novo
+    db = DatabaseManager(caminho)
+    try:
+        assert db.versao_schema() == SCHEMA_VERSION
+    finally:
+        db.close()
+
+
+# ------------------- VENDAS -------------------
+
+def test_finalizar_venda_baixa_o_estoque(db):
+    codigos = db.finalizar_venda([{"codigo_produto": "001", "qnt_vendida": 4},
+                                  {"codigo_produto": "002", "qnt_vendida": 1}], id_vendedor="V001")
+    assert len(codigos) == 2
+    assert (_quantidade(db, "001"), _quantidade(db, "002")) == (6, 19)
+
+
+def test_finalizar_venda_sem_estoque_nao_grava_nada(db):
+    with pytest.raises(EstoqueInsuficiente) as erro:
+        # 001 tem 10: o carrinho pede 6 + 6 do mesmo produto
+        db.finalizar_venda([{"codigo_produto": "002", "qnt_vendida": 1},
+                            {"codigo_produto": "001", "qnt_vendida": 6},
+                            {"codigo_produto": "001", "qnt_vendida": 6}])
+    assert (erro.value.codigo_produto, erro.value.disponivel, erro.value.pedido) == ("001", 10, 12)
+    assert _total_vendas(db) == 0
+    assert (_quantidade(db, "001"), _quantidade(db, "002")) == (10, 20)
+
+
+def test_finalizar_venda_produto_inexistente(db):
+    with pytest.raises(ProdutoNaoEncontrado):
+        db.finalizar_venda([{"codigo_produto": "999", "qnt_vendida": 1}])
+    assert _total_vendas(db) == 0
+
+
+def test_finalizar_vendas_recusa_so_o_carrinho_sem_estoque(db):
+    resultados = db.finalizar_vendas([
+        ([{"codigo_produto": "001", "qnt_vendida": 8}], "V001"),
+        ([{"codigo_produto": "001", "qnt_vendida": 3}], "V001"),  # sobram 2
+        ([{"codigo_produto": "001", "qnt_vendida": 2}], None),
+    ])
+    assert isinstance(resultados[0], list) and isinstance(resultados[2], list)
+    assert isinstance(resultados[1], EstoqueInsuficiente)
+    assert resultados[1].disponivel == 2
+    assert _quantidade(db, "001") == 0
+    assert _total_vendas(db) == 2
+
+
+# ------------------- RESUMOS -------------------
+
+def test_resumos_acompanham_a_recategorizacao(db):
+    db.finalizar_venda([{"codigo_produto": "001", "qnt_vendida": 2}, {"codigo_produto": "002", "qnt_vendida": 3}])
+    db.finalizar_venda([{"codigo_produto": "001", "qnt_vendida": 1}])
+
+    db.atualizar("Produtos", "001", {"categoria": "Casa"})
+    categorias = dict(db.resumo_vendas("dia", "categoria")[["chave", "quantidade"]].values.tolist())
+    assert categorias == {"Casa": 3, "Limpeza": 3}
+
+    # troca do código e exclusão do produto também movem as vendas dele
+    db.atualizar("Produtos", "002", {"codigo_produto": "002B"})
+    db.excluir("Produtos", "001")
+    esperado = resumos(db.conn)
+    db.reconstruir_resumos()
+    assert resumos(db.conn) == esperado
+    categorias = dict(db.resumo_vendas("dia", "categoria")[["chave", "quantidade"]].values.tolist())
+    assert categorias == {"": 6}
+
+
+def test_resumos_retiram_a_venda_excluida(db):
+    codigos = db.finalizar_venda([{"codigo_produto": "001", "qnt_vendida": 2}])
+    db.finalizar_venda([{"codigo_produto": "001", "qnt_vendida": 1}])
+    db.excluir("Vendas", codigos[0])
+    esperado = resumos(db.conn)
+    db.reconstruir_resumos()
+    assert resumos(db.conn) == esperado
+    assert db.resumo_vendas("dia", "total")["quantidade"].tolist() == [1]
+
+
+# ------------------- LOG DE ALTERAÇÕES -------------------
+
+def test_alteracoes_registram_cada_operacao_em_ordem(db):
+    inicio = ultima_alteracao(db.conn)
+    db.inserir("Produtos", {"codigo_produto": "003", "nome_produto": "Detergente", "quantidade": 5})
+    db.atualizar("Produtos", "003", {"quantidade": 4})
+    db.atualizar("Produtos", "003", {"codigo_produto": "004"})
+    db.excluir("Produtos", "004")
+    db.finalizar_venda([{"codigo_produto": "002", "qnt_vendida": 1}])
+
+    lidas = list(alteracoes(db.conn, inicio))
+    assert [s for s, *_ in lidas] == sorted(s for s, *_ in lidas)
+    assert [(t, op, chave) for _, t, op, chave, _, _ in lidas] == [
+        ("Produtos", "inserir", "003"),
+        ("Produtos", "atualizar", "003"),
+        ("Produtos", "excluir", "003"),  # chave trocada: a antiga deixa de existir
+        ("Produtos", "atualizar", "004"),
+        ("Produtos", "excluir", "004"),
+        ("Vendas", "inserir", lidas[5][3]),
+        ("Produtos", "atualizar", "002"),
+    ]
+    assert lidas[1][4]["quantidade"] == 4
+    assert lidas[6][4]["quantidade"] == 19
+    # cursor e filtro por tabela
+    assert [op for _, _, op, _, _, _ in alteracoes(db.conn, lidas[4][0], ["Vendas"])] == ["inserir"]
+    assert list(alteracoes(db.conn, lidas[-1][0])) == []
+
+
+def test_alteracoes_em_lotes(db):
+    for i in range(25):
+        db.ajustar_estoque("002", -1 if i % 2 else 1)
+    todas = list(alteracoes(db.conn))
+    assert list(alteracoes(db.conn, lote=7)) == todas
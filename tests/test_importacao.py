@@ -0,0 +1,74 @@
+# tests/test_importacao.py
+import pandas as pd
+import pytest
+from importacao import importar_vendas
+
+CABECALHO = "Código de Venda,Código do Produto,ID do Vendedor,Qnt. Vendida\n"
+
+
+def _arquivo(pasta, linhas, nome="vendas.csv"):
+    caminho = pasta / nome
+    caminho.write_text(CABECALHO + "".join(l + "\n" for l in linhas), encoding="utf-8")
+    return str(caminho)
+
+
+def _quantidade(db, codigo):
+    return db.conn.execute("SELECT quantidade FROM Produtos WHERE codigo_produto = ?", (codigo,)).fetchone()[0]
+
+
+def test_linhas_invalidas_vao_para_o_arquivo_de_erros(db, pasta):
+    caminho = _arquivo(pasta, [
+        " c1 ,001,v001,4",        # ok (códigos padronizados)
+        "c2,001,V001,",           # sem quantidade
+        "c3,001,V001,1.5",        # quantidade não inteira
+        "c4,001,V001,-2",         # quantidade negativa
+        "c1,002,V001,1",          # código repetido no arquivo
+        "c5,999,V001,1",          # produto não cadastrado
+        "c6,001,V001,50",         # mais que o estoque (10)
+        "c7,001,V001,6",          # ok: 4 + 6 = 10
+        "c8,001,V001,1",          # acumulado passaria de 10
+        "c9,002,,2",              # ok, sem vendedor
+    ])
+    resumo = importar_vendas(db, caminho, tamanho_bloco=3)
+
+    assert (resumo["total"], resumo["importadas"], resumo["rejeitadas"]) == (10, 3, 7)
+    erros = pd.read_csv(resumo["arquivo_erros"], dtype=str)
+    motivos = dict(zip(erros["linha"].astype(int), erros["motivo"]))
+    assert sorted(motivos) == [3, 4, 5, 6, 7, 8, 10]
+    assert motivos[3] == "campo 'qnt_vendida' é obrigatório"
+    assert motivos[4] == "quantidade vendida deve ser um número inteiro"
+    assert motivos[5] == "quantidade vendida deve ser positiva"
+    assert motivos[6] == "código de venda repetido no arquivo"
+    assert motivos[7] == "produto não cadastrado"
+    assert motivos[8].startswith("estoque insuficiente")
+    assert motivos[10].startswith("estoque insuficiente")
+
+    vendas = db.conn.execute("SELECT codigo_venda, codigo_produto, nome_produto, id_vendedor, qnt_vendida "
+                             "FROM Vendas ORDER BY codigo_venda").fetchall()
+    assert vendas == [("C1", "001", "Vanish 1L", "V001", 4), ("C7", "001", "Vanish 1L", "V001", 6),
+                      ("C9", "002", "Água Sanitária 1L", None, 2)]
+    assert (_quantidade(db, "001"), _quantidade(db, "002")) == (0, 18)
+
+
+def test_codigo_ja_cadastrado_e_rejeitado(db, pasta):
+    db.finalizar_venda([{"codigo_produto": "002", "qnt_vendida": 1, "codigo_venda": "C1"}])
+    resumo = importar_vendas(db, _arquivo(pasta, ["c1,002,V001,1", "c2,002,V001,1"]))
+    assert (resumo["importadas"], resumo["rejeitadas"]) == (1, 1)
+    erros = pd.read_csv(resumo["arquivo_erros"], dtype=str)
+    assert erros["motivo"].tolist() == ["código de venda já cadastrado"]
+    assert _quantidade(db, "002") == 18
+
+
+def test_sem_rejeicoes_nao_cria_arquivo_de_erros(db, pasta):
+    resumo = importar_vendas(db, _arquivo(pasta, ["c1,002,V001,1"]))
+    assert resumo["rejeitadas"] == 0 and resumo["arquivo_erros"] is None
+    assert not (pasta / "vendas_erros.csv").exists()
+
+
+def test_coluna_obrigatoria_ausente_nao_grava_nada(db, pasta):
+    caminho = pasta / "vendas.csv"
+    caminho.write_text("Código de Venda,Código do Produto\nc1,001\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        importar_vendas(db, str(caminho))
+    assert db.conn.execute("SELECT COUNT(*) FROM Vendas").fetchone()[0] == 0
+    assert not db.conn.in_transaction
@@ -0,0 +1,122 @@
+# tests/test_journal.py
+import pandas as pd
+import pytest
+from core import compactar_tabela
+from journal import CompactadorJournal, JournalAlteracoes, aplicar_registros
+
+
+def _tabelas():
+    return {
+        "Produtos": pd.DataFrame({
+            "Código do Produto": ["001", "002", "003"],
+            "Nome do Produto": ["Vanish", "Água", "Sabão"],
+            "Quantidade": [10, 20, 30],
+        }),
+    }
+
+
+def _registrar_exemplo(journal):
+    journal.registrar("Produtos", "inserir", "004",
+                      {"Código do Produto": "004", "Nome do Produto": "Detergente", "Quantidade": 5})
+    journal.registrar("Produtos", "atualizar", "001", {"Quantidade": 7})
+    journal.registrar("Produtos", "excluir", "002")
+    # troca de código: os registros seguintes usam a chave nova
+    journal.registrar("Produtos", "atualizar", "003", {"Código do Produto": "003B"})
+    journal.registrar("Produtos", "atualizar", "003B", {"Quantidade": 29})
+
+
+ESPERADO = [["001", "Vanish", 7], ["003B", "Sabão", 29], ["004", "Detergente", 5]]
+
+
+def test_reaplica_os_registros_pendentes(pasta):
+    journal = JournalAlteracoes(str(pasta / "produtos.journal"))
+    _registrar_exemplo(journal)
+    assert journal.seq == 5
+
+    tabelas = _tabelas()
+    assert journal.aplicar(tabelas) == 5
+    df = tabelas["Produtos"]
+    assert df.values.tolist() == ESPERADO
+    assert df.index.tolist() == [0, 1, 2]
+
+    # reaplicar (queda antes de truncar) não duplica nem desfaz nada
+    journal.aplicar(tabelas)
+    assert tabelas["Produtos"].values.tolist() == ESPERADO
+
+
+def test_reaplicar_mantem_os_tipos_compactos(pasta):
+    journal = JournalAlteracoes(str(pasta / "produtos.journal"))
+    _registrar_exemplo(journal)
+    tabelas = {"Produtos": compactar_tabela(_tabelas()["Produtos"], limite_categoria=1.0)}
+    tipos = [t.name for t in tabelas["Produtos"].dtypes]
+    assert tipos == ["category", "category", "int32"]
+    journal.aplicar(tabelas)
+    assert [t.name for t in tabelas["Produtos"].dtypes] == tipos
+    assert tabelas["Produtos"].astype(object).values.tolist() == ESPERADO
+
+
+def test_journal_reaberto_continua_o_seq(pasta):
+    caminho = str(pasta / "produtos.journal")
+    _registrar_exemplo(JournalAlteracoes(caminho))
+    journal = JournalAlteracoes(caminho)
+    assert journal.seq == 5
+    assert journal.registrar("Produtos", "excluir", "004") == 6
+
+
+def test_ultima_linha_incompleta_e_ignorada(pasta):
+    caminho = str(pasta / "produtos.journal")
+    journal = JournalAlteracoes(caminho)
+    _registrar_exemplo(journal)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write('{"seq": 6, "tabela": "Produ')
+    assert len(journal.pendentes()) == 5
+
+
+def test_registros_em_lote_iguais_a_um_por_vez(pasta):
+    journal = JournalAlteracoes(str(pasta / "produtos.journal"))
+    _registrar_exemplo(journal)
+    registros = journal.pendentes()
+    em_lote, um_a_um = _tabelas(), _tabelas()
+    aplicar_registros(em_lote, registros)
+    for registro in registros:
+        aplicar_registros(um_a_um, [registro])
+    pd.testing.assert_frame_equal(em_lote["Produtos"], um_a_um["Produtos"])
+
+
+def test_compactacao_grava_e_trunca_so_o_que_foi_copiado(pasta):
+    journal = JournalAlteracoes(str(pasta / "produtos.journal"))
+    tabelas = _tabelas()
+    _registrar_exemplo(journal)
+    journal.aplicar(tabelas)
+
+    gravadas = []
+
+    def gravar(copia):
+        gravadas.append(copia)
+        # alteração feita enquanto o workbook era escrito: fica no journal
+        journal.registrar("Produtos", "atualizar", "001", {"Quantidade": 1})
+
+    compactador = CompactadorJournal(journal, lambda: tabelas, gravar, intervalo=3600)
+    assert compactador.compactar() is True
+    assert gravadas[0]["Produtos"].values.tolist() == ESPERADO
+    assert gravadas[0]["Produtos"] is not tabelas["Produtos"]
+    assert [r["seq"] for r in journal.pendentes()] == [6]
+
+    # sem nada pendente, não grava
+    journal.truncar(journal.seq)
+    assert not (pasta / "produtos.journal").exists()
+    assert compactador.compactar() is False
+    assert len(gravadas) == 1
+
+
+def test_compactacao_com_erro_mantem_o_journal(pasta):
+    journal = JournalAlteracoes(str(pasta / "produtos.journal"))
+    _registrar_exemplo(journal)
+
+    def gravar(copia):
+        raise OSError("disco cheio")
+
+    compactador = CompactadorJournal(journal, _tabelas, gravar, intervalo=3600)
+    with pytest.raises(OSError):
+        compactador.compactar()
+    assert len(journal.pendentes()) == 5
@@ -0,0 +1,104 @@
+# tests/test_servico.py
+import json
+import sqlite3
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from core import DatabaseManager
+from servico import criar_servidor
+
+
+@pytest.fixture
+def servidor(pasta):
+    caminho = str(pasta / "erp.db")
+    DatabaseManager(caminho).close()  # produtos de exemplo: 001 (10 un.) e 002 (20 un.)
+    servidor = criar_servidor(caminho, porta=0, atendentes=4, tempo_ocioso=0.5)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    thread.join()
+
+
+def _pedir(servidor, metodo, caminho, corpo=None):
+    host, porta = servidor.server_address[:2]
+    conexao = http.client.HTTPConnection(host, porta, timeout=30)
+    try:
+        dados = json.dumps(corpo).encode("utf-8") if corpo is not None else None
+        conexao.request(metodo, caminho, body=dados, headers={"Content-Type": "application/json"})
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read())
+    finally:
+        conexao.close()
+
+
+def _quantidade(servidor, codigo):
+    return _pedir(servidor, "GET", f"/estoque/{codigo}")[1]["quantidade"]
+
+
+def test_carrinhos_concorrentes_nao_vendem_alem_do_estoque(servidor):
+    # 30 caixas disputam as 10 unidades do 001; cada carrinho leva também 1 do 002
+    carrinho = {"itens": [{"codigo_produto": "001", "qnt_vendida": 1},
+                          {"codigo_produto": "002", "qnt_vendida": 1}], "id_vendedor": "V001"}
+    with ThreadPoolExecutor(max_workers=30) as pool:
+        respostas = list(pool.map(lambda _: _pedir(servidor, "POST", "/vendas", carrinho), range(30)))
+
+    status = [s for s, _ in respostas]
+    assert status.count(201) == 10
+    assert status.count(409) == 20
+    recusas = [corpo for s, corpo in respostas if s == 409]
+    assert all(r["codigo_produto"] == "001" and r["pedido"] == 1 for r in recusas)
+    # o carrinho recusado não baixa nem o item que tinha estoque
+    assert (_quantidade(servidor, "001"), _quantidade(servidor, "002")) == (0, 10)
+
+    codigos = [c for s, corpo in respostas if s == 201 for c in corpo["codigos_venda"]]
+    assert len(codigos) == len(set(codigos)) == 20
+    with sqlite3.connect(servidor.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*), SUM(qnt_vendida) FROM Vendas").fetchone() == (20, 20)
+
+
+def test_lote_de_carrinhos(servidor):
+    status, resultados = _pedir(servidor, "POST", "/vendas/lote", {"carrinhos": [
+        {"itens": [{"codigo_produto": "001", "qnt_vendida": 7}]},
+        {"itens": [{"codigo_produto": "001", "qnt_vendida": 7}]},
+        {"itens": [{"codigo_produto": "999", "qnt_vendida": 1}]},
+    ]})
+    assert status == 200
+    assert [r["status"] for r in resultados] == [201, 409, 404]
+    assert _quantidade(servidor, "001") == 3
+
+
+def test_requisicoes_invalidas(servidor):
+    assert _pedir(servidor, "POST", "/vendas", {"itens": []})[0] == 400
+    assert _pedir(servidor, "POST", "/vendas", {"itens": [{"codigo_produto": "001", "qnt_vendida": 0}]})[0] == 400
+    assert _pedir(servidor, "GET", "/estoque/nada")[0] == 404
+    assert _pedir(servidor, "GET", "/rota/inexistente")[0] == 404
+    assert _pedir(servidor, "GET", "/saude")[1]["schema"] == 7
+
+
+def test_estoque_baixo_nao_esconde_o_produto_de_codigo_baixo(servidor):
+    with sqlite3.connect(servidor.db_path) as conn:
+        conn.execute("INSERT INTO Produtos (codigo_produto, nome_produto, quantidade) VALUES ('baixo', 'x', 1)")
+    assert _pedir(servidor, "GET", "/estoque/baixo")[1]["codigo_produto"] == "baixo"
+    assert [p["codigo_produto"] for p in _pedir(servidor, "GET", "/estoque-baixo")[1]] == ["baixo"]
+
+
+def test_cliente_keep_alive_parado_nao_prende_os_outros(pasta):
+    caminho = str(pasta / "erp.db")
+    DatabaseManager(caminho).close()
+    servidor = criar_servidor(caminho, porta=0, atendentes=1, tempo_ocioso=0.3)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, porta = servidor.server_address[:2]
+        parado = http.client.HTTPConnection(host, porta, timeout=30)
+        parado.request("GET", "/saude")
+        parado.getresponse().read()  # a conexão fica aberta (keep-alive) com o único atendente
+        assert _pedir(servidor, "GET", "/saude")[0] == 200
+        parado.close()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        thread.join()
@@ -0,0 +1,158 @@
+# trabalhador.py
+"""
+Thread de E/S dos apps: executa, em ordem, as tarefas que tocam o banco
+SQLite ou a planilha (cargas, gravações, relatórios), para que a thread do
+Tk continue redesenhando a janela.
+
+A interface envia tarefas com `executar` e recebe o resultado nos callbacks
+`ao_concluir`/`ao_falhar`, chamados sempre na thread do Tk: a fila de
+resultados é lida com `after()` enquanto houver tarefa pendente.
+`ao_ocupado(bool)` avisa quando o trabalhador começa e termina um lote de
+tarefas, para a interface exibir um indicador de ocupado (IndicadorOcupado,
+usado pelos dois apps).
+"""
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+import ttkbootstrap as ttkb
+
+INTERVALO_ENTREGA_MS = 50
+# o indicador de ocupado só aparece se a tarefa passar disso (evita piscar)
+ATRASO_INDICADOR_MS = 150
+
+
+class TrabalhadorIO:
+    def __init__(self, widget, ao_ocupado=None, intervalo=INTERVALO_ENTREGA_MS, nome="io"):
+        self.widget = widget
+        self.ao_ocupado = ao_ocupado
+        self.intervalo = intervalo
+        self._tarefas = queue.Queue()
+        self._resultados = queue.Queue()
+        self._pendentes = 0  # alterado só na thread da interface
+        self._id_entrega = None
+        self._encerrado = False
+        self._thread = threading.Thread(target=self._loop, name=nome, daemon=True)
+        self._thread.start()
+
+    # ---------- Thread da interface ----------
+    def executar(self, funcao, *args, ao_concluir=None, ao_falhar=None, **kwargs):
+        """
+        Agenda funcao(*args, **kwargs) na thread de E/S. Retorna um Future;
+        o resultado (ou a exceção) também chega em ao_concluir/ao_falhar.
+        Sem ao_falhar, o erro é impresso.
+        """
+        futuro = Future()
+        futuro.add_done_callback(lambda f: self._resultados.put(("concluir", f, ao_concluir, ao_falhar)))
+        self._pendentes += 1
+        if self._pendentes == 1 and self.ao_ocupado is not None:
+            self.ao_ocupado(True)
+        self._tarefas.put((funcao, args, kwargs, futuro))
+        if self._id_entrega is None:
+            self._id_entrega = self.widget.after(self.intervalo, self._entregar)
+        return futuro
+
+    def encerrar(self):
+        """
+        Termina as tarefas já agendadas e para a thread (bloqueia até lá).
+        Os retornos ainda não entregues são descartados.
+        """
+        if self._encerrado:
+            return
+        self._encerrado = True
+        if self._id_entrega is not None:
+            self.widget.after_cancel(self._id_entrega)
+            self._id_entrega = None
+        self._tarefas.put(None)
+        self._thread.join()
+
+    def _entregar(self):
+        self._id_entrega = None
+        while not self._encerrado:
+            try:
+                item = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == "chamar":
+                _, funcao, args = item
+                self._chamar(funcao, *args)
+                continue
+            _, futuro, ao_concluir, ao_falhar = item
+            self._pendentes -= 1
+            if futuro.cancelled():
+                continue
+            erro = futuro.exception()
+            if erro is None:
+                if ao_concluir is not None:
+                    self._chamar(ao_concluir, futuro.result())
+            elif ao_falhar is not None:
+                self._chamar(ao_falhar, erro)
+            else:
+                print("Erro na tarefa em segundo plano:", erro)
+        if self._encerrado:
+            return
+        if self._pendentes:
+            self._id_entrega = self.widget.after(self.intervalo, self._entregar)
+        elif self.ao_ocupado is not None:
+            self.ao_ocupado(False)
+
+    def _chamar(self, funcao, *args):
+        # um callback com erro não pode interromper a entrega dos demais
+        try:
+            funcao(*args)
+        except Exception:
+            traceback.print_exc()
+
+    # ---------- Thread de E/S ----------
+    def na_interface(self, funcao, *args):
+        """
+        Chamado de dentro de uma tarefa: agenda funcao(*args) na thread da
+        interface, na ordem, antes do retorno da própria tarefa.
+        """
+        self._resultados.put(("chamar", funcao, args))
+
+    def _loop(self):
+        while True:
+            item = self._tarefas.get()
+            if item is None:
+                break
+            funcao, args, kwargs, futuro = item
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(funcao(*args, **kwargs))
+            except BaseException as e:
+                futuro.set_exception(e)
+
+
+class IndicadorOcupado:
+    """
+    Barra de progresso e "Processando..." na barra de status, com o cursor
+    de espera na janela. Use como ao_ocupado do TrabalhadorIO.
+    """
+
+    def __init__(self, barra, atraso_ms=ATRASO_INDICADOR_MS):
+        self.janela = barra.winfo_toplevel()
+        self.atraso_ms = atraso_ms
+        self.progresso = ttkb.Progressbar(barra, mode="indeterminate", bootstyle="info-striped", length=160)
+        self.progresso.pack(side="right", padx=8, pady=2)
+        self.rotulo = ttkb.Label(barra, text="")
+        self.rotulo.pack(side="right")
+        self._agendado = None
+
+    def __call__(self, ocupado):
+        if ocupado:
+            self._agendado = self.janela.after(self.atraso_ms, self._mostrar)
+            return
+        if self._agendado is not None:
+            self.janela.after_cancel(self._agendado)
+            self._agendado = None
+        self.rotulo.configure(text="")
+        self.progresso.stop()
+        self.janela.configure(cursor="")
+
+    def _mostrar(self):
+        self._agendado = None
+        self.rotulo.configure(text="Processando...")
+        self.progresso.start(15)
+        self.janela.configure(cursor="watch")
@@ -0,0 +1,181 @@
+# trava.py
+"""
+Planilha usada por vários terminais (ex.: produtos.xlsx numa pasta
+compartilhada).
+
+TravaArquivo é uma trava consultiva: o arquivo <planilha>.lock, criado com
+O_EXCL (atômico também em compartilhamentos de rede). Quem não consegue
+criá-lo espera e tenta de novo. Enquanto a trava é segurada, uma thread
+renova o mtime do arquivo; uma trava sem renovação há mais que
+TRAVA_VALIDADE (terminal que caiu no meio de uma gravação) é descartada. Programas que não
+a conhecem, como o próprio Excel, continuam podendo gravar.
+
+PlanilhaCompartilhada lê e grava com a trava e guarda a chave (mtime,
+tamanho) do arquivo que este terminal leu ou gravou por último. Se na hora
+de gravar a chave for outra, alguém gravou no meio: as tabelas são relidas
+do disco e as alterações pendentes deste terminal (journal) reaplicadas
+antes da gravação, em vez de o arquivo inteiro ser sobrescrito pela cópia
+desatualizada da memória.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime
+from config import TRAVA_ESPERA, TRAVA_VALIDADE
+from snapshot import chave
+
+INTERVALO_TENTATIVA = 0.1  # segundos entre tentativas de criar a trava
+
+
+class ArquivoTravado(Exception):
+    """Outro terminal segurou a trava por mais que o tempo de espera."""
+
+
+class TravaArquivo:
+    """
+    Trava de <arquivo>.lock para usar com `with`. É reentrante dentro do
+    processo: a mesma instância pode ser usada por várias threads e aninhada
+    (só o nível mais externo cria e remove o arquivo).
+    """
+
+    def __init__(self, arquivo, espera=TRAVA_ESPERA, validade=TRAVA_VALIDADE):
+        self.caminho = arquivo + ".lock"
+        self.espera = espera
+        self.validade = validade
+        self._lock = threading.RLock()
+        self._nivel = 0
+        self._token = None
+        self._parar_renovacao = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._nivel == 0:
+            try:
+                self._criar()
+            except BaseException:
+                self._lock.release()
+                raise
+        self._nivel += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._nivel -= 1
+        if self._nivel == 0:
+            self._remover()
+        self._lock.release()
+
+    def _criar(self):
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + self.espera
+        while True:
+            try:
+                fd = os.open(self.caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if self._expirada():
+                    self._descartar_expirada()
+                    continue
+                if time.monotonic() >= limite:
+                    raise ArquivoTravado(f"A planilha está sendo gravada por outro terminal ({self._dono()}).")
+                time.sleep(INTERVALO_TENTATIVA)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"token": token, "host": socket.gethostname(), "pid": os.getpid(),
+                       "data": datetime.now().isoformat(timespec="seconds")}, f)
+        self._token = token
+        self._parar_renovacao = threading.Event()
+        threading.Thread(target=self._renovar, args=(token, self._parar_renovacao),
+                         name="renovacao-trava", daemon=True).start()
+
+    def _renovar(self, token, parar):
+        # gravação mais longa que a validade: a trava viva não pode parecer expirada
+        while not parar.wait(self.validade / 3):
+            if self._ler().get("token") != token:
+                return
+            try:
+                os.utime(self.caminho)
+            except OSError:
+                pass
+
+    def _ler(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _dono(self):
+        dono = self._ler()
+        return f"{dono.get('host', '?')}, pid {dono.get('pid', '?')}, desde {dono.get('data', '?')}"
+
+    def _expirada(self):
+        try:
+            return time.time() - os.stat(self.caminho).st_mtime > self.validade
+        except FileNotFoundError:
+            return False
+
+    def _descartar_expirada(self):
+        print(f"Trava expirada descartada: {self.caminho} ({self._dono()})")
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
+
+    def _remover(self):
+        self._parar_renovacao.set()
+        # só apaga a própria trava (a nossa pode ter sido descartada como expirada)
+        if self._ler().get("token") == self._token:
+            try:
+                os.remove(self.caminho)
+            except FileNotFoundError:
+                pass
+        self._token = None
+
+
+class PlanilhaCompartilhada:
+    """
+    Leituras e gravações de uma planilha com a trava e detecção de gravação
+    de outro terminal (ver o docstring do módulo).
+    """
+
+    def __init__(self, arquivo, espera=TRAVA_ESPERA, validade=TRAVA_VALIDADE):
+        self.arquivo = arquivo
+        self.trava = TravaArquivo(arquivo, espera, validade)
+        self.chave = None
+        # depois de um conflito a memória deste terminal não tem o que o
+        # outro gravou: toda gravação seguinte parte do disco
+        self.desatualizada = False
+
+    def _chave_atual(self):
+        try:
+            return chave(self.arquivo)
+        except FileNotFoundError:
+            return None
+
+    def ler(self, ler):
+        """Executa ler() com a trava e guarda a chave do arquivo lido."""
+        with self.trava:
+            atual = self._chave_atual()
+            resultado = ler()
+            self.chave = atual
+        return resultado
+
+    def gravar(self, tabelas, escrever, recarregar=None):
+        """
+        Executa escrever(tabelas) com a trava. Se outro terminal gravou desde
+        a última leitura/gravação, escreve recarregar() (as tabelas do disco
+        com as alterações pendentes deste terminal) no lugar de `tabelas`;
+        sem recarregar, só avisa e sobrescreve. Retorna o que foi gravado.
+        """
+        with self.trava:
+            atual = self._chave_atual()
+            if self.chave is not None and atual is not None and atual != self.chave:
+                self.desatualizada = True
+                print(f"{self.arquivo} foi gravada por outro terminal desde a última leitura.")
+            if self.desatualizada and recarregar is not None:
+                tabelas = recarregar()
+            escrever(tabelas)
+            self.chave = self._chave_atual()
+        return tabelas